@@ -21,6 +21,7 @@ from pyphi.jsonify import jsonify
 # import configure
 # import constants
 from pyanimats import fitness_functions, serialize
+from pyanimats.logbook import load as load_streamed_logbook
 from pyanimats.utils import unique_rows
 import scipy.stats
 # from individual import Individual
@@ -51,6 +52,8 @@ FILENAMES = {
     'config': 'config.json',
     'hof': 'hof.pkl',
     'logbook': 'logbook.pkl',
+    # Written by runs with `stream_logbook` enabled.
+    'streamed_logbook': '*.logbook.ndjson',
     'lineages': 'lineages.pkl',
     'metadata': 'metadata.json',
 }
@@ -133,6 +136,8 @@ def load(filetype, input_filepath=RESULT_PATH, seed=SEED, snapshot=SNAPSHOT,
     elif ext == '.pkl':
         with open(path, 'rb') as f:
             data = pickle.load(f)
+    elif ext == '.ndjson':
+        data = load_streamed_logbook(path)
 
     if filetype == 'config':
         configure.from_dict(data)
@@ -194,7 +199,9 @@ def get_final_correct(case_name=CASE_NAME, force=False):
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 
 def get_lods(case_name=CASE_NAME, force=False, gen_interval=500, seed=SEED,
-             all_seeds=False, chapter='fitness', stat='max'):
+             all_seeds=False, chapter='fitness', stat='max', streamed=False):
+    # Read the logbook file written during the run if it was streamed.
+    filetype = 'streamed_logbook' if streamed else 'logbook'
     input_filepath = os.path.join(RESULT_DIR, case_name)
     if all_seeds:
         output_filename = 'all-lods-{}-{}'.format(chapter, stat)
@@ -212,9 +219,9 @@ def get_lods(case_name=CASE_NAME, force=False, gen_interval=500, seed=SEED,
               'data...'.format(output_filename))
     if all_seeds:
         logbooks = [l.chapters[chapter] for l in
-                    load_all_seeds('logbook', input_filepath).values()]
+                    load_all_seeds(filetype, input_filepath).values()]
     else:
-        logbooks = [load('logbook', input_filepath, seed).chapters[chapter]]
+        logbooks = [load(filetype, input_filepath, seed).chapters[chapter]]
     lods = np.array([logbook.select(stat)[::gen_interval]
                      for logbook in logbooks])
     config = load('config', input_filepath)
@@ -0,0 +1,14 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# __init__.py
+
+"""
+Micro-benchmarks of the engine and the fitness functions.
+
+Benchmarks follow the conventions of airspeed velocity (asv): each
+``bench_*`` module defines classes whose ``time_*`` methods are timed, with
+``params`` and ``param_names`` giving the parameter grid and ``setup`` run
+before each combination. Run them with ``python -m benchmarks`` (see
+``benchmarks/__main__.py``), which stores the timings as JSON so that they can
+be compared across commits.
+"""
@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# __main__.py
+
+"""
+PyAnimats benchmarks
+~~~~~~~~~~~~~~~~~~~~
+Time the engine and the fitness functions. Run from the repository root with
+`python -m benchmarks`.
+
+Usage:
+    benchmarks [options]
+    benchmarks compare <old.json> <new.json> [options]
+    benchmarks -h | --help
+
+Arguments:
+    compare <old.json> <new.json>
+                           Compare two result files, listing the benchmarks
+                           that got slower or faster
+
+Options:
+    -h --help              Show this
+    -o --output=PATH       Store the results here (defaults to
+                           `benchmarks/results/<commit>.json`)
+    -k --match=TEXT        Only run benchmarks whose name contains this
+    -r --repeat=INT        Number of timing samples per benchmark [default: 5]
+    -t --threshold=FLOAT   Ratio of new to old time beyond which a benchmark
+                           counts as changed [default: 1.1]
+"""
+
+import datetime
+import importlib
+import itertools
+import json
+import os
+import pkgutil
+import platform
+import subprocess
+import sys
+from statistics import median
+from time import perf_counter as timer
+
+from docopt import docopt
+
+from pyanimats import utils
+
+from . import common
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), 'results')
+
+# Each timing sample runs the benchmark enough times to take at least this
+# long, in seconds.
+MIN_SAMPLE_TIME = 0.1
+
+
+def commit():
+    """Return the hash of the current commit if available, otherwise the
+    version number."""
+    try:
+        rev_parse = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'],
+                                   stdout=subprocess.PIPE,
+                                   stderr=subprocess.DEVNULL)
+    except OSError:
+        return utils.get_version()
+    return (rev_parse.stdout.decode().strip() if rev_parse.returncode == 0
+            else utils.get_version())
+
+
+def discover():
+    """Yield the name, class, method name, and parameters of every
+    benchmark."""
+    package = os.path.dirname(__file__)
+    for _, module_name, _ in pkgutil.iter_modules([package]):
+        if not module_name.startswith('bench_'):
+            continue
+        module = importlib.import_module('.' + module_name, __package__)
+        for cls_name, cls in sorted(vars(module).items()):
+            if not isinstance(cls, type) or cls.__module__ != module.__name__:
+                continue
+            methods = sorted(m for m in vars(cls) if m.startswith('time_'))
+            for params in itertools.product(*getattr(cls, 'params', ())):
+                for method in methods:
+                    name = '{}.{}.{}({})'.format(
+                        module_name, cls_name, method,
+                        ', '.join(map(str, params)))
+                    yield name, cls, method, params
+
+
+def time_benchmark(cls, method, params, repeat):
+    """Return timing statistics of a benchmark, in seconds per call."""
+    common.seed()
+    instance = cls()
+    if hasattr(instance, 'setup'):
+        instance.setup(*params)
+    f = getattr(instance, method)
+    # Calibrate the number of calls per sample with a first call.
+    start = timer()
+    f(*params)
+    first = timer() - start
+    number = max(1, int(MIN_SAMPLE_TIME / max(first, 1e-9)))
+    # Don't repeat benchmarks that are slow enough to time from one call.
+    if first > 1:
+        repeat = 1
+    samples = []
+    for _ in range(repeat):
+        start = timer()
+        for _ in range(number):
+            f(*params)
+        samples.append((timer() - start) / number)
+    return {'min': min(samples), 'median': median(samples),
+            'number': number, 'repeat': repeat}
+
+
+def run(match=None, repeat=5):
+    """Run the benchmarks and return the results."""
+    results = {}
+    for name, cls, method, params in discover():
+        if match and match not in name:
+            continue
+        print(name, end=' ', flush=True)
+        try:
+            results[name] = time_benchmark(cls, method, params, repeat)
+            print(utils.compress(results[name]['median']) if
+                  results[name]['median'] >= 1 else
+                  '{:.3g} ms'.format(results[name]['median'] * 1000))
+        except Exception as e:
+            results[name] = {'error': repr(e)}
+            print('failed: {!r}'.format(e))
+    return {
+        'commit': commit(),
+        'version': utils.get_version(),
+        'time': datetime.datetime.now().isoformat(),
+        'python': sys.version,
+        'machine': platform.platform(),
+        'benchmarks': results,
+    }
+
+
+def compare(old, new, threshold):
+    """Print the benchmarks whose median time changed by more than
+    ``threshold`` between two results, and return whether any got slower."""
+    slower = False
+    for name in sorted(set(old['benchmarks']) & set(new['benchmarks'])):
+        before, after = old['benchmarks'][name], new['benchmarks'][name]
+        if 'error' in before or 'error' in after:
+            continue
+        ratio = after['median'] / before['median']
+        if ratio > threshold:
+            slower = True
+            print('SLOWER  {:6.2f}x  {}'.format(ratio, name))
+        elif ratio < 1 / threshold:
+            print('FASTER  {:6.2f}x  {}'.format(ratio, name))
+    return slower
+
+
+def main(args):
+    if args['compare']:
+        with open(args['<old.json>']) as f:
+            old = json.load(f)
+        with open(args['<new.json>']) as f:
+            new = json.load(f)
+        return int(compare(old, new, float(args['--threshold'])))
+    results = run(match=args['--match'], repeat=int(args['--repeat']))
+    output = args['--output'] or os.path.join(
+        utils.ensure_exists(RESULTS_DIR),
+        '{}.json'.format(results['commit']))
+    with open(output, 'w') as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+    print('\nSaved results to `{}`.'.format(output))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(docopt(__doc__)))
@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# bench_animat.py
+
+from . import common
+
+
+class Phenotype:
+
+    params = ([4, 6],)
+    param_names = ['num_hidden']
+
+    def setup(self, num_hidden):
+        self.animat = common.animat(common.experiment(num_hidden=num_hidden))
+        self.animat.num_gates
+
+    def time_tpm(self, num_hidden):
+        self.animat._dirty_tpm = True
+        self.animat.tpm
+
+    def time_cm(self, num_hidden):
+        self.animat._dirty_cm = True
+        self.animat.cm
+
+    def time_network(self, num_hidden):
+        self.animat._dirty_network = True
+        self.animat.network
+
+
+class Mutate:
+
+    params = ([1000, 5000, 10000],)
+    param_names = ['genome_length']
+
+    def setup(self, genome_length):
+        self.animat = common.animat(common.experiment(),
+                                    genome_length=genome_length)
+
+    def time_mutate(self, genome_length):
+        self.animat.mutate()
@@ -0,0 +1,21 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# bench_evolve.py
+
+from . import common
+
+
+class Generation:
+
+    params = ([100, 500],)
+    param_names = ['popsize']
+
+    def setup(self, popsize):
+        self.evolution = common.evolution(popsize=popsize,
+                                          fitness_function=('nat',))
+
+    def time_select(self, popsize):
+        self.evolution.select(self.evolution.population, popsize)
+
+    def time_new_gen(self, popsize):
+        self.evolution.new_gen(self.evolution.population, 1)
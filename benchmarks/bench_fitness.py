@@ -0,0 +1,29 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# bench_fitness.py
+
+from pyanimats import fitness_functions
+
+from . import common
+
+
+class FitnessFunctions:
+
+    params = (list(fitness_functions.metadata),)
+    param_names = ['function']
+    # Functions based on integrated information can take minutes.
+    timeout = 600
+
+    def setup(self, function):
+        if function == 'food':
+            # The food experiment predates the `noise_level` parameter.
+            experiment = common.experiment('food/food.yml', noise_level=0.0)
+        else:
+            experiment = common.experiment(fitness_function=(function,))
+        self.animat = common.animat(experiment)
+        self.function = getattr(fitness_functions, function)
+        # Build the network outside the timed region.
+        self.animat.network
+
+    def time_fitness(self, function):
+        self.function(self.animat)
@@ -0,0 +1,24 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# bench_game.py
+
+from . import common
+
+
+class PlayGame:
+
+    params = (['hmm', 'lt'], [4, 8], [8, 16])
+    param_names = ['gate', 'num_hidden', 'world_width']
+
+    def setup(self, gate, num_hidden, world_width):
+        experiment = common.experiment(gate=gate, num_hidden=num_hidden,
+                                       world_width=world_width)
+        self.experiment = experiment.params
+        self.agent = common.animat(experiment)._c_animat
+        # Generate the phenotype outside the timed region.
+        self.agent.num_gates
+
+    def time_play_game(self, gate, num_hidden, world_width):
+        p = self.experiment
+        self.agent.play_game(p.hit_multipliers, p.block_patterns,
+                             p.world_width, p.world_height)
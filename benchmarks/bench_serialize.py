@@ -0,0 +1,23 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# bench_serialize.py
+
+import json
+
+from pyanimats import delta
+from pyanimats.serialize import serializable
+
+from . import common
+
+
+class Lineage:
+
+    params = ([100, 1000],)
+    param_names = ['length']
+
+    def setup(self, length):
+        self.animat = common.lineage(common.experiment(), length)
+
+    def time_lineage_json(self, length):
+        json.dumps(delta.encode_lineage(self.animat.lineage()),
+                   default=serializable)
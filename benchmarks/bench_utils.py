@@ -0,0 +1,22 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# bench_utils.py
+
+import numpy as np
+
+from pyanimats import utils
+
+from . import common
+
+
+class UniqueRows:
+
+    params = ([1000, 100000],)
+    param_names = ['num_rows']
+
+    def setup(self, num_rows):
+        common.seed()
+        self.array = np.random.randint(2, size=(num_rows, 8))
+
+    def time_unique_rows(self, num_rows):
+        utils.unique_rows(self.array)
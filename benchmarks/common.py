@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# common.py
+
+"""Shared setup for the benchmarks, using the shipped experiment files."""
+
+import os
+import random
+from copy import deepcopy
+
+import numpy as np
+import yaml
+
+from pyanimats import c_animat
+from pyanimats.animat import Animat
+from pyanimats.evolve import Evolution
+from pyanimats.experiment import Experiment
+
+EXPERIMENTS = os.path.join(os.path.dirname(__file__), '..', 'experiments')
+
+# Every benchmark starts from this seed, so that it times the same work on
+# every run.
+SEED = 0
+
+# The number of start codons injected into benchmarked animats, so that they
+# have some gates.
+START_CODONS = 10
+
+
+def seed(s=SEED):
+    """Seed all the random number generators."""
+    random.seed(s)
+    np.random.seed(s)
+    c_animat.seed(s)
+
+
+def load(filename='example.yml'):
+    """Return the experiment and simulation parameters in an experiment file,
+    as dictionaries."""
+    with open(os.path.join(EXPERIMENTS, filename)) as f:
+        params = yaml.safe_load(f)
+    params['experiment']['fitness_function'] = tuple(
+        params['experiment']['fitness_function'].split(','))
+    return params['experiment'], params['simulation']
+
+
+def experiment(filename='example.yml', **overrides):
+    """Return an experiment loaded from a file, with some parameters
+    overridden.
+
+    If ``world_width`` is overridden, the block patterns of the task are
+    truncated or padded to the new width.
+    """
+    d, _ = load(filename)
+    d.update(overrides)
+    d['task'] = [[multiplier, pattern.ljust(d['world_width'],
+                                            '_')[:d['world_width']]]
+                 for multiplier, pattern in d['task']]
+    return Experiment(d)
+
+
+def animat(experiment, genome_length=None, start_codons=START_CODONS):
+    """Return an animat with a random genome and some gates."""
+    seed()
+    genome = experiment.init_genome
+    if genome_length is not None:
+        genome = [experiment.default_init_genome_value] * genome_length
+    a = Animat(experiment, genome)
+    a.inject_start_codons(start_codons)
+    return a
+
+
+def lineage(experiment, length):
+    """Return an animat with ``length - 1`` ancestors, each the mutated copy of
+    the one before."""
+    a = animat(experiment)
+    a.fitness, a.raw_fitness = 1.0, (64,)
+    for gen in range(1, length):
+        child = deepcopy(a)
+        child.parent, child.gen = a, gen
+        child.mutate()
+        a = child
+    return a
+
+
+def evolution(filename='example.yml', simulation_overrides=None,
+              **overrides):
+    """Return an evolution whose initial population has been evaluated."""
+    seed()
+    experiment, simulation = load(filename)
+    experiment.update(overrides)
+    simulation.update(status_interval=0)
+    simulation.update(simulation_overrides or {})
+    e = Evolution(experiment, simulation)
+    for a in e.population:
+        a.inject_start_codons(START_CODONS)
+    e.evaluate(e.population)
+    return e
@@ -10,6 +10,9 @@ Evolve animats.
 Usage:
     pyanimats <output_file> run <experiment.yml> [options]
     pyanimats <output_file> resume <checkpoint.pkl> [options]
+    pyanimats sweep <output_dir> <experiment.yml> [options]
+    pyanimats worker --connect=ADDRESS
+    pyanimats bank <bank_file> <run_output>... [--top=INT]
     pyanimats list
     pyanimats -h | --help
     pyanimats -v | --version
@@ -20,6 +23,17 @@ Arguments:
     resume <checkpoint.pkl>  Resume from a checkpoint file (new checkpoints
                              will overwrite this unless a different file is
                              specified with the `--checkpoint-file` option)
+    sweep <output_dir> <experiment.yml>
+                             Run an experiment for a range of seeds and a
+                             grid of parameter values, storing each run in a
+                             subdirectory of <output_dir> (running the sweep
+                             again finishes any interrupted runs)
+    worker                   Evaluate animats for an evolution started with
+                             the `--broker` option, until it finishes
+    bank <bank_file> <run_output>...
+                             Save the final genomes of previous runs, given
+                             their output files, to a genome bank for seeding
+                             new populations (see `--genome-bank`)
     list                     List available fitness functions
 
 Command-line options override the parameters given in the experiment file.
@@ -44,7 +58,27 @@ Simulation options:
     -c --checkpoint=FLOAT      Checkpoint interval (minutes)
     -C --checkpoint-file=PATH  Save to this checkpoint file (defaults to
                                `checkpoint.pkl` in the output directory, or the
-                               given checkpoint file if resuming)
+                               given checkpoint file if resuming); a name
+                               ending in `.npz` saves a snapshot, which is
+                               faster to resume from
+    -w --workers=INT           Number of processes to evaluate animats with
+    -O --status-file=PATH      Periodically write the progress of the
+                               evolution to this JSON file
+    -B --broker=ADDRESS        Listen for remote workers at `HOST:PORT` and
+                               evaluate animats on them (set
+                               PYANIMATS_AUTHKEY unless it's a loopback
+                               address)
+
+Worker options:
+    -k --connect=ADDRESS       The `HOST:PORT` address of the evolution's broker
+
+Sweep options:
+    -R --seeds=RANGE           Seeds to run, as `START:STOP` (defaults to 0)
+    -x --grid=PATH             Experiment file with a list of values for each
+                               parameter to vary; every combination is run
+    -J --jobs=INT              Maximum number of runs at once (defaults to the
+                               number of CPUs)
+    -y --retries=INT           Number of times to retry a failed run
 
 Data collection options:
     -S --sample-interval=INT   Genome recording interval (generations)
@@ -56,7 +90,18 @@ Evolution options:
     -f --fitness=FUNC          Fitness function
     -p --pop-size=INT          Population size
     -G --init-genome=PATH      Path to a lineage file for an intial genome
+    -A --genome-bank=PATH      Seed the population from the fittest genomes in
+                               this genome bank
+    -N --top=INT               Only use (or, with `bank`, only save) this many
+                               of the fittest genomes
     -j --jumpstart=INT         Begin with this many start codons
+    -I --islands=INT           Number of island populations, evolved in
+                               parallel processes
+    -K --migration-interval=INT
+                               Generations between migrations among islands
+    -M --migration-size=INT    Number of animats each island sends when
+                               migrating
+    -T --topology=TOPOLOGY     Migration topology (`ring` or `complete`)
 
 Animat options:
     -g --gate=GATE             The gate with which to implement network logic
@@ -82,18 +127,21 @@ import cProfile
 import gzip
 import os
 import json
-import pickle
 import sys
 
 import yaml
 from docopt import docopt
 
+from . import distributed
 from . import fitness_functions
+from . import genome_bank
+from . import sweep
 from . import utils
 from .serialize import serializable
 from . import validate
 from .__about__ import __version__
-from .evolve import Evolution
+from .evolve import Evolution, load_checkpoint
+from .islands import Archipelago
 
 # Map CLI options to simulation parameter data types.
 cli_opt_to_simulation = {
@@ -102,6 +150,9 @@ cli_opt_to_simulation = {
     '--status-interval':  ('status_interval', int),
     '--logbook-interval': ('logbook_interval', int),
     '--sample-interval':  ('sample_interval', int),
+    '--workers':          ('num_workers', int),
+    '--status-file':      ('status_file', str),
+    '--broker':           ('broker', str),
 }
 
 # Map CLI options to experiment parameter names and data types.
@@ -110,8 +161,14 @@ cli_opt_to_experiment = {
     '--fitness':          ('fitness_function',
                            lambda f: tuple(f.split(','))),
     '--pop-size':         ('popsize', int),
-    '--init-genome':      ('init_genome', str),
+    '--init-genome':      ('init_genome_path', str),
+    '--genome-bank':      ('init_genome_bank', str),
+    '--top':              ('init_genome_bank_top', int),
     '--jumpstart':        ('init_start_codons', int),
+    '--islands':          ('num_islands', int),
+    '--migration-interval': ('migration_interval', int),
+    '--migration-size':   ('migration_size', int),
+    '--topology':         ('migration_topology', str),
     '--gate':             ('gate', str),
     '--num-sensors':      ('num_sensors', int),
     '--num-hidden':       ('num_hidden', int),
@@ -160,6 +217,27 @@ def main(args):
         fitness_functions.print_functions()
         return 0
 
+    # Evaluate animats for a remote evolution.
+    if args['worker']:
+        print('Connecting to `{}`...'.format(args['--connect']), flush=True)
+        evaluated = distributed.work(args['--connect'])
+        print('Evaluated {} animats.'.format(evaluated))
+        return 0
+
+    # Build a genome bank from previous runs.
+    if args['bank']:
+        return genome_bank.main(
+            args['<bank_file>'], args['<run_output>'],
+            top=int(args['--top']) if args['--top'] else None)
+
+    # Run a sweep of separate evolutions.
+    if args['sweep']:
+        return sweep.main(
+            args['<output_dir>'], args['<experiment.yml>'],
+            seeds=args['--seeds'] or '0', grid_file=args['--grid'],
+            max_jobs=int(args['--jobs'] or 0) or None,
+            retries=int(args['--retries'] or 0))
+
     # Final output will be written here.
     OUTPUT_FILE = args['<output_file>']
     # Don't overwrite the output file or without permission.
@@ -188,8 +266,7 @@ def main(args):
         print('Loading checkpoint from `{}`... '
               ''.format(args['<checkpoint.pkl>']),
               end='', flush=True)
-        with gzip.open(args['<checkpoint.pkl>'], 'rb') as f:
-            evolution = pickle.load(f)
+        evolution = load_checkpoint(args['<checkpoint.pkl>'])
         # Update the evolution simulation parameters from the CLI options.
         evolution.update_simulation(simulation_cli_opts)
         print('done.')
@@ -198,10 +275,15 @@ def main(args):
     else:
         # Start a new experiment.
         experiment_cli_opts = process_cli_opts(args, cli_opt_to_experiment)
-        evolution = Evolution(*load_param_file(
+        experiment, simulation = load_param_file(
             filepath=args['<experiment.yml>'],
             experiment_overrides=experiment_cli_opts,
-            simulation_overrides=simulation_cli_opts))
+            simulation_overrides=simulation_cli_opts)
+        # Use the island model if more than one population is requested.
+        if experiment.get('num_islands', 1) > 1:
+            evolution = Archipelago(experiment, simulation)
+        else:
+            evolution = Evolution(experiment, simulation)
         print('Simulating {} generations...'.format(evolution.simulation.ngen))
 
     PROFILE_FILEPATH = args['--profile']
@@ -241,4 +323,4 @@ if __name__ == '__main__':
     # Get command-line args from docopt.
     sys.argv[0] = 'pyanimats'
     args = docopt(__doc__, version=__version__)
-    main(args)
+    sys.exit(main(args))
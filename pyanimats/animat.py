@@ -11,7 +11,6 @@ animat properties (connectivity, associated PyPhi objects, etc.).
 
 from collections import namedtuple
 from copy import deepcopy
-from uuid import uuid4
 
 import numpy as np
 import pyphi
@@ -61,26 +60,31 @@ class Animat:
             The number of trials incorrectly completed by the animat during a
             single game. Updated every time a game is played; ``False`` if no
             game has been played yet.
+        scaled_correct (float):
+            ``correct``, scaled up to the whole game if the game was played on
+            a subset of the trials.
+        trials (list(int)):
+            The trials to play in each game, numbered by block pattern, then
+            direction, then initial position; ``None`` to play every trial.
     """
 
+    __slots__ = ['_experiment', '_params', '_c_animat', 'parent', 'gen',
+                 'fitness', '_dirty_fitness', '_predicted', 'raw_fitness',
+                 '_correct', '_incorrect', 'random', '_tpm', '_dirty_tpm',
+                 '_cm', '_dirty_cm', '_network', '_dirty_network', '_id',
+                 'trials']
+
     def __init__(self, experiment, genome):
         self._experiment = experiment
-        if self._experiment.gate == constants.HMM_GATE:
-            self._c_animat = pyHiddenMarkovAgent(genome,
-                                                 experiment.num_sensors,
-                                                 experiment.num_hidden,
-                                                 experiment.num_motors,
-                                                 experiment.deterministic)
-        elif self._experiment.gate == constants.LINEAR_THRESHOLD_GATE:
-            self._c_animat = pyLinearThresholdAgent(genome,
-                                                    experiment.num_sensors,
-                                                    experiment.num_hidden,
-                                                    experiment.num_motors,
-                                                    experiment.deterministic)
+        self._params = experiment.params
+        self._c_animat = _agent(experiment, genome)
         self.parent = None
         self.gen = 0
         self.fitness = 1.0
         self._dirty_fitness = True
+        # Whether the fitness was predicted by the surrogate model rather than
+        # evaluated.
+        self._predicted = False
         self.raw_fitness = (float('-Inf'),)
         self._correct = False
         self._incorrect = False
@@ -94,8 +98,10 @@ class Animat:
         self._dirty_cm = True
         self._network = False
         self._dirty_network = True
-        # Get a random unique ID.
-        self._id = uuid4()
+        # The animat gets an ID when it joins a phylogeny.
+        self._id = None
+        # Play every trial by default.
+        self.trials = None
 
     def __str__(self):
         string = ('Animat(gen={}, genome={}, '
@@ -111,26 +117,42 @@ class Animat:
                 self._experiment == other._experiment)
 
     def __getattr__(self, name):
-        """Fall back to experiment attributes."""
+        """Fall back to experiment parameters."""
         # NOTE: this works as expected because `__getattr__` is only called as
         # a last resort (unlike `__getattribute__`, which should rarely be
-        # overriden).
+        # overriden). The parameters themselves may not be bound yet when
+        # unpickling, so don't recurse in that case.
+        if name == '_params':
+            raise AttributeError(name)
         try:
-            return getattr(self._experiment, name)
+            return getattr(self._params, name)
         except AttributeError:
             raise AttributeError(
                 "'Animat' object has no attribute '{}'".format(name))
 
     def __getstate__(self):
-        # Exclude the parent pointer, network attributes, dirty flags, and RNG,
-        # from the pickled object.
-        state = {k: v for k, v in self.__dict__.items()
-                 if k not in ['parent', '_network', '_dirty_network', '_cm',
-                              '_dirty_cm', '_tpm', '_dirty_tpm']}
+        # Exclude the parent pointer, network attributes, dirty flags, and the
+        # parameter struct from the pickled object.
+        state = {name: getattr(self, name) for name in _PICKLED_ATTRIBUTES}
+        # Store the genome rather than the C++ agent, so that the genome can
+        # be encoded by whoever is pickling the animat.
+        state['genome'] = list(self.genome)
         return state
 
     def __setstate__(self, state):
-        self.__dict__.update(state)
+        state = dict(state)
+        genome = state.pop('genome', None)
+        # Older pickles don't store the trials or whether fitness was
+        # predicted.
+        self.trials = None
+        self._predicted = False
+        for name, value in state.items():
+            setattr(self, name, value)
+        self._params = self._experiment.params
+        # Rebuild the C++ agent (older pickles store the agent itself).
+        if genome is not None:
+            self._c_animat = _agent(self._experiment, genome)
+        self.parent = None
         self._tpm = False
         self._dirty_tpm = True
         self._cm = False
@@ -155,9 +177,11 @@ class Animat:
         # TODO this is a kludge, fix
         copy.fitness = deepcopy(self.fitness)
         copy._dirty_fitness = deepcopy(self._dirty_fitness)
+        copy._predicted = self._predicted
         copy.raw_fitness = deepcopy(self.raw_fitness)
         copy._correct = deepcopy(self._correct)
         copy._incorrect = deepcopy(self._incorrect)
+        copy.trials = self.trials
         copy._tpm = deepcopy(self._tpm)
         copy._dirty_tpm = deepcopy(self._dirty_tpm)
         copy._cm = deepcopy(self._cm)
@@ -223,6 +247,18 @@ class Animat:
         """The number of incorrect trials in the most recently played game."""
         return self._incorrect
 
+    @property
+    def scaled_correct(self):
+        """The number of correct trials in the most recently played game,
+        scaled up to the whole game if only some of the trials were played
+        (as the ``nat`` fitness function does)."""
+        if self._correct is False:
+            return False
+        played = self._correct + self._incorrect
+        if played == self.num_trials:
+            return self._correct
+        return self._correct * self.num_trials / played
+
     def lineage(self, step=1):
         """Return the lineage of this animat as a generator."""
         yield self
@@ -241,10 +277,11 @@ class Animat:
 
     def mutate(self):
         """Mutate the animat's genome in-place."""
-        self._c_animat.mutate(self.mutation_prob, self.duplication_prob,
-                              self.deletion_prob, self.min_genome_length,
-                              self.max_genome_length, self.min_dup_del_width,
-                              self.max_dup_del_width)
+        p = self._params
+        self._c_animat.mutate(p.mutation_prob, p.duplication_prob,
+                              p.deletion_prob, p.min_genome_length,
+                              p.max_genome_length, p.min_dup_del_width,
+                              p.max_dup_del_width)
         # Network attributes need updating.
         self._dirty_tpm = True
         self._dirty_cm = True
@@ -252,22 +289,25 @@ class Animat:
 
     def play_game(self, scrambled=False, noise_level=None):
         """Return the list of state transitions the animat goes through when
-        playing the game."""
+        playing the game (only the animat's ``trials``, if set)."""
+        p = self._params
         if noise_level is None:
-            noise_level = self.noise_level
+            noise_level = p.noise_level
+        num_trials = (p.num_trials if self.trials is None
+                      else len(self.trials))
         game = self._c_animat.play_game(
-            self.hit_multipliers, self.block_patterns, self.world_width,
-            self.world_height, scramble_world=scrambled,
-            noise_level=noise_level)
-        game = Game(animat_states=game[0].reshape(self.num_trials,
-                                                  self.world_height,
-                                                  self.num_nodes),
-                    world_states=game[1].reshape(self.num_trials,
-                                                 self.world_height),
-                    animat_positions=game[2].reshape(self.num_trials,
-                                                     self.world_height),
+            p.hit_multipliers, p.block_patterns, p.world_width,
+            p.world_height, scramble_world=scrambled,
+            noise_level=noise_level, trials=self.trials)
+        game = Game(animat_states=game[0].reshape(num_trials,
+                                                  p.world_height,
+                                                  p.num_nodes),
+                    world_states=game[1].reshape(num_trials,
+                                                 p.world_height),
+                    animat_positions=game[2].reshape(num_trials,
+                                                     p.world_height),
                     trial_results=game[3], correct=game[4], incorrect=game[5])
-        assert game.correct + game.incorrect == self.num_trials
+        assert game.correct + game.incorrect == num_trials
         self._correct = game.correct
         self._incorrect = game.incorrect
         return game
@@ -333,6 +373,26 @@ class Animat:
                 for i in range(self.num_nodes)}
 
 
+# The attributes saved when pickling an animat (along with its genome).
+_PICKLED_ATTRIBUTES = ['_experiment', 'gen', 'fitness', '_dirty_fitness',
+                       '_predicted', 'raw_fitness', '_correct', '_incorrect',
+                       'random', '_id', 'trials']
+
+
+def _agent(experiment, genome):
+    """Return the C++ agent with the given genome."""
+    if experiment.gate == constants.HMM_GATE:
+        return pyHiddenMarkovAgent(genome, experiment.num_sensors,
+                                   experiment.num_hidden,
+                                   experiment.num_motors,
+                                   experiment.deterministic)
+    elif experiment.gate == constants.LINEAR_THRESHOLD_GATE:
+        return pyLinearThresholdAgent(genome, experiment.num_sensors,
+                                      experiment.num_hidden,
+                                      experiment.num_motors,
+                                      experiment.deterministic)
+
+
 def _c_animat_getter(name):
     """Returns a function that gets ``name`` from the underlying animat."""
     def getter(self):
@@ -342,8 +402,8 @@ def _c_animat_getter(name):
 # A list of animat attributes to expose as read-only properties
 _c_animat_properties = ['genome', 'num_sensors', 'num_hidden', 'num_motors',
                         'num_nodes', 'num_states', 'deterministic',
-                        'body_length', 'edges', 'START_CODON_ONE',
-                        'START_CODON_TWO', 'print_gates']
+                        'body_length', 'edges', 'num_gates', 'fingerprint',
+                        'START_CODON_ONE', 'START_CODON_TWO', 'print_gates']
 
 # Add underlying animat properties to the Animat class
 for name in _c_animat_properties:
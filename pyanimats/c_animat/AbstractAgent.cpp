@@ -1,5 +1,7 @@
 // AbstractAgent.cpp
 
+#include <algorithm>
+
 #include "./AbstractAgent.hpp"
 
 
@@ -120,6 +122,28 @@ vector< vector<bool> > AbstractAgent::getTransitions() {
     return tpm;
 }
 
+uint64_t AbstractAgent::getFingerprint() {
+    // Hash each gate, putting the hashes in canonical order if the gates'
+    // order doesn't matter, so that agents with the same set of gates get the
+    // same fingerprint regardless of where the gates are in their genomes.
+    // This takes time linear in the total size of the gates (plus sorting
+    // their hashes), rather than the 2^N * N of computing the TPM.
+    vector<uint64_t> gateHashes(gates.size());
+    for (int i = 0; i < (int)gates.size(); i++)
+        gateHashes[i] = gates[i]->fingerprint();
+    if (!gateOrderMatters())
+        std::sort(gateHashes.begin(), gateHashes.end());
+    uint64_t hash = FNV_OFFSET_BASIS;
+    hash = hashInt(hash, mNumSensors);
+    hash = hashInt(hash, mNumHidden);
+    hash = hashInt(hash, mNumMotors);
+    hash = hashByte(hash, mDeterministic);
+    hash = hashInt(hash, gateHashes.size());
+    for (int i = 0; i < (int)gateHashes.size(); i++)
+        hash = hashInt(hash, gateHashes[i]);
+    return hash;
+}
+
 void AbstractAgent::printGates() {
     for (int i = 0; i < (int)gates.size(); i++) {
         gates[i]->print();
@@ -2,9 +2,12 @@
 
 #pragma once
 
+#include <stdint.h>
+
 #include <vector>
 
 #include "./constants.hpp"
+#include "./fingerprint.hpp"
 #include "./rng.hpp"
 #include "./AbstractGate.hpp"
 
@@ -43,6 +46,9 @@ class AbstractAgent {
         int maxDupDelLength);
     vector< vector<bool> > getTransitions();
     void printGates();
+    uint64_t getFingerprint();
 
     virtual void generatePhenotype() = 0;
+    // Whether the agent's behavior depends on the order of its gates
+    virtual bool gateOrderMatters() { return false; }
 };
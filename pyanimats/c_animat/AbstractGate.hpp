@@ -2,6 +2,7 @@
 
 #pragma once
 
+#include <stdint.h>
 #include <stdio.h>
 
 #include <vector>
@@ -27,4 +28,6 @@ class AbstractGate {
     virtual void update(vector<unsigned char> &currentStates,
             vector<unsigned char> &nextStates) = 0;
     virtual void print() = 0;
+    // Return a hash of everything that determines the gate's behavior
+    virtual uint64_t fingerprint() = 0;
 };
@@ -16,7 +16,7 @@ vector<int> executeGame(vector<unsigned char> &allAnimatStates, vector<int>
         &allWorldStates, vector<int> &allAnimatPositions, vector<int>
         &trialResults, AbstractAgent* agent, vector<int> hitMultipliers,
         vector<int> patterns, int worldWidth, int worldHeight,
-        bool scrambleWorld, double noiseLevel) {
+        bool scrambleWorld, double noiseLevel, vector<int> trials) {
     // Holds the correct/incorrect counts; this is returned
     vector<int> totals;
     totals.resize(2, 0);
@@ -40,221 +40,224 @@ vector<int> executeGame(vector<unsigned char> &allAnimatStates, vector<int>
     int allWorldStatesIndex = 0;
     int allAnimatPositionsIndex = 0;
     int trialResultsIndex = 0;
-    // Block patterns
-    for (patternIndex = 0; patternIndex < (int)patterns.size(); patternIndex++) {
-        // Directions (left/right)
-        for (direction = -1; direction < 2; direction += 2) {
-            // Agent starting position
-            for (initAgentPos = 0; initAgentPos < worldWidth; initAgentPos++) {
-                // Set agent position
-                agentPos = initAgentPos;
+    // Play every trial unless given a subset. Trials are numbered by block
+    // pattern, then direction (left, then right), then the agent's starting
+    // position.
+    if (trials.empty()) {
+        trials.resize(patterns.size() * 2 * worldWidth);
+        for (int i = 0; i < (int)trials.size(); i++) trials[i] = i;
+    }
+    for (int trial : trials) {
+        patternIndex = trial / (2 * worldWidth);
+        direction = (trial / worldWidth) % 2 == 0 ? -1 : 1;
+        initAgentPos = trial % worldWidth;
+        // Set agent position
+        agentPos = initAgentPos;
 
-                agent->resetState();
+        agent->resetState();
 
-                // Generate world
-                world.resize(worldHeight);
-                int worldState = patterns[patternIndex];
+        // Generate world
+        world.resize(worldHeight);
+        int worldState = patterns[patternIndex];
 
-                for (timestep = 0; timestep < worldHeight; timestep++) {
-                    world[timestep] = worldState;
-                    // Move the block
-                    if (direction == -1) {
-                        // Left
-                        worldState = ((worldState >> 1) & 65535) +
-                            ((worldState & 1) << (worldWidth - 1));
-                    } else {
-                        // Right
-                        worldState = ((worldState << 1) & 65535) +
-                            ((worldState >> (worldWidth - 1)) & 1);
-                    }
-                }
+        for (timestep = 0; timestep < worldHeight; timestep++) {
+            world[timestep] = worldState;
+            // Move the block
+            if (direction == -1) {
+                // Left
+                worldState = ((worldState >> 1) & 65535) +
+                    ((worldState & 1) << (worldWidth - 1));
+            } else {
+                // Right
+                worldState = ((worldState << 1) & 65535) +
+                    ((worldState >> (worldWidth - 1)) & 1);
+            }
+        }
 
-                if (scrambleWorld) {
-                    // Scramble time
-                    std::shuffle(world.begin(), world.end(), mersenne);
-                    // Scramble space
-                    std::shuffle(worldTransform.begin(), worldTransform.end(),
-                            mersenne);
-                    int scrambledWorldState;
-                    for (timestep = 0; timestep < worldHeight; timestep++) {
-                        worldState = world[timestep];
-                        scrambledWorldState = 0;
-                        for (int i = 0; i < worldWidth; i++) {
-                            scrambledWorldState +=
-                                ((worldState >> worldTransform[i]) & 1) << i;
-                        }
-                        world[timestep] = scrambledWorldState;
-                    }
+        if (scrambleWorld) {
+            // Scramble time
+            std::shuffle(world.begin(), world.end(), mersenne);
+            // Scramble space
+            std::shuffle(worldTransform.begin(), worldTransform.end(),
+                    mersenne);
+            int scrambledWorldState;
+            for (timestep = 0; timestep < worldHeight; timestep++) {
+                worldState = world[timestep];
+                scrambledWorldState = 0;
+                for (int i = 0; i < worldWidth; i++) {
+                    scrambledWorldState +=
+                        ((worldState >> worldTransform[i]) & 1) << i;
                 }
+                world[timestep] = scrambledWorldState;
+            }
+        }
 
-                #ifdef _DEBUG
-                    printf("\n\n-------------------------");
-                    printf("\n   Block pattern: %i", patterns[patternIndex]);
-                    printf("\n       Direction: %i", direction);
-                    printf("\nInitial position: %i", initAgentPos);
-                    printf("\n\n");
-                #endif
+        #ifdef _DEBUG
+            printf("\n\n-------------------------");
+            printf("\n   Block pattern: %i", patterns[patternIndex]);
+            printf("\n       Direction: %i", direction);
+            printf("\nInitial position: %i", initAgentPos);
+            printf("\n\n");
+        #endif
 
-                // World loop
-                for (timestep = 0; timestep < worldHeight; timestep++) {
-                    worldState = world[timestep];
-                    // Record the world state
-                    allWorldStates[allWorldStatesIndex++] = worldState;
-                    // Record agent position
-                    allAnimatPositions[allAnimatPositionsIndex++] = agentPos;
+        // World loop
+        for (timestep = 0; timestep < worldHeight; timestep++) {
+            worldState = world[timestep];
+            // Record the world state
+            allWorldStates[allWorldStatesIndex++] = worldState;
+            // Record agent position
+            allAnimatPositions[allAnimatPositionsIndex++] = agentPos;
 
-                    // Activate sensors if block is in line of sight
-                    // TODO(wmayner) parametrize sensor location on agent body
-                    if (agent->mNumSensors == 2) {
-                        agent->states[0] = (worldState >> agentPos) & 1;
-                        agent->states[1] =
-                            (worldState >> wrap(agentPos + 2, worldWidth)) & 1;
-                    }
-                    else {
-                        for (int i = 0; i < agent->mNumSensors; i++) {
-                            agent->states[i] =
-                                (worldState >> wrap(agentPos + i, worldWidth)) & 1;
-                        }
-                    }
+            // Activate sensors if block is in line of sight
+            // TODO(wmayner) parametrize sensor location on agent body
+            if (agent->mNumSensors == 2) {
+                agent->states[0] = (worldState >> agentPos) & 1;
+                agent->states[1] =
+                    (worldState >> wrap(agentPos + 2, worldWidth)) & 1;
+            }
+            else {
+                for (int i = 0; i < agent->mNumSensors; i++) {
+                    agent->states[i] =
+                        (worldState >> wrap(agentPos + i, worldWidth)) & 1;
+                }
+            }
 
-                    // Independently flip sensor states according to noise level
-                    if (noiseLevel > 0.0) {
-                        for (int i = 0; i < agent->mNumSensors; i++) {
-                            if (randDouble() < noiseLevel) {
-                                agent->states[i] = ~agent->states[i] & 1;
-                                #ifdef _DEBUG
-                                    printf("! Flipped sensor %i\n", i);
-                                #endif
-                            }
-                        }
+            // Independently flip sensor states according to noise level
+            if (noiseLevel > 0.0) {
+                for (int i = 0; i < agent->mNumSensors; i++) {
+                    if (randDouble() < noiseLevel) {
+                        agent->states[i] = ~agent->states[i] & 1;
+                        #ifdef _DEBUG
+                            printf("! Flipped sensor %i\n", i);
+                        #endif
                     }
+                }
+            }
 
-                    #ifdef _DEBUG
-                        // Print the world
-                        int cell;
-                        for (int i = 0; i < worldWidth; i++) {
-                            cell = (worldState >> i) & 1;
-                            if (cell == 0)
-                                printf("_");
-                            if (cell == 1)
-                                printf("1");
-                        }
-                        printf("\n");
+            #ifdef _DEBUG
+                // Print the world
+                int cell;
+                for (int i = 0; i < worldWidth; i++) {
+                    cell = (worldState >> i) & 1;
+                    if (cell == 0)
+                        printf("_");
+                    if (cell == 1)
+                        printf("1");
+                }
+                printf("\n");
 
-                        // Print the animat
-                        bool space;
-                        for (int i = 0; i < worldWidth; i++) {
-                            space = true;
-                            for (int k = 0; k < agent->mBodyLength; k++)
-                                if (wrap(agentPos + k, worldWidth) == i) {
-                                    if (agent->mNumSensors > 2) {
-                                        printf("%i", agent->states[k]);
-                                    } else {
-                                        if (k == 0)
-                                            printf("%i", agent->states[0]);
-                                        if (k == 1)
-                                            printf("-");
-                                        if (k == 2)
-                                            printf("%i", agent->states[1]);
-                                    }
-                                    space = false;
-                                }
-                            if (space) {
-                                printf(" ");
+                // Print the animat
+                bool space;
+                for (int i = 0; i < worldWidth; i++) {
+                    space = true;
+                    for (int k = 0; k < agent->mBodyLength; k++)
+                        if (wrap(agentPos + k, worldWidth) == i) {
+                            if (agent->mNumSensors > 2) {
+                                printf("%i", agent->states[k]);
+                            } else {
+                                if (k == 0)
+                                    printf("%i", agent->states[0]);
+                                if (k == 1)
+                                    printf("-");
+                                if (k == 2)
+                                    printf("%i", agent->states[1]);
                             }
+                            space = false;
                         }
-                        printf("\n\n");
-                    #endif
+                    if (space) {
+                        printf(" ");
+                    }
+                }
+                printf("\n\n");
+            #endif
 
-                    // TODO(wmayner) parameterize changing sensors mid-evolution
-                    // Larissa: Set to 0 to evolve agents with just one sensor
+            // TODO(wmayner) parameterize changing sensors mid-evolution
+            // Larissa: Set to 0 to evolve agents with just one sensor
 
-                    // Record state of sensors
-                    for (int n = 0; n < agent->mNumSensors; n++)
-                        allAnimatStates[allAnimatStatesIndex++] = agent->states[n];
+            // Record state of sensors
+            for (int n = 0; n < agent->mNumSensors; n++)
+                allAnimatStates[allAnimatStatesIndex++] = agent->states[n];
 
-                    agent->updateStates();
+            agent->updateStates();
 
-                    // Record state of hidden units and motors after updating animat
-                    for (int n = agent->mNumSensors; n < agent->mNumNodes; n++) {
-                        allAnimatStates[allAnimatStatesIndex++] = agent->states[n];
-                    }
+            // Record state of hidden units and motors after updating animat
+            for (int n = agent->mNumSensors; n < agent->mNumNodes; n++) {
+                allAnimatStates[allAnimatStatesIndex++] = agent->states[n];
+            }
 
-                    // Update hitcount if this is the last timestep
-                    if (timestep == worldHeight - 1) {
-                        int hit = 0;
-                        for (int i = 0; i < agent->mBodyLength; i++) {
-                            if (((worldState >>
-                                    (wrap(agentPos + i, worldWidth))) & 1)
-                                    == 1)
-                                hit = 1;
-                        }
+            // Update hitcount if this is the last timestep
+            if (timestep == worldHeight - 1) {
+                int hit = 0;
+                for (int i = 0; i < agent->mBodyLength; i++) {
+                    if (((worldState >>
+                            (wrap(agentPos + i, worldWidth))) & 1)
+                            == 1)
+                        hit = 1;
+                }
+                #ifdef _DEBUG
+                printf("-----------------\n");
+                #endif
+                if (hitMultipliers[patternIndex] > 0) {
+                    if (hit == 1) {
+                        totals[CORRECT]++;
+                        trialResults[trialResultsIndex++] = CORRECT_CATCH;
                         #ifdef _DEBUG
-                        printf("-----------------\n");
+                        printf("CAUGHT (CORRECT!)");
+                        #endif
+                    }
+                    else {
+                        totals[INCORRECT]++;
+                        trialResults[trialResultsIndex++] = WRONG_AVOID;
+                        #ifdef _DEBUG
+                        printf("AVOIDED (WRONG.)");
+                        #endif
+                    }
+                }
+                if (hitMultipliers[patternIndex] <= 0) {
+                    if (hit == 0) {
+                        totals[CORRECT]++;
+                        trialResults[trialResultsIndex++] = CORRECT_AVOID;
+                        #ifdef _DEBUG
+                        printf("AVOIDED (CORRECT!)");
                         #endif
-                        if (hitMultipliers[patternIndex] > 0) {
-                            if (hit == 1) {
-                                totals[CORRECT]++;
-                                trialResults[trialResultsIndex++] = CORRECT_CATCH;
-                                #ifdef _DEBUG
-                                printf("CAUGHT (CORRECT!)");
-                                #endif
-                            }
-                            else {
-                                totals[INCORRECT]++;
-                                trialResults[trialResultsIndex++] = WRONG_AVOID;
-                                #ifdef _DEBUG
-                                printf("AVOIDED (WRONG.)");
-                                #endif
-                            }
-                        }
-                        if (hitMultipliers[patternIndex] <= 0) {
-                            if (hit == 0) {
-                                totals[CORRECT]++;
-                                trialResults[trialResultsIndex++] = CORRECT_AVOID;
-                                #ifdef _DEBUG
-                                printf("AVOIDED (CORRECT!)");
-                                #endif
-                            }
-                            else {
-                                totals[INCORRECT]++;
-                                trialResults[trialResultsIndex++] = WRONG_CATCH;
-                                #ifdef _DEBUG
-                                printf("CAUGHT (WRONG.)");
-                                #endif
-                            }
-                        }
-                        // Break out of the world loop, since the animat's
-                        // subsequent movement doesn't count
-                        break;
                     }
+                    else {
+                        totals[INCORRECT]++;
+                        trialResults[trialResultsIndex++] = WRONG_CATCH;
+                        #ifdef _DEBUG
+                        printf("CAUGHT (WRONG.)");
+                        #endif
+                    }
+                }
+                // Break out of the world loop, since the animat's
+                // subsequent movement doesn't count
+                break;
+            }
 
-                    action = agent->getAction();
+            action = agent->getAction();
 
-                    // Move agent
-                    switch (action) {
-                        // No motors on
-                        case 0:
-                            // Don't move
-                            break;
-                        // Both motors on
-                        case 3:
-                            // Don't move
-                            break;
-                        // Right motor on
-                        case 1:
-                            // Move right
-                            agentPos = wrap(agentPos + 1, worldWidth);
-                            break;
-                        // Left motor on
-                        case 2:
-                            // Move left
-                            agentPos = wrap(agentPos - 1, worldWidth);
-                            break;
-                    }
-                } // End world loop
-            }  // Agent starting position
-        }  // Directions
-    }  // Block patterns
+            // Move agent
+            switch (action) {
+                // No motors on
+                case 0:
+                    // Don't move
+                    break;
+                // Both motors on
+                case 3:
+                    // Don't move
+                    break;
+                // Right motor on
+                case 1:
+                    // Move right
+                    agentPos = wrap(agentPos + 1, worldWidth);
+                    break;
+                // Left motor on
+                case 2:
+                    // Move left
+                    agentPos = wrap(agentPos - 1, worldWidth);
+                    break;
+            }
+        } // End world loop
+    }  // Trials
     return totals;
 }  // executeGame
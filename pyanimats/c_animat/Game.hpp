@@ -14,4 +14,5 @@ vector<int> executeGame(std::vector<unsigned char> &allAnimatStates,
         std::vector<int> &allWorldStates, vector<int> &allAnimatPositions,
         vector<int> &trialResults, AbstractAgent* agent,
         vector<int> hit_multipliers, vector<int> patterns, int worldWidth,
-        int worldHeight, bool scrambleWorld, double noiseLevel);
+        int worldHeight, bool scrambleWorld, double noiseLevel,
+        vector<int> trials);
@@ -112,6 +112,17 @@ HiddenMarkovGate::~HiddenMarkovGate() {
     outputs.clear();
 }
 
+uint64_t HiddenMarkovGate::fingerprint() {
+    // Tag the hash with the start codon, so that gates of different types
+    // never collide
+    uint64_t hash = hashByte(FNV_OFFSET_BASIS, START_CODON_ONE);
+    hash = hashVector(hash, inputs);
+    hash = hashVector(hash, outputs);
+    for (int i = 0; i < (int)hmm.size(); i++)
+        hash = hashVector(hash, hmm[i]);
+    return hash;
+}
+
 void HiddenMarkovGate::print() {
     printf("\n------------------");
     printf("\nHidden Markov Gate");
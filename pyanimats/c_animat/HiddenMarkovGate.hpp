@@ -4,6 +4,7 @@
 
 #include <vector>
 
+#include "./fingerprint.hpp"
 #include "./rng.hpp"
 #include "./AbstractGate.hpp"
 
@@ -25,4 +26,5 @@ class HiddenMarkovGate: public AbstractGate {
     void update(vector<unsigned char> &currentStates,
             vector<unsigned char> &nextStates) override;
     void print() override;
+    uint64_t fingerprint() override;
 };
@@ -21,6 +21,8 @@ class LinearThresholdAgent: public AbstractAgent {
     static unsigned char START_CODON_TWO;
 
     void generatePhenotype();
+    // A node is only updated by the last threshold gate that outputs to it
+    bool gateOrderMatters() { return true; }
 
     using AbstractAgent::injectStartCodons;
     void injectStartCodons(int n);
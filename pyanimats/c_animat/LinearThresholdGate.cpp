@@ -85,6 +85,16 @@ LinearThresholdGate::~LinearThresholdGate() {
     outputs.clear();
 }
 
+uint64_t LinearThresholdGate::fingerprint() {
+    // Tag the hash with the start codon, so that gates of different types
+    // never collide
+    uint64_t hash = hashByte(FNV_OFFSET_BASIS, START_CODON_ONE);
+    hash = hashInt(hash, threshold);
+    hash = hashVector(hash, inputs);
+    hash = hashVector(hash, outputs);
+    return hash;
+}
+
 void LinearThresholdGate::print() {
     printf("\n---------------------");
     printf("\nLinear Threshold Gate");
@@ -4,6 +4,7 @@
 
 #include <vector>
 
+#include "./fingerprint.hpp"
 #include "./AbstractGate.hpp"
 
 using std::vector;
@@ -24,4 +25,5 @@ class LinearThresholdGate: public AbstractGate {
     void update(vector<unsigned char> &currentStates,
             vector<unsigned char> &nextStates) override;
     void print() override;
+    uint64_t fingerprint() override;
 };
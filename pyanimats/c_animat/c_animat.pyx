@@ -10,6 +10,7 @@
 from libcpp.vector cimport vector
 from libcpp.string cimport string
 from libcpp cimport bool, string
+from libc.stdint cimport uint64_t
 
 cimport cython
 
@@ -84,6 +85,11 @@ def set_rng_state(state):
     setState(state)
 
 
+cdef extern from 'AbstractGate.hpp':
+    cdef cppclass AbstractGate:
+        pass
+
+
 cdef extern from 'AbstractAgent.hpp':
     cdef cppclass AbstractAgent:
         AbstractAgent(
@@ -99,6 +105,7 @@ cdef extern from 'AbstractAgent.hpp':
         int mBodyLength
         bool mDeterministic
 
+        vector[AbstractGate*] gates
         vector[uchar] genome
 
         void injectStartCodons(int n, uchar codon_one, uchar codon_two)
@@ -109,6 +116,7 @@ cdef extern from 'AbstractAgent.hpp':
             int maxDupDelLength)
         vector[vector[bool]] getTransitions()
         void printGates()
+        uint64_t getFingerprint()
 
 
 cdef extern from 'HiddenMarkovAgent.hpp':
@@ -148,7 +156,8 @@ cdef extern from 'Game.hpp':
         vector[uchar] animatStates, vector[int] worldStates, 
         vector[int] animatPositions, vector[int] trialResults, 
         AbstractAgent* agent, vector[int] hitMultipliers, vector[int] patterns,
-        int worldWidth, int worldHeight, bool scrambleWorld, double noiseLevel)
+        int worldWidth, int worldHeight, bool scrambleWorld, double noiseLevel,
+        vector[int] trials)
 
 
 cdef extern from 'asvoid.hpp':
@@ -271,6 +280,18 @@ cdef class pyAbstractAgent:
         def __get__(self):
             return self.thisptr.mBodyLength
 
+    property num_gates:
+        def __get__(self):
+            # Update the phenotype if necessary before counting the gates.
+            self._update_phenotype()
+            return self.thisptr.gates.size()
+
+    property fingerprint:
+        def __get__(self):
+            # Update the phenotype if necessary before hashing the gates.
+            self._update_phenotype()
+            return self.thisptr.getFingerprint()
+
     property tpm:
         def __get__(self):
             # Update the phenotype if necessary before getting the TPM.
@@ -294,12 +315,15 @@ cdef class pyAbstractAgent:
         self._dirty_phenotype = True
 
     def play_game(self, hit_multipliers, patterns, worldWidth, worldHeight,
-                  scramble_world=False, noise_level=0.0):
+                  scramble_world=False, noise_level=0.0, trials=None):
         # Ensure the phenotype reflects the genome before playing the game.
         self._update_phenotype()
+        # Play every trial unless given a subset.
+        if trials is None:
+            trials = []
         # Calculate the size of the state transition vector, which has an entry
         # for every node state of every timestep of every trial, and initialize.
-        num_trials = len(patterns) * 2 * worldWidth
+        num_trials = len(trials) or len(patterns) * 2 * worldWidth
         num_timesteps = num_trials * worldHeight
         cdef UnsignedCharWrapper animat_states = \
             UnsignedCharWrapper(num_timesteps * self.num_nodes)
@@ -311,7 +335,7 @@ cdef class pyAbstractAgent:
         correct, incorrect = executeGame(
             animat_states.buf[0], world_states.buf[0], animat_positions.buf[0],
             trial_results.buf[0], self.thisptr, hit_multipliers, patterns,
-            worldWidth, worldHeight, scramble_world, noise_level)
+            worldWidth, worldHeight, scramble_world, noise_level, trials)
         # Return the state transitions and world states as NumPy arrays.
         return (animat_states.asarray(), world_states.asarray(),
                 animat_positions.asarray(), trial_results.asarray(), correct,
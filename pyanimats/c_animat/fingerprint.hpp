@@ -0,0 +1,32 @@
+// fingerprint.hpp
+
+#pragma once
+
+#include <stdint.h>
+
+#include <vector>
+
+using std::vector;
+
+// 64-bit FNV-1a hashing, used to fingerprint phenotypes
+const uint64_t FNV_OFFSET_BASIS = 14695981039346656037ULL;
+const uint64_t FNV_PRIME = 1099511628211ULL;
+
+inline uint64_t hashByte(uint64_t hash, unsigned char byte) {
+    return (hash ^ byte) * FNV_PRIME;
+}
+
+inline uint64_t hashInt(uint64_t hash, uint64_t value) {
+    for (int i = 0; i < 8; i++)
+        hash = hashByte(hash, (value >> (8 * i)) & 0xff);
+    return hash;
+}
+
+// The length is hashed along with the contents, so that consecutive vectors
+// can't be confused with each other.
+inline uint64_t hashVector(uint64_t hash, const vector<unsigned char> &v) {
+    hash = hashInt(hash, v.size());
+    for (int i = 0; i < (int)v.size(); i++)
+        hash = hashByte(hash, v[i]);
+    return hash;
+}
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# cache.py
+
+"""
+Caching of fitness values across generations.
+
+Animats with the same phenotype get the same fitness under a deterministic
+fitness function, so their fitness need only be computed once. Phenotypes are
+identified by the fingerprint of their gates, which the agents compute without
+building their TPMs.
+"""
+
+import hashlib
+from collections import OrderedDict
+
+
+def phenotype_key(fingerprint, salt=b''):
+    """Return a key identifying the phenotype with the given fingerprint.
+
+    Args:
+        fingerprint (int): The 64-bit fingerprint of the phenotype's gates, as
+            given by ``Animat.fingerprint``.
+
+    Keyword Args:
+        salt (bytes): Extra data to include in the key, e.g. a description of
+            the fitness function, so that keys computed under different
+            configurations never collide.
+    """
+    h = hashlib.blake2b(salt, digest_size=16)
+    h.update(fingerprint.to_bytes(8, 'little'))
+    return h.digest()
+
+
+class FitnessCache:
+
+    """A bounded mapping from phenotype keys to fitness data that discards the
+    least-recently used entries first.
+
+    Args:
+        maxsize (int): The maximum number of entries.
+
+    Attributes:
+        hits (int): The number of successful lookups since the last call to
+            ``reset_stats``.
+        misses (int): The number of failed lookups since the last call to
+            ``reset_stats``.
+    """
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def get(self, key):
+        """Return the value stored under ``key``, or ``None``."""
+        try:
+            value = self._data[key]
+        except KeyError:
+            self.misses += 1
+            return None
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        """Store ``value`` under ``key``, evicting the least-recently used
+        entry if the cache is full."""
+        self._data[key] = value
+        self._data.move_to_end(key)
+        if len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def reset_stats(self):
+        """Return the hit and miss counts and reset them to zero."""
+        stats = {'hits': self.hits, 'misses': self.misses}
+        self.hits, self.misses = 0, 0
+        return stats
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# checkpoint.py
+
+"""
+Writing checkpoints without pausing evolution.
+
+Evolution only has to pickle its state, which is fast; compressing the pickle
+and writing it to disk are done in a background thread while evolution
+continues. Checkpoints are written to a temporary file and then renamed, so an
+interrupted write never leaves a truncated checkpoint behind, and the last few
+checkpoints can be kept as a fallback.
+"""
+
+import gzip
+import os
+import tempfile
+import threading
+
+# The process's umask. It can only be read by setting it, which isn't safe
+# while other threads create files, so it's read once on import.
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+
+def suffixed_file(path, suffix):
+    """Return ``path`` with ``.suffix`` inserted before its extension.
+
+    A ``.gz`` extension is kept together with the extension before it, so that
+    ``checkpoint.pkl.gz`` becomes ``checkpoint.suffix.pkl.gz``.
+    """
+    root, ext = os.path.splitext(path)
+    if ext == '.gz':
+        root, inner = os.path.splitext(root)
+        ext = inner + ext
+    return '{}.{}{}'.format(root, suffix, ext)
+
+
+def rotate(path, keep):
+    """Shift the existing checkpoints at ``path`` to make room for a new one.
+
+    The checkpoint at ``path`` becomes ``suffixed_file(path, 1)``, which
+    becomes ``suffixed_file(path, 2)``, and so on, so that together with the
+    new checkpoint ``keep`` checkpoints remain.
+    """
+    names = [path] + [suffixed_file(path, i) for i in range(1, keep)]
+    for older, newer in reversed(list(zip(names[1:], names[:-1]))):
+        if os.path.exists(newer):
+            os.replace(newer, older)
+
+
+def write(data, path, keep=1, compress=True):
+    """Compress ``data`` and atomically write it to ``path``.
+
+    Args:
+        data (bytes): The pickled checkpoint.
+        path (str): The checkpoint file.
+
+    Keyword Args:
+        keep (int): The number of checkpoints to keep, including this one.
+        compress (bool): Whether to compress ``data`` with gzip.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix='.checkpoint-')
+    try:
+        # Temporary files are private; give the checkpoint the permissions of
+        # a newly created file instead.
+        os.fchmod(fd, 0o666 & ~_UMASK)
+        with os.fdopen(fd, 'wb') as raw:
+            if compress:
+                with gzip.GzipFile(fileobj=raw, mode='wb') as f:
+                    f.write(data)
+            else:
+                raw.write(data)
+        rotate(path, keep)
+        os.replace(tmp, path)
+    except BaseException:
+        os.remove(tmp)
+        raise
+
+
+class CheckpointWriter:
+
+    """Writes checkpoints in a background thread.
+
+    At most one checkpoint is written at a time; if a checkpoint is requested
+    while the previous one is still being written, the writer waits for the
+    previous one to finish first.
+
+    Keyword Args:
+        keep (int): The number of checkpoints to keep.
+    """
+
+    def __init__(self, keep=1):
+        self.keep = keep
+        self._thread = None
+        self._error = None
+
+    def _write(self, data, path, compress):
+        try:
+            write(data, path, keep=self.keep, compress=compress)
+        except BaseException as e:
+            self._error = e
+
+    def write(self, data, path, compress=True):
+        """Start writing ``data`` to ``path`` and return immediately."""
+        self.wait()
+        self._thread = threading.Thread(target=self._write,
+                                        args=(data, path, compress))
+        self._thread.start()
+
+    def wait(self):
+        """Wait until the pending checkpoint has been written.
+
+        Raises:
+            Exception: Any error raised while writing the pending checkpoint.
+        """
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise error
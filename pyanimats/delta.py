@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# delta.py
+
+"""
+Delta encoding of genomes along a lineage.
+
+Consecutive ancestors differ by a few point mutations or a duplication or
+deletion, so rather than storing every genome in full, each genome is stored
+as an edit script relative to its parent's. Every ``keyframe_interval``-th
+genome, counting from the oldest ancestor, is stored in full so that a genome
+can be reconstructed without replaying the whole lineage.
+
+An edit script is a list of ``[start, end, replacement]`` edits, in order of
+position, each replacing ``parent[start:end]`` with ``replacement``.
+"""
+
+import numpy as np
+
+# By default, store every 100th genome in full.
+KEYFRAME_INTERVAL = 100
+
+
+def _substitutions(parent, child, offset):
+    """Return the edits that turn ``parent`` into ``child``, which have the
+    same length, for a segment starting at ``offset``."""
+    changed = np.flatnonzero(parent != child)
+    runs = np.split(changed, np.flatnonzero(np.diff(changed) > 1) + 1)
+    return [[offset + int(run[0]), offset + int(run[-1]) + 1,
+             child[run[0]:run[-1] + 1].tolist()]
+            for run in runs if run.size]
+
+
+def diff(parent, child):
+    """Return an edit script that turns ``parent`` into ``child``.
+
+    Genomes change by point mutations and duplications or deletions, so the
+    script consists of substitutions and at most one insertion or deletion.
+    The insertion or deletion is placed where it leaves the fewest
+    substitutions, which takes linear time.
+    """
+    parent, child = np.asarray(parent), np.asarray(child)
+    n, m = len(parent), len(child)
+    if n == m:
+        return _substitutions(parent, child, 0)
+    s = min(n, m)
+    # Count the mismatches before position k when the genomes are aligned at
+    # the start, and from position k on when they're aligned at the end.
+    before = np.concatenate([[0], np.cumsum(parent[:s] != child[:s])])
+    after = np.concatenate([
+        np.cumsum((parent[n - s:] != child[m - s:])[::-1])[::-1], [0]])
+    k = int(np.argmin(before + after))
+    return (_substitutions(parent[:k], child[:k], 0) +
+            [[k, k + n - s, child[k:k + m - s].tolist()]] +
+            _substitutions(parent[k + n - s:], child[k + m - s:], k + n - s))
+
+
+def patch(parent, script):
+    """Apply an edit script to ``parent`` and return the resulting genome."""
+    genome = list(parent)
+    # Apply the edits from the end, so that earlier positions stay valid.
+    for start, end, replacement in reversed(script):
+        genome[start:end] = replacement
+    return genome
+
+
+def is_keyframe(depth, keyframe_interval):
+    """Whether the genome ``depth`` ancestors below the root of a lineage is
+    stored in full."""
+    return depth % keyframe_interval == 0
+
+
+def encode(genomes, keyframe_interval=KEYFRAME_INTERVAL):
+    """Delta-encode the genomes of a lineage.
+
+    Args:
+        genomes (list): The genomes, from the newest to the oldest, as the
+            animats are yielded by ``Animat.lineage``.
+
+    Keyword Args:
+        keyframe_interval (int): Store every this many genomes in full.
+
+    Returns:
+        list(tuple): A ``(full, data)`` pair for each genome, where ``data``
+        is the genome itself if ``full`` is true and otherwise its edit script
+        relative to the next (older) genome.
+    """
+    encoded = []
+    for i, genome in enumerate(genomes):
+        depth = len(genomes) - 1 - i
+        if is_keyframe(depth, keyframe_interval):
+            encoded.append((True, list(genome)))
+        else:
+            encoded.append((False, diff(genomes[i + 1], genome)))
+    return encoded
+
+
+def decode(encoded):
+    """Reconstruct the genomes of a lineage encoded with ``encode``."""
+    genomes = [None] * len(encoded)
+    for i in reversed(range(len(encoded))):
+        full, data = encoded[i]
+        genomes[i] = data if full else patch(genomes[i + 1], data)
+    return genomes
+
+
+def encode_lineage(lineage, keyframe_interval=KEYFRAME_INTERVAL):
+    """Return the serializable representation of a lineage, with genomes
+    delta-encoded.
+
+    Each animat in the lineage has either a full ``genome`` or a
+    ``genome_delta``, the edit script relative to the genome of the next animat
+    in the list (its parent).
+    """
+    lineage = list(lineage)
+    encoded = encode([a.genome for a in lineage], keyframe_interval)
+    dicts = []
+    for a, (full, data) in zip(lineage, encoded):
+        d = a.serializable(genome=False, compact=True)
+        d['genome' if full else 'genome_delta'] = data
+        dicts.append(d)
+    return dicts
+
+
+def decode_lineage(dicts):
+    """Restore the full genomes of a serialized lineage, in place."""
+    genome = None
+    for d in reversed(dicts):
+        if 'genome_delta' in d:
+            d['genome'] = patch(genome, d.pop('genome_delta'))
+        genome = d['genome']
+    return dicts
@@ -0,0 +1,345 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# distributed.py
+
+"""
+Evaluation of animats by workers on other machines.
+
+An evolution with a broker address listens on it for workers, which can be
+started on any machine that can reach it with::
+
+    pyanimats worker --connect HOST:PORT
+
+The broker sends each worker the experiment when it connects, and then batches
+of tasks (a genome, a seed, the trials to play, and whether to compute the
+animat's features for the surrogate model rather than its fitness), one batch
+at a time; the worker sends back the fitness data or the features. As with
+worker processes, each task carries its own seed, so results don't depend on
+which worker evaluated what.
+
+Workers send a heartbeat every few seconds, even while evaluating. A worker
+that disconnects or stays silent for longer than the broker's timeout is
+dropped, and its batch is put back at the front of the queue for another
+worker. Evaluations wait until a worker is available, so workers can join and
+leave at any time.
+
+Tasks are pickled, so connections are authenticated with a key shared by the
+broker and its workers, taken from the ``PYANIMATS_AUTHKEY`` environment
+variable. Without it, a well-known default key is used, and brokers and
+workers refuse to use any address other than a loopback one.
+"""
+
+import ipaddress
+import itertools
+import os
+import socket
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from multiprocessing.connection import Client, Listener, Pipe, wait
+
+from .fitness_transforms import ExponentialMultiFitness
+from .parallel import make_task, run_task
+from .utils import parse_address
+
+# The environment variable holding the key shared by brokers and workers, and
+# the key used if it isn't set.
+AUTHKEY_VARIABLE = 'PYANIMATS_AUTHKEY'
+DEFAULT_AUTHKEY = 'pyanimats'
+
+# The number of seconds between heartbeats from workers.
+HEARTBEAT_INTERVAL = 5
+# The number of seconds after which a silent worker is considered lost.
+TIMEOUT = 30
+
+
+def authkey():
+    """Return the key that authenticates brokers and workers."""
+    return os.environ.get(AUTHKEY_VARIABLE, DEFAULT_AUTHKEY).encode()
+
+
+def is_loopback(host):
+    """Return whether every address ``host`` resolves to is a loopback
+    address."""
+    try:
+        addresses = {info[4][0] for info in socket.getaddrinfo(host, None)}
+    except (socket.gaierror, UnicodeError):
+        return False
+    return bool(addresses) and all(
+        ipaddress.ip_address(a.split('%')[0]).is_loopback for a in addresses)
+
+
+def check_address(address):
+    """Parse ``address``, checking that it can be used with the authentication
+    key.
+
+    Raises:
+        ValueError: If the address isn't a loopback address and the default
+            key would be used, since anyone could then run code on the broker
+            or its workers.
+    """
+    host, port = parse_address(address)
+    if AUTHKEY_VARIABLE not in os.environ and not is_loopback(host):
+        raise ValueError(
+            'refusing to use `{}` with the default authentication key: set '
+            'the {} environment variable (to the same secret for the broker '
+            'and its workers) to use addresses other than loopback '
+            'ones.'.format(address, AUTHKEY_VARIABLE))
+    return host, port
+
+
+class _Worker:
+
+    """The broker's record of a connected worker."""
+
+    def __init__(self, conn):
+        self.conn = conn
+        # The batch being evaluated, as ``(id, tasks, futures)``.
+        self.batch = None
+        self.last_seen = time.monotonic()
+
+
+class Broker:
+
+    """Evaluates animats on remote workers.
+
+    Has the same interface as ``parallel.Evaluator``.
+
+    Args:
+        experiment (Experiment): The experiment the animats belong to.
+        address (str): The address to listen on, as ``HOST:PORT``. With port
+            0, a free port is chosen (see the ``address`` attribute). Must be
+            a loopback address unless ``PYANIMATS_AUTHKEY`` is set.
+
+    Keyword Args:
+        chunksize (int): The number of animats sent to a worker at once.
+        timeout (float): The number of seconds after which a silent worker
+            is dropped.
+    """
+
+    def __init__(self, experiment, address, chunksize=4, timeout=TIMEOUT):
+        self.experiment = experiment
+        self.chunksize = chunksize
+        self.timeout = timeout
+        self._listener = Listener(check_address(address), authkey=authkey())
+        self.address = '{}:{}'.format(*self._listener.address)
+        self._batch_ids = itertools.count()
+        # Batches waiting for a worker, and newly connected workers, shared
+        # with the dispatching thread.
+        self._lock = threading.Lock()
+        self._pending = deque()
+        self._connected = []
+        self._closed = False
+        # Wakes the dispatching thread when there's something to do.
+        self._wakeup_reader, self._wakeup_writer = Pipe(duplex=False)
+        self._accepting = threading.Thread(target=self._accept, daemon=True)
+        self._accepting.start()
+        self._dispatching = threading.Thread(target=self._dispatch,
+                                             daemon=True)
+        self._dispatching.start()
+
+    def _wake(self):
+        with self._lock:
+            self._wakeup_writer.send(None)
+
+    def _accept(self):
+        while True:
+            try:
+                conn = self._listener.accept()
+            except OSError:
+                # Failed authentication, or the listener was closed.
+                if self._closed:
+                    return
+                continue
+            if self._closed:
+                conn.close()
+                return
+            try:
+                conn.send(('experiment', self.experiment))
+            except OSError:
+                continue
+            with self._lock:
+                self._connected.append(conn)
+            self._wake()
+
+    def _drop(self, workers, worker):
+        """Forget a lost worker and put its batch back in the queue."""
+        workers.remove(worker)
+        worker.conn.close()
+        if worker.batch is not None:
+            with self._lock:
+                self._pending.appendleft(worker.batch)
+
+    def _assign(self, workers):
+        """Send a batch to each idle worker."""
+        for worker in workers:
+            if worker.batch is not None:
+                continue
+            with self._lock:
+                # Skip batches whose evaluations were all cancelled.
+                while self._pending and all(
+                        f.done() for f in self._pending[0][2]):
+                    self._pending.popleft()
+                if not self._pending:
+                    return
+                worker.batch = self._pending.popleft()
+            batch_id, tasks, futures = worker.batch
+            # Evaluations that are running can no longer be cancelled. (The
+            # futures of a lost worker's batch are already running.)
+            for future in futures:
+                if not future.running():
+                    future.set_running_or_notify_cancel()
+            try:
+                worker.conn.send(('evaluate', batch_id, tasks))
+            except OSError:
+                # Noticed as lost when its connection is read.
+                pass
+
+    def _dispatch(self):
+        workers = []
+        while True:
+            with self._lock:
+                if self._closed:
+                    break
+                workers.extend(_Worker(conn) for conn in self._connected)
+                self._connected = []
+            self._assign(workers)
+            ready = wait([w.conn for w in workers] + [self._wakeup_reader],
+                         timeout=min(HEARTBEAT_INTERVAL, self.timeout))
+            now = time.monotonic()
+            for worker in list(workers):
+                if worker.conn not in ready:
+                    if now - worker.last_seen > self.timeout:
+                        self._drop(workers, worker)
+                    continue
+                try:
+                    message = worker.conn.recv()
+                except (EOFError, OSError):
+                    self._drop(workers, worker)
+                    continue
+                worker.last_seen = now
+                if (message[0] == 'result' and worker.batch is not None and
+                        message[1] == worker.batch[0]):
+                    for future, result in zip(worker.batch[2], message[2]):
+                        if not future.cancelled():
+                            future.set_result(result)
+                    worker.batch = None
+            if self._wakeup_reader in ready:
+                while self._wakeup_reader.poll():
+                    self._wakeup_reader.recv()
+        for worker in workers:
+            try:
+                worker.conn.send(('stop',))
+            except OSError:
+                pass
+            worker.conn.close()
+
+    def _submit_batch(self, tasks):
+        futures = [Future() for task in tasks]
+        with self._lock:
+            self._pending.append((next(self._batch_ids), tasks, futures))
+        self._wake()
+        return futures
+
+    def map(self, animats, seeds, features=False):
+        """Evaluate ``animats``, seeding each evaluation with the
+        corresponding seed.
+
+        Keyword Args:
+            features (bool): Whether to compute the animats' features for the
+                surrogate model instead.
+
+        Returns:
+            list(tuple): The result of ``evaluate_genome`` (or
+            ``genome_features``) for each animat, in order.
+        """
+        tasks = [make_task(a, seed, features)
+                 for a, seed in zip(animats, seeds)]
+        futures = []
+        for i in range(0, len(tasks), self.chunksize):
+            futures.extend(self._submit_batch(tasks[i:i + self.chunksize]))
+        return [future.result() for future in futures]
+
+    def submit(self, a, seed):
+        """Schedule the evaluation of one animat.
+
+        Returns:
+            concurrent.futures.Future: A future for the result of
+            ``evaluate_genome``.
+        """
+        return self._submit_batch([make_task(a, seed)])[0]
+
+    def shutdown(self):
+        """Stop the workers and stop listening."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            for _, _, futures in self._pending:
+                for future in futures:
+                    future.cancel()
+            self._pending.clear()
+        self._wake()
+        self._dispatching.join()
+        # Unblock the accepting thread with a last connection.
+        try:
+            Client(self._listener.address, authkey=authkey()).close()
+        except OSError:
+            pass
+        self._accepting.join()
+        self._listener.close()
+
+
+def work(address):
+    """Evaluate animats for the broker at ``address`` until it stops.
+
+    ``address`` must be a loopback address unless ``PYANIMATS_AUTHKEY`` is
+    set.
+
+    Returns:
+        int: The number of animats evaluated.
+    """
+    conn = Client(check_address(address), authkey=authkey())
+    # The heartbeat is sent from another thread, so that it continues during
+    # long evaluations.
+    lock = threading.Lock()
+    stopped = threading.Event()
+
+    def heartbeat():
+        while not stopped.wait(HEARTBEAT_INTERVAL):
+            with lock:
+                try:
+                    conn.send(('heartbeat',))
+                except OSError:
+                    return
+
+    threading.Thread(target=heartbeat, daemon=True).start()
+    experiment, fitness_function = None, None
+    evaluated = 0
+    try:
+        while True:
+            try:
+                message = conn.recv()
+            except EOFError:
+                break
+            if message[0] == 'experiment':
+                experiment = message[1]
+                fitness_function = ExponentialMultiFitness(
+                    experiment.fitness_function,
+                    experiment.fitness_transform,
+                    experiment.fitness_ranges)
+            elif message[0] == 'evaluate':
+                _, batch_id, tasks = message
+                results = [run_task(task, experiment, fitness_function)
+                           for task in tasks]
+                evaluated += len(results)
+                with lock:
+                    conn.send(('result', batch_id, results))
+            elif message[0] == 'stop':
+                break
+    finally:
+        stopped.set()
+        with lock:
+            conn.close()
+    return evaluated
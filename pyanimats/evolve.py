@@ -8,6 +8,8 @@ import datetime
 import gzip
 import pickle
 import random
+from collections import OrderedDict, deque
+from concurrent.futures import FIRST_COMPLETED, wait
 from copy import deepcopy
 from time import perf_counter as timer
 
@@ -16,25 +18,54 @@ import numpy as np
 from deap import base, tools
 from munch import Munch
 
-from . import animat, c_animat, fitness_functions, utils, validate
-from .fitness_transforms import ExponentialMultiFitness
+from . import (animat, c_animat, delta, fitness_functions, selection,
+               snapshot, utils, validate)
+from .fitness_transforms import ExponentialMultiFitness, Surrogate
 from .animat import Animat
+from .cache import FitnessCache, phenotype_key
+from .checkpoint import CheckpointWriter
+from .constants import MINUTES
+from .distributed import Broker
+from .parallel import Evaluator
 from .experiment import Experiment
+from .genome_bank import GenomeBank
+from .logbook import StreamingLogbook, stream_file
 from .phylogeny import Phylogeny
-from .utils import rounder
+from .stats import POPULATION_HEADER, PopulationStats
+from .status import StatusWriter
+from .timing import PHASES, PhaseTimer
 
 
 class Evolution:
 
-    """An evolutionary simulation."""
+    """An evolutionary simulation.
 
-    def __init__(self, experiment, simulation):
+    Args:
+        experiment (Experiment): The experiment parameters.
+        simulation (dict): The simulation parameters.
+
+    Keyword Args:
+        population (Phylogeny): The population to start from, when restoring
+            an evolution. Defaults to a new population of ``popsize``
+            animats.
+    """
+
+    def __init__(self, experiment, simulation, population=None):
         self.version = utils.get_version()
         self.experiment = (experiment if isinstance(experiment, Experiment)
                            else Experiment(experiment))
-        self.simulation = Munch(validate.simulation(simulation))
+        self.simulation = Munch(validate.simulation(simulation,
+                                                     self.experiment))
         self.generation = 0
         self.elapsed = 0
+        # The best fitness recorded so far and the generation in which it was
+        # first reached, for detecting when evolution has stalled.
+        self.best_fitness = float('-inf')
+        self.best_generation = 0
+        # Why the last run stopped.
+        self.stop_reason = None
+        # The number of evaluations so far, for measuring throughput.
+        self.evaluations = 0
         # Get our own RNG.
         self.random = random.Random()
         # Seed the random number generators.
@@ -55,67 +86,461 @@ class Evolution:
         self.logbook.header = ['gen', 'fitness', 'game']
         self.logbook.chapters['fitness'].header = ['raw', 'exp']
         # Create initial population.
-        self.population = self.toolbox.population(n=self.experiment.popsize)
+        # Track the phylogeny of the population as it evolves.
+        if population is None:
+            population = Phylogeny(
+                self._initial_population(),
+                step=self.simulation.sample_interval,
+                keyframe_interval=self.simulation.keyframe_interval)
+        self.population = population
         # If we're using an expensive fitness function, then check if the TPM
-        # has changed before re-evaluating fitness (with cheap functions, like
-        # `nat`, it's actually more expensive to generate the TPM and check it)
+        # has changed before re-evaluating fitness when the phenotype's
+        # fingerprint has (with cheap functions, like `nat`, it's actually
+        # more expensive to generate the TPM and check it)
         self.CHECK_FOR_TPM_CHANGE = any(
             f not in fitness_functions.CHEAP
             for f in self.experiment.fitness_function)
+        # Get the selection scheme.
+        self.selection_scheme = selection.SCHEMES[self.experiment.selection]
+        # Time the phases of each generation.
+        self.timer = PhaseTimer()
         # Transform the fitness function.
         self.fitness_function = ExponentialMultiFitness(
             self.experiment.fitness_function,
             self.experiment.fitness_transform,
-            self.experiment.fitness_ranges)
-        # Create statistics trackers.
-        fitness_stats = tools.Statistics(
-            key=lambda a: (a.fitness, a.raw_fitness))
-        fitness_stats.register('raw', lambda x: rounder(max(x)[1]))
-        fitness_stats.register('exp', lambda x: rounder(max(x)[0]))
-        game_stats = tools.Statistics(key=lambda a: (a.fitness, a.correct))
-        game_stats.register('fittest', lambda x: max(x)[1])
-        game_stats.register('weakest', lambda x: min(x)[1])
-        # Initialize a MultiStatistics object for convenience that allows for
-        # only one call to `compile`.
-        self.mstats = tools.MultiStatistics(fitness=fitness_stats,
-                                            game=game_stats)
+            self.experiment.fitness_ranges,
+            timer=self.timer)
+        # Animats with the same phenotype have the same fitness, unless the
+        # agents or the fitness functions are stochastic.
+        self.DETERMINISTIC_FITNESS = (
+            self.experiment.deterministic and
+            self.experiment.noise_level == 0 and
+            not any(f in fitness_functions.STOCHASTIC
+                    for f in self.experiment.fitness_function))
+        # Evaluate each generation on a random subset of the trials, if
+        # enabled.
+        self.SUBSAMPLE_TRIALS = self.experiment.trial_fraction < 1
+        # The trials played in the current generation (all if ``None``).
+        self.trials = None
+        # Cache fitness values by phenotype, and evaluate each phenotype only
+        # once per generation, if fitness is deterministic. Fitness on a
+        # subset of trials depends on the subset, so it isn't cached.
+        self.USE_FITNESS_CACHE = (self.DETERMINISTIC_FITNESS and
+                                  not self.SUBSAMPLE_TRIALS and
+                                  self.simulation.fitness_cache_size > 0)
+        self.DEDUPLICATE = (self.DETERMINISTIC_FITNESS and
+                            self.simulation.deduplicate)
+        self.fitness_cache = FitnessCache(self.simulation.fitness_cache_size)
+        # Predict the fitness of offspring from cheap features, if enabled, to
+        # skip exact evaluation of the unpromising ones.
+        self.surrogate = Surrogate()
+        # Phenotype keys also depend on how fitness is computed.
+        self._phenotype_salt = repr(
+            (self.fitness_function, self.fitness_function.ranges)).encode()
+        # Evaluate in worker processes if requested (the pool is started when
+        # it's first needed).
+        self.evaluator = None
+        # Write checkpoints in the background.
+        self.checkpoint_writer = CheckpointWriter(
+            self.simulation.checkpoint_keep)
+        # Write a status file for monitoring, if enabled.
+        self.status_writer = self._status_writer()
+        if self.USE_FITNESS_CACHE:
+            self.logbook.header.append('cache')
+            self.logbook.chapters['cache'].header = ['hits', 'misses']
+        self._update_logbook_header()
+
+    def _initial_population(self):
+        """Return the initial animats, seeded from the genome bank if one is
+        given."""
+        popsize = self.experiment.popsize
+        if not self.experiment.init_genome_bank:
+            return self.toolbox.population(n=popsize)
+        genomes = GenomeBank(self.experiment.init_genome_bank).top(
+            self.experiment.init_genome_bank_top)
+        if not genomes:
+            raise ValueError('the genome bank `{}` is empty.'.format(
+                self.experiment.init_genome_bank))
+        return [Animat(self.experiment, genomes[i % len(genomes)])
+                for i in range(popsize)]
+
+    def phenotype_key(self, a):
+        """Return a key identifying the phenotype of an animat under this
+        evolution's fitness function."""
+        return phenotype_key(a.fingerprint, salt=self._phenotype_salt)
 
     def evaluate(self, population):
+        if self.SUBSAMPLE_TRIALS:
+            # Fitness on different trials isn't comparable, so the whole
+            # population is evaluated on this generation's trials.
+            for a in population:
+                a.trials = self.trials
+                a._dirty_fitness = True
         animats = [a for a in population if a._dirty_fitness]
+        if self.simulation.racing_budget and not self.DETERMINISTIC_FITNESS:
+            self._race(population, animats)
+            return
+        # Use cached fitness values where possible.
+        pending = []
+        for key, members in self._group(animats):
+            cached = (self.fitness_cache.get(key) if self.USE_FITNESS_CACHE
+                      else None)
+            if cached is None:
+                pending.append((key, members))
+            else:
+                _set_fitness(members, cached)
+        # Skip the phenotypes that the surrogate model predicts are
+        # unpromising.
+        contexts = None
+        if self.simulation.surrogate:
+            pending, features, predictions, contexts = self._screen(pending)
+        # Evaluate one representative of each remaining group and give every
+        # member its result.
+        results = self._evaluate([members[0] for key, members in pending],
+                                 contexts=contexts)
+        for (key, members), result in zip(pending, results):
+            if self.USE_FITNESS_CACHE:
+                self.fitness_cache.put(key, result)
+            _set_fitness(members, result)
+        # Train the surrogate model on the exact results.
+        if self.simulation.surrogate:
+            errors = []
+            for x, predicted, result in zip(features, predictions, results):
+                if x is not None:
+                    self.surrogate.update(x, result[0])
+                if predicted is not None:
+                    errors.append(abs(predicted - result[0]) / result[0])
+            self.surrogate.record(len(results), 0, errors)
+        # Don't let a prediction pass for the fittest animat.
+        self._confirm(population)
+
+    def _group(self, animats):
+        """Group animats by phenotype, if deduplicating, so that each
+        phenotype is only evaluated once.
+
+        Returns:
+            list(tuple): The phenotype key of each group (``None`` unless
+            it's needed for the fitness cache or deduplication) and its
+            members, in order of first appearance.
+        """
+        if self.USE_FITNESS_CACHE or self.DEDUPLICATE:
+            keys = [self.phenotype_key(a) for a in animats]
+        else:
+            keys = [None] * len(animats)
+        if not self.DEDUPLICATE:
+            return [(key, [a]) for key, a in zip(keys, animats)]
+        groups = OrderedDict()
+        for key, a in zip(keys, animats):
+            groups.setdefault(key, []).append(a)
+        return list(groups.items())
+
+    def _screen(self, pending):
+        """Predict the fitness of the phenotypes awaiting evaluation, and give
+        the predicted fitness to those that needn't be evaluated exactly.
+
+        The phenotypes predicted to rank in the top ``surrogate_fraction`` are
+        evaluated exactly, as is a random sample of the others (so that the
+        model keeps being checked), and so are animats without a parent,
+        whose features are unknown. Animats given a predicted fitness keep
+        their parent's raw fitness, and are marked as predicted.
+
+        Returns:
+            tuple: The phenotypes to evaluate exactly, their features (or
+            ``None`` if unknown), their predicted fitness (or ``None`` during
+            the surrogate's warm-up), and what to evaluate each of them in
+            (see ``_features``).
+        """
+        s = self.simulation
+        representatives = [members[0] for key, members in pending]
+        known = [i for i, a in enumerate(representatives)
+                 if a.parent is not None]
+        features = [None] * len(pending)
+        contexts = list(representatives)
+        for i, x, context in zip(known, *self._features(
+                [representatives[i] for i in known])):
+            features[i], contexts[i] = x, context
+        predictions = [None] * len(pending)
+        if self.surrogate.num_samples < s.surrogate_warmup or not known:
+            return pending, features, predictions, contexts
+        for i, predicted in zip(known, self.surrogate.predict(
+                [features[i] for i in known])):
+            predictions[i] = float(predicted)
+        ranked = sorted(known, key=lambda i: predictions[i], reverse=True)
+        num_top = int(np.ceil(s.surrogate_fraction * len(known)))
+        exact = set(range(len(pending))) - set(known)
+        exact.update(ranked[:num_top])
+        for i in ranked[num_top:]:
+            if self.random.random() < s.surrogate_exploration:
+                exact.add(i)
+        for i in set(known) - exact:
+            key, members = pending[i]
+            a = members[0]
+            _set_fitness(members, (predictions[i], a.parent.raw_fitness,
+                                   a.correct, a.incorrect), predicted=True)
+        self.surrogate.record(0, len(pending) - len(exact))
+        exact = sorted(exact)
+        return tuple([values[i] for i in exact]
+                     for values in (pending, features, predictions, contexts))
+
+    def _features(self, animats):
+        """Compute the features of animats for the surrogate model, where
+        they'd be evaluated.
+
+        In this process, the game is played in each animat's evaluation
+        context, which is returned so that evaluating the animat in it doesn't
+        play the game again. In worker processes, the animats are returned
+        instead; their game is played again if they're evaluated, since that's
+        cheaper than sending it back and forth.
+
+        Returns:
+            tuple(list): The features of each animat, and what to evaluate it
+            in.
+        """
+        if not animats:
+            return [], []
+        if self._evaluates_locally():
+            contexts = [fitness_functions.context(a) for a in animats]
+            return [Surrogate.features(c) for c in contexts], contexts
+        self._start_evaluator()
+        seeds = [self.random.randrange(2**31) for a in animats]
+        features = []
+        for a, (x, correct, incorrect) in zip(
+                animats, self.evaluator.map(animats, seeds, features=True)):
+            a._correct, a._incorrect = correct, incorrect
+            features.append(x + Surrogate.parent_features(a))
+        return features, animats
+
+    def _confirm(self, population):
+        """Evaluate exactly the animats whose predicted fitness is above the
+        best exact fitness in the population.
+
+        Afterwards, the fittest animat has exact fitness, so predictions are
+        never recorded or reported as the best fitness, and never stop
+        evolution early.
+        """
+        exact = [a.fitness for a in population if not a._predicted]
+        threshold = max(exact) if exact else float('-inf')
+        animats = [a for a in population
+                   if a._predicted and a.fitness >= threshold]
+        if not animats:
+            return
+        groups = self._group(animats)
+        results = self._evaluate([members[0] for key, members in groups])
+        errors = []
+        for (key, members), result in zip(groups, results):
+            errors.append(abs(members[0].fitness - result[0]) / result[0])
+            if self.USE_FITNESS_CACHE:
+                self.fitness_cache.put(key, result)
+            _set_fitness(members, result)
+        self.surrogate.record(len(results), 0, errors)
+
+    def _race(self, population, animats):
+        """Evaluate ``animats``, the new members of ``population``, several
+        times each, spending extra evaluations where the outcome of selection
+        is uncertain.
+
+        After ``racing_initial`` evaluations each, an animat is still racing
+        if the confidence interval of its mean fitness contains the mean
+        fitness of the population, i.e., if it's unclear whether selection
+        should favor it. Racing animats get one more evaluation per round,
+        those closest to the threshold first, until none is racing or
+        ``racing_budget`` extra evaluations have been spent.
+        """
+        s = self.simulation
+        samples = [[] for a in animats]
+
+        def play(indices):
+            results = self._evaluate([animats[i] for i in indices])
+            for i, result in zip(indices, results):
+                samples[i].append(result)
+
+        play([i for i in range(len(animats)) for _ in range(s.racing_initial)])
+        # Animats that weren't re-evaluated count towards the threshold with
+        # their current fitness.
+        fixed = [a.fitness for a in population if not a._dirty_fitness]
+        budget = s.racing_budget
+        while budget > 0 and animats:
+            fitness = [np.array([result[0] for result in results])
+                       for results in samples]
+            means = np.array([f.mean() for f in fitness])
+            errors = np.array([f.std(ddof=1) / np.sqrt(len(f))
+                               for f in fitness])
+            threshold = np.concatenate([means, fixed]).mean()
+            # Distance to the threshold, in standard errors.
+            with np.errstate(divide='ignore', invalid='ignore'):
+                margins = np.abs(means - threshold) / errors
+            racing = np.flatnonzero(margins < s.racing_z)
+            if not racing.size:
+                break
+            racing = racing[np.argsort(margins[racing])][:budget]
+            budget -= len(racing)
+            play(racing.tolist())
+        for a, results in zip(animats, samples):
+            _set_fitness([a], _mean_result(results))
+
+    def _draw_trials(self, gen):
+        """Draw the trials played by the animats evaluated in generation
+        ``gen``, if subsampling trials.
+
+        The fraction of trials played is ``trial_fraction`` throughout with
+        the ``constant`` schedule, or grows linearly from ``trial_fraction``
+        to 1 over ``ngen`` generations with the ``linear`` schedule.
+        """
+        if not self.SUBSAMPLE_TRIALS:
+            return
+        fraction = self.experiment.trial_fraction
+        if self.experiment.trial_schedule == 'linear':
+            fraction += (1 - fraction) * min(gen / self.simulation.ngen, 1)
+        num_trials = self.experiment.num_trials
+        k = max(1, int(round(fraction * num_trials)))
+        self.trials = (None if k == num_trials else
+                       sorted(self.random.sample(range(num_trials), k)))
+
+    def rescore(self):
+        """Re-evaluate the population, and the lineages that are output, on
+        every trial.
+
+        With trial subsampling, fitness depends on the trials drawn in each
+        generation; this makes the final results comparable.
+        """
+        population = list(self.population)
+        self._rescore(population)
+        if self.simulation.all_lineages:
+            lineages = population
+        else:
+            lineages = [max(population, key=lambda a: a.fitness)]
+        done = set(map(id, population))
+        ancestors = OrderedDict()
+        for a in lineages:
+            for ancestor in a.lineage(step=self.simulation.sample_interval):
+                if id(ancestor) not in done:
+                    ancestors[id(ancestor)] = ancestor
+        self._rescore(list(ancestors.values()))
+
+    def _rescore(self, animats):
         for a in animats:
-            a.fitness, a.raw_fitness = self.fitness_function(a)
+            a.trials = None
+        for a, result in zip(animats, self._evaluate(animats)):
+            _set_fitness([a], result)
+
+    def _evaluates_locally(self):
+        """Return whether animats are evaluated in this process."""
+        return self.simulation.num_workers <= 1 and not self.simulation.broker
+
+    def _evaluate(self, animats, contexts=None):
+        """Evaluate animats, in worker processes if enabled.
+
+        Keyword Args:
+            contexts (list): What to evaluate each animat in, when evaluating
+                in this process: the animat itself or its evaluation context.
+                Defaults to the animats.
+
+        Returns:
+            list(tuple): The fitness, raw fitness, and numbers of correct and
+            incorrect trials of each animat.
+        """
+        # Don't start workers when there's nothing to evaluate, e.g. when
+        # every phenotype was cached.
+        if not animats:
+            return []
+        self.evaluations += len(animats)
+        if self._evaluates_locally():
+            results = []
+            for a, ind in zip(animats, contexts or animats):
+                a.fitness, a.raw_fitness = self.fitness_function(ind)
+                results.append((a.fitness, a.raw_fitness, a.correct,
+                                a.incorrect))
+            return results
+        self._start_evaluator()
+        seeds = [self.random.randrange(2**31) for a in animats]
+        return self.evaluator.map(animats, seeds)
+
+    def _start_evaluator(self):
+        """Start the worker processes, or the broker for remote workers, if
+        they aren't running yet."""
+        if self.evaluator is not None:
+            return
+        if self.simulation.broker:
+            self.evaluator = Broker(self.experiment, self.simulation.broker)
+            print('[Seed {}]\tListening for workers at `{}`.'.format(
+                self.experiment.rng_seed, self.evaluator.address))
+        else:
+            self.evaluator = Evaluator(self.experiment,
+                                       self.simulation.num_workers)
+
+    def shutdown(self):
+        """Stop the worker processes or the broker, if any."""
+        if self.evaluator is not None:
+            self.evaluator.shutdown()
+            self.evaluator = None
+
+    def _update_logbook_header(self):
+        # Only show the detailed statistics if they're being recorded.
+        if (self.simulation.population_stats and
+                'population' not in self.logbook.header):
+            self.logbook.header.append('population')
+            self.logbook.chapters['population'].header = POPULATION_HEADER
+        if (self.simulation.surrogate and
+                'surrogate' not in self.logbook.header):
+            self.logbook.header.append('surrogate')
+            self.logbook.chapters['surrogate'].header = ['exact', 'predicted',
+                                                         'error']
+        if self.simulation.phase_timing and 'time' not in self.logbook.header:
+            self.logbook.header.append('time')
+            self.logbook.chapters['time'].header = self._time_header()
+
+    def _time_header(self):
+        """Return the phases timed in the ``time`` chapter of the logbook,
+        including each fitness function."""
+        return PHASES + [f.__name__ for f in self.fitness_function.functions]
 
     def update_simulation(self, opts):
         self.simulation.update(opts)
         # TODO don't change user-set stuff
-        self.simulation = validate.simulation(self.simulation)
+        self.simulation = validate.simulation(self.simulation, self.experiment)
+        self.fitness_cache.maxsize = self.simulation.fitness_cache_size
+        self.checkpoint_writer.keep = self.simulation.checkpoint_keep
+        self.population.step = self.simulation.sample_interval
+        self.population.keyframe_interval = self.simulation.keyframe_interval
+        if isinstance(self.logbook, StreamingLogbook):
+            self.logbook.tail = self.simulation.logbook_tail
+        self.status_writer = self._status_writer()
+        self._update_logbook_header()
+
+    def _status_writer(self):
+        if not self.simulation.status_file:
+            return None
+        return StatusWriter(self.simulation.status_file,
+                            interval=self.simulation.status_file_interval)
 
     def __getstate__(self):
         # Copy the instance attributes.
         state = self.__dict__.copy()
         # Remove unpicklable attributes.
-        del state['mstats']
         del state['fitness_function']
-        # Save the population as a Phylogeny to recover lineages later.
-        state['population'] = Phylogeny(state['population'],
-                                        step=self.simulation.sample_interval)
+        del state['fitness_cache']
+        del state['evaluator']
+        del state['checkpoint_writer']
+        del state['status_writer']
+        del state['timer']
         return state
 
     def __setstate__(self, state):
-        # Convert the Phylogeny back to a normal list.
-        state['population'] = list(state['population'])
         # Re-initialize references to our RNG on the animats.
         for a in state['population']:
             a.random = state['random']
-        # Initialize from the saved experiment and simulation.
-        self.__init__(state['experiment'], state['simulation'])
+        # Initialize from the saved experiment and simulation (without
+        # creating a new population just to replace it).
+        self.__init__(state['experiment'], state['simulation'],
+                      population=state['population'])
         # Update with the saved state.
         self.__dict__.update(state)
 
     def select(self, animats, k):
         """Select *k* animats from a list of animats.
 
-        Uses fitness-proportionate selection.
+        Uses fitness-proportionate selection, with the scheme given by the
+        ``selection`` experiment parameter (see ``selection.SCHEMES``).
 
         Args:
             animats (Iterable): The population of animats to select from.
@@ -124,59 +549,263 @@ class Evolution:
         Returns
             list: The selected animats.
         """
-        max_fitness = max(animat.fitness for animat in animats)
-        chosen = []
-        for i in range(k):
-            done = False
-            while not done:
-                candidate = self.random.choice(animats)
-                done = self.random.random() <= (candidate.fitness /
-                                                max_fitness)
-            chosen.append(candidate)
-        return chosen
+        fitnesses = np.fromiter((a.fitness for a in animats), dtype=float,
+                                count=len(animats))
+        chosen = self.selection_scheme(fitnesses, k, self.random)
+        return [animats[i] for i in chosen]
+
+    def fittest(self, k):
+        """Return the *k* fittest animats in the population."""
+        return sorted(self.population, key=lambda a: a.fitness,
+                      reverse=True)[:k]
+
+    def immigrate(self, animats):
+        """Replace the weakest animats in the population with *animats*.
+
+        Immigrants keep their fitness (they were evaluated under the same
+        experiment) but begin a new lineage in this population.
+        """
+        k = min(len(animats), len(self.population))
+        weakest = sorted(range(len(self.population)),
+                         key=lambda i: self.population[i].fitness)[:k]
+        for i, a in zip(weakest, animats):
+            a.random = self.random
+            a.parent = None
+            a.gen = self.generation
+            self.population[i] = a
 
     def print_status(self, line, elapsed):
         """Print a status uptdate to the screen."""
-        print('[Seed {}]\t{}{}'.format(self.experiment.rng_seed, line,
-                                       utils.compress(elapsed)))
+        print('[Seed {}]\t{}\t{}'.format(self.experiment.rng_seed, line,
+                                         utils.compress(elapsed)))
 
     def record(self, population, gen):
         if gen % self.simulation.logbook_interval == 0:
-            record = self.mstats.compile(population)
+            with self.timer.phase('record'):
+                record = PopulationStats(
+                    population, detailed=self.simulation.population_stats
+                ).compile()
+                if self.USE_FITNESS_CACHE:
+                    record['cache'] = self.fitness_cache.reset_stats()
+                if self.simulation.surrogate:
+                    record['surrogate'] = self.surrogate.reset_stats()
+            # Record the time spent in each phase since the last record
+            # (the time spent recording this one is counted in the next).
+            if self.simulation.phase_timing:
+                record['time'] = dict.fromkeys(self._time_header(), 0.0)
+                record['time'].update(self.timer.reset())
             self.logbook.record(gen=gen, **record)
+            if record['fitness']['exp'] > self.best_fitness:
+                self.best_fitness = record['fitness']['exp']
+                self.best_generation = gen
+
+    def _vary(self, a, parent, gen):
+        """Turn ``a``, a clone of ``parent``, into its offspring in generation
+        ``gen``."""
+        # Use our RNG.
+        a.random = self.random
+        # Update parent reference.
+        a.parent = parent
+        # Update generation number.
+        a.gen = gen
+        # Mutate.
+        with self.timer.phase('mutate'):
+            a.mutate()
+        # Check whether fitness needs updating. If fitness is deterministic,
+        # mutations that leave the gates unchanged are caught by comparing
+        # fingerprints, which is cheap; otherwise the TPMs are compared (if
+        # desired and CM is nontrivial).
+        with self.timer.phase('check'):
+            if (self.DETERMINISTIC_FITNESS and
+                    a.fingerprint == parent.fingerprint):
+                a._dirty_fitness = False
+            elif self.CHECK_FOR_TPM_CHANGE and not a.cm.sum() == 0:
+                a._dirty_fitness = not np.array_equal(a.tpm, parent.tpm)
+            else:
+                a._dirty_fitness = True
 
     def new_gen(self, population, gen):
         # Update generation number.
         self.generation = gen
+        self._draw_trials(gen)
         # Selection.
-        population = self.select(population, len(population))
+        with self.timer.phase('select'):
+            population = self.select(population, len(population))
         # Cloning.
         # TODO: why does directly cloning the population prevent evolution?!
-        offspring = [deepcopy(x) for x in population]
+        with self.timer.phase('clone'):
+            offspring = [deepcopy(x) for x in population]
         # Variation.
         for i, a in enumerate(offspring):
-            # Use our RNG.
-            a.random = self.random
-            # Update parent reference.
-            a.parent = population[i]
-            # Update generation number.
-            a.gen = gen
-            # Mutate.
-            a.mutate()
-            # Check whether fitness needs updating (if desired and CM is
-            # nontrivial).
-            if self.CHECK_FOR_TPM_CHANGE and not a.cm.sum() == 0:
-                a._dirty_fitness = not np.array_equal(a.tpm, a.parent.tpm)
-            else:
-                a._dirty_fitness = True
+            self._vary(a, population[i], gen)
         # Evaluation.
-        self.evaluate(offspring)
+        with self.timer.phase('evaluate'):
+            self.evaluate(offspring)
         # Recording.
         self.record(offspring, gen)
         return offspring
 
-    def run(self, checkpoint_file, ngen=None):
-        """Evolve."""
+    def save_rng_states(self):
+        """Store the current RNG states so that evolution resumes where it
+        left off."""
+        self.python_rng_state = self.random.getstate()
+        self.c_rng_state = c_animat.get_rng_state()
+
+    def checkpoint(self, checkpoint_file, block=True):
+        """Pickle the evolution to ``checkpoint_file``, or write a snapshot if
+        its name ends in ``.npz`` (see ``snapshot``).
+
+        Keyword Args:
+            block (bool): Whether to wait until the checkpoint is written.
+                Otherwise it is compressed and written in the background,
+                while evolution continues.
+        """
+        self.save_rng_states()
+        if snapshot.is_snapshot(checkpoint_file):
+            self.checkpoint_writer.write(snapshot.dumps(self),
+                                         checkpoint_file, compress=False)
+        else:
+            self.checkpoint_writer.write(pickle.dumps(self), checkpoint_file)
+        if block:
+            self.checkpoint_writer.wait()
+
+    def _initialize(self):
+        """Prepare and evaluate the initial population."""
+        # Inject start codons.
+        if self.experiment.init_start_codons:
+            for a in self.population:
+                a.inject_start_codons(self.experiment.init_start_codons)
+
+        # Initial evaluation
+        self._draw_trials(self.generation)
+        with self.timer.phase('evaluate'):
+            self.evaluate(self.population)
+        self.record(self.population, self.generation)
+
+        # Print first lines of the logbook.
+        if 0 < self.simulation.status_interval < float('inf'):
+            first_lines = str(self.logbook).split('\n')
+            header_lines = [
+                '[Seed {}]\t{}'.format(self.experiment.rng_seed, l)
+                for l in first_lines[:-1]]
+            print('\n' + '\n'.join(header_lines))
+
+        # Print initial status
+        self.print_status(self.logbook.__str__(startindex=-1), 0)
+
+    def _report(self, checkpoint_file, clock):
+        """Print the status and save a checkpoint, if it's time to.
+
+        ``clock`` holds the times of the last status and the last checkpoint.
+        """
+        # Reporting.
+        if self.generation % self.simulation.status_interval == 0:
+            # Get time since last report was printed.
+            elapsed_since_last_status = timer() - clock['status']
+            self.print_status(self.logbook.__str__(startindex=-1),
+                              elapsed_since_last_status)
+            clock['status'] = timer()
+        # Checkpointing.
+        elapsed_since_last_checkpoint = timer() - clock['checkpoint']
+        if (elapsed_since_last_checkpoint >=
+                self.simulation.checkpoint_interval):
+            print('[Seed {}] Saving checkpoint to `{}` in the '
+                  'background.'.format(self.experiment.rng_seed,
+                                       checkpoint_file))
+            self.elapsed += timer() - clock['checkpoint']
+            with self.timer.phase('checkpoint'):
+                self.checkpoint(checkpoint_file, block=False)
+            clock['checkpoint'] = timer()
+        # Monitoring.
+        if self.status_writer is not None and self.status_writer.due():
+            self.status_writer.write(self.status(clock))
+
+    def status(self, clock=None):
+        """Return the progress of the evolution, as written to the status
+        file.
+
+        ``clock`` holds the times of the last status and the last checkpoint,
+        while running.
+        """
+        fitness = np.fromiter((a.fitness for a in self.population),
+                              dtype=float, count=len(self.population))
+        status = {
+            'seed': self.experiment.rng_seed,
+            'generation': self.generation,
+            'ngen': self.simulation.ngen,
+            'evaluations': self.evaluations,
+            'elapsed': round(self.elapsed, 2),
+            'best_fitness': self.best_fitness,
+            'best_generation': self.best_generation,
+            'mean_fitness': float(fitness.mean()),
+            'max_fitness': float(fitness.max()),
+            'stop_reason': self.stop_reason,
+            'next_checkpoint': None,
+            'cache_hit_rate': None,
+        }
+        if clock is not None:
+            status['elapsed'] = round(
+                self.elapsed + timer() - clock['checkpoint'], 2)
+            if self.simulation.checkpoint_interval < float('inf'):
+                status['next_checkpoint'] = round(max(
+                    0, clock['checkpoint'] +
+                    self.simulation.checkpoint_interval - timer()), 2)
+        # Use the hit rate since the last logbook record.
+        if self.USE_FITNESS_CACHE and self.logbook.chapters['cache']:
+            cache = self.logbook.chapters['cache'][-1]
+            lookups = cache['hits'] + cache['misses']
+            if lookups:
+                status['cache_hit_rate'] = round(cache['hits'] / lookups, 4)
+        # JSON has no infinite values.
+        if status['best_fitness'] == float('-inf'):
+            status['best_fitness'] = None
+        return status
+
+    def _check_stop(self, clock):
+        """Return whether to stop before ``ngen`` generations, recording the
+        reason in ``stop_reason``.
+
+        The criteria are checked against the most recent logbook record, so
+        this is cheap enough to do every generation.
+        """
+        s = self.simulation
+        fitness = self.logbook.chapters['fitness'][-1]['exp']
+        # This counts the whole game even when subsampling trials, so it can
+        # reach `target_correct`.
+        correct = self.logbook.chapters['game'][-1]['fittest']
+        elapsed = self.elapsed + timer() - clock['checkpoint']
+        if s.target_fitness is not None and fitness >= s.target_fitness:
+            self.stop_reason = 'target_fitness'
+        elif s.target_correct is not None and correct >= s.target_correct:
+            self.stop_reason = 'target_correct'
+        elif s.patience and self.generation - self.best_generation >= \
+                s.patience:
+            self.stop_reason = 'patience'
+        elif s.time_budget and elapsed >= s.time_budget * MINUTES:
+            self.stop_reason = 'time_budget'
+        else:
+            return False
+        print('[Seed {}]\tStopping early at generation {} ({}).'.format(
+            self.experiment.rng_seed, self.generation, self.stop_reason))
+        return True
+
+    def run(self, checkpoint_file, ngen=None, final_checkpoint=True,
+            early_stopping=True, rescore=True):
+        """Evolve.
+
+        Args:
+            checkpoint_file (str): The path where checkpoints are saved.
+
+        Keyword Args:
+            ngen (int): Simulate up to this generation. Defaults to
+                ``simulation.ngen``.
+            final_checkpoint (bool): Whether to save a checkpoint once the
+                last generation has been simulated.
+            early_stopping (bool): Whether to stop before ``ngen`` if one of
+                the stopping criteria of the simulation is met.
+            rescore (bool): Whether to re-evaluate the final animats on every
+                trial when subsampling trials (see ``rescore``).
+        """
         if ngen is None:
             ngen = self.simulation.ngen
         # Get the range of generations to simulate.
@@ -189,89 +818,208 @@ class Evolution:
         self.random.setstate(self.python_rng_state)
         c_animat.set_rng_state(self.c_rng_state)
 
+        # Stream the logbook to disk, if enabled, starting with the records
+        # it already has.
+        if (self.simulation.stream_logbook and
+                not isinstance(self.logbook, StreamingLogbook)):
+            self.logbook = StreamingLogbook.from_logbook(
+                self.logbook, stream_file(checkpoint_file),
+                tail=self.simulation.logbook_tail)
+
         if self.generation == 0:
-            # Inject start codons.
-            if self.experiment.init_start_codons:
-                for a in self.population:
-                    a.inject_start_codons(self.experiment.init_start_codons)
+            self._initialize()
 
-            # Initial evaluation
-            self.evaluate(self.population)
-            self.record(self.population, self.generation)
-
-            # Print first lines of the logbook.
-            if 0 < self.simulation.status_interval < float('inf'):
-                first_lines = str(self.logbook).split('\n')
-                header_lines = [
-                    '[Seed {}]\t{}'.format(self.experiment.rng_seed, l)
-                    for l in first_lines[:-1]]
-                print('\n' + '\n'.join(header_lines))
-
-            # Print initial status
-            self.print_status(self.logbook.__str__(startindex=-1), 0)
-
-        last_status, last_checkpoint = [timer()] * 2
-
-        for gen in generations:
-            self.generation = gen
-            # Evolution.
-            self.population = self.new_gen(self.population, gen)
-            # Reporting.
-            if gen % self.simulation.status_interval == 0:
-                # Get time since last report was printed.
-                elapsed_since_last_status = timer() - last_status
-                self.print_status(self.logbook.__str__(startindex=-1),
-                                  elapsed_since_last_status)
-                last_status = timer()
-            # Checkpointing.
-            elapsed_since_last_checkpoint = timer() - last_checkpoint
-            if (elapsed_since_last_checkpoint >=
-                    self.simulation.checkpoint_interval):
-                print('[Seed {}] Saving checkpoint to `{}`... '.format(
-                    self.experiment.rng_seed, checkpoint_file),
-                    end='', flush=True)
-                self.elapsed += timer() - last_checkpoint
-                with gzip.open(checkpoint_file, 'wb') as f:
-                    pickle.dump(self, f)
-                last_checkpoint = timer()
-                print('done.')
-
-        self.elapsed += timer() - last_checkpoint
-
-        # Save final checkpoint.
-        print('[Seed {}]\tSaving final checkpoint to `{}`... '.format(
-            self.experiment.rng_seed, checkpoint_file),
-            end='', flush=True)
-        with gzip.open(checkpoint_file, 'wb') as f:
-            pickle.dump(self, f)
-        print('done.\n')
+        clock = dict.fromkeys(['status', 'checkpoint'], timer())
+        self.stop_reason = None
+
+        if self.simulation.steady_state:
+            self._run_steady_state(checkpoint_file, ngen, clock,
+                                   early_stopping)
+        else:
+            for gen in generations:
+                self.generation = gen
+                # Evolution.
+                self.population[:] = self.new_gen(self.population, gen)
+                self._report(checkpoint_file, clock)
+                if early_stopping and self._check_stop(clock):
+                    break
+        if self.stop_reason is None:
+            self.stop_reason = 'ngen'
+
+        self.elapsed += timer() - clock['checkpoint']
+        self.save_rng_states()
+        # Make sure the last checkpoint is on disk.
+        self.checkpoint_writer.wait()
+
+        if final_checkpoint:
+            print('[Seed {}]\tSaving final checkpoint to `{}`... '.format(
+                self.experiment.rng_seed, checkpoint_file),
+                end='', flush=True)
+            self.checkpoint(checkpoint_file)
+            print('done.\n')
+
+        # Rescore after the checkpoint, so that a resumed evolution selects
+        # from the same fitness values as one that wasn't interrupted.
+        if rescore and self.SUBSAMPLE_TRIALS:
+            self.rescore()
+        self.shutdown()
+        if self.status_writer is not None:
+            self.status_writer.write(self.status())
 
         return self.elapsed
 
+    def _run_steady_state(self, checkpoint_file, ngen, clock,
+                          early_stopping):
+        """Evolve asynchronously, without waiting for whole generations.
+
+        Offspring are evaluated in worker processes. As soon as an evaluation
+        finishes, the offspring replaces the oldest animat in the population
+        and a new offspring is submitted in its place, so that workers never
+        wait for slow evaluations of other animats. Every ``popsize``
+        insertions count as one generation for recording, reporting, and
+        checkpointing.
+
+        Since the order in which evaluations finish varies, runs in this mode
+        are not reproducible. Trials can't be subsampled in this mode (see
+        ``validate.simulation``), since the animats in the population are
+        never re-evaluated together.
+        """
+        popsize = len(self.population)
+        self._start_evaluator()
+        # Keep a few more evaluations queued than there are workers, so that
+        # workers don't wait for the next offspring to be submitted. (With
+        # remote workers, ``num_workers`` is the number expected.)
+        capacity = 2 * self.simulation.num_workers
+        # Offspring submitted for evaluation, and offspring ready to insert.
+        in_flight, ready = {}, deque()
+
+        def spawn():
+            with self.timer.phase('select'):
+                parent = self.select(self.population, 1)[0]
+            with self.timer.phase('clone'):
+                child = deepcopy(parent)
+            self._vary(child, parent, self.generation + 1)
+            key = None
+            if child._dirty_fitness and self.USE_FITNESS_CACHE:
+                key = self.phenotype_key(child)
+                cached = self.fitness_cache.get(key)
+                if cached is not None:
+                    _set_fitness([child], cached)
+                    child._dirty_fitness = False
+            if not child._dirty_fitness:
+                ready.append(child)
+                return
+            future = self.evaluator.submit(child, self.random.randrange(2**31))
+            self.evaluations += 1
+            in_flight[future] = (child, key)
+
+        births = 0
+        try:
+            while self.generation < ngen and self.stop_reason is None:
+                # Keep the workers busy.
+                while len(in_flight) < capacity and not ready:
+                    spawn()
+                if not ready:
+                    with self.timer.phase('evaluate'):
+                        done, _ = wait(in_flight,
+                                       return_when=FIRST_COMPLETED)
+                    for future in done:
+                        child, key = in_flight.pop(future)
+                        result = future.result()
+                        if self.USE_FITNESS_CACHE:
+                            self.fitness_cache.put(key, result)
+                        _set_fitness([child], result)
+                        ready.append(child)
+                # Insert finished offspring in place of the oldest animats.
+                while (ready and self.generation < ngen and
+                       self.stop_reason is None):
+                    self.population.pop(0)
+                    self.population.append(ready.popleft())
+                    births += 1
+                    if births == popsize:
+                        births = 0
+                        self.generation += 1
+                        self.record(self.population, self.generation)
+                        self._report(checkpoint_file, clock)
+                        if early_stopping:
+                            self._check_stop(clock)
+        finally:
+            # Discard unfinished evaluations.
+            for future in in_flight:
+                future.cancel()
+
     def serializable(self, all_lineages=None):
         if all_lineages is None:
             all_lineages = self.simulation.all_lineages
         # Get the lineage(s).
+        step = self.simulation.sample_interval
+        keyframe_interval = self.simulation.keyframe_interval
         if not all_lineages:
             fittest = max(self.population, key=lambda a: a.fitness)
-            lineage = fittest.lineage(step=self.simulation.sample_interval)
+            lineage = delta.encode_lineage(fittest.lineage(step=step),
+                                           keyframe_interval)
         else:
-            lineage = [a.lineage(step=self.simulation.sample_interval)
+            lineage = [delta.encode_lineage(a.lineage(step=step),
+                                            keyframe_interval)
                        for a in self.population]
+        # Only the last records of a streamed logbook are in memory.
+        logbook = self.logbook
+        if isinstance(logbook, StreamingLogbook):
+            logbook = logbook.read()
         # Set up the serializable object.
-        return {
+        d = {
             'experiment': self.experiment,
             'simulation': self.simulation,
             'lineage': lineage,
             'logbook': {
-                'fitness': self.logbook.chapters['fitness'].select('exp'),
-                'raw_fitness': self.logbook.chapters['fitness'].select('raw'),
-                'game': self.logbook.chapters['game'].select('fittest'),
+                'fitness': logbook.chapters['fitness'].select('exp'),
+                'raw_fitness': logbook.chapters['fitness'].select('raw'),
+                'game': logbook.chapters['game'].select('fittest'),
             },
+            'generation': self.generation,
+            'stop_reason': self.stop_reason,
             'elapsed': round(self.elapsed, 2),
             'version': utils.get_version(),
             'time': datetime.datetime.now().isoformat(),
         }
+        if self.simulation.population_stats:
+            d['logbook']['population'] = list(logbook.chapters['population'])
+        if self.simulation.phase_timing:
+            d['logbook']['time'] = list(logbook.chapters['time'])
+        if self.simulation.surrogate:
+            d['logbook']['surrogate'] = list(logbook.chapters['surrogate'])
+        return d
+
+
+def _mean_result(results):
+    """Return the mean of several evaluation results of the same animat."""
+    fitness, raw_fitness, correct, incorrect = zip(*results)
+    # Average each raw fitness value separately, since multivalued fitness
+    # functions give tuples.
+    return (float(np.mean(fitness)),
+            tuple(np.mean(values, axis=0).tolist()
+                  for values in zip(*raw_fitness)),
+            int(round(np.mean(correct))),
+            int(round(np.mean(incorrect))))
+
+
+def _set_fitness(animats, result, predicted=False):
+    """Set the fitness data of ``animats`` from an evaluation result, or from
+    a prediction of the surrogate model if ``predicted``."""
+    for a in animats:
+        a.fitness, a.raw_fitness, a._correct, a._incorrect = result
+        a._predicted = predicted
+
+
+def load_checkpoint(path):
+    """Load an evolution from a checkpoint, either a snapshot or a gzipped
+    pickle."""
+    if snapshot.is_snapshot_file(path):
+        evolution = Evolution.__new__(Evolution)
+        evolution.__setstate__(snapshot.load(path))
+        return evolution
+    with gzip.open(path, 'rb') as f:
+        return pickle.load(f)
 
 
 def from_json(d):
@@ -280,7 +1028,12 @@ def from_json(d):
     d.simulation = Munch(d.simulation)
     d.experiment = Experiment(d.experiment)
     d.time = dateutil.parser.parse(d.time)
+    # Restore each island separately if this is an island-model evolution.
+    if 'islands' in d:
+        d.islands = [from_json(island) for island in d.islands]
+        return d
     # Restore population
+    delta.decode_lineage(d['lineage'])
     lineage = list(
         map(lambda a: animat.from_json(a, experiment=d['experiment']),
             d['lineage']))
@@ -2,9 +2,11 @@
 # -*- coding: utf-8 -*-
 # experiment.py
 
+import functools
 import os
 import pickle
 import pprint
+from collections import namedtuple
 from copy import deepcopy
 
 import pyphi
@@ -27,6 +29,10 @@ class Experiment(Munch):
     and are not printed. See ``experiment._derived.keys()`` for a list of
     these.
 
+    All parameters, including derived ones, are also available as fields of
+    the immutable ``params`` struct, which is much faster to access; it's
+    built once, upon initialization.
+
     Keyword Args:
         filepath (string): A file path pointing to a YAML file containing
             experiment parameters.
@@ -50,6 +56,9 @@ class Experiment(Munch):
         dictionary['_derived'] = _derive_params(dictionary)
         # Put everything in the Munch.
         self.update(dictionary)
+        # Bind the parameters to a struct. This is set as an ordinary
+        # attribute rather than a key, so that it isn't serialized.
+        object.__setattr__(self, 'params', _params(dictionary))
 
     def __getstate__(self):
         return self.serializable()
@@ -91,17 +100,20 @@ def load(filepath):
         return Experiment(yaml.load(f)['experiment'])
 
 
+def _params(d):
+    """Return an immutable struct of the parameters in ``d``, including the
+    derived ones (user-set parameters take precedence)."""
+    params = dict(d['_derived'])
+    params.update((k, v) for k, v in d.items() if k != '_derived')
+    return namedtuple('Params', sorted(params))(**params)
+
+
 def _derive_params(d):
     """Derive various secondary parameters from the given dictionary."""
     num_nodes = d['num_sensors'] + d['num_hidden'] + d['num_motors']
     # Load initial genome if provided.
     if d['init_genome_path']:
-        path = os.path.join(d['init_genome_path'], 'lineages.pkl')
-        with open(path, 'rb') as f:
-            lineages = pickle.load(f)
-            # Use the genome of the best individual of the most recent
-            # generation.
-            init_genome = lineages[0][0].genome
+        init_genome = _load_init_genome(d['init_genome_path'])
     else:
         # Use the default genome.
         init_genome = ([d['default_init_genome_value']] *
@@ -136,6 +148,20 @@ def _derive_params(d):
         'num_nodes': num_nodes,
         'init_genome': init_genome,
         'fitness_transform': fitness_transform,
+        'selection': d.get('selection', 'sus'),
+        # Seed the population from a genome bank, if given (see
+        # `genome_bank`), using the fittest `init_genome_bank_top` genomes
+        # (all of them by default).
+        'init_genome_bank': d.get('init_genome_bank'),
+        'init_genome_bank_top': d.get('init_genome_bank_top'),
+        # Island-model parameters default to a single panmictic population.
+        'num_islands': d.get('num_islands', 1),
+        'migration_interval': d.get('migration_interval', 50),
+        'migration_size': d.get('migration_size', 1),
+        'migration_topology': d.get('migration_topology', 'ring'),
+        # Trial subsampling defaults to playing every trial.
+        'trial_fraction': d.get('trial_fraction', 1.0),
+        'trial_schedule': d.get('trial_schedule', 'constant'),
         # Number of trials is given by
         #   (number of tasks * two directions *
         #    number of initial positions for the animat)
@@ -170,6 +196,17 @@ def _derive_params(d):
     }
 
 
+# Experiments are rebuilt whenever they're unpickled, so only load each initial
+# genome once.
+@functools.lru_cache(maxsize=None)
+def _load_init_genome(init_genome_path):
+    path = os.path.join(init_genome_path, 'lineages.pkl')
+    with open(path, 'rb') as f:
+        lineages = pickle.load(f)
+    # Use the genome of the best individual of the most recent generation.
+    return lineages[0][0].genome
+
+
 def _bitlist(i, padlength):
     """Return a list of the bits of an integer, padded up to ``padlength``.
 
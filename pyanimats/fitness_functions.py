@@ -12,9 +12,8 @@ from functools import wraps
 
 import numpy as np
 import pyphi
-from sklearn.metrics import mutual_info_score
 
-from . import constants
+from . import utils
 from .utils import unique_rows
 from c_animat import CORRECT_CATCH, WRONG_CATCH
 
@@ -39,16 +38,22 @@ LaTeX_NAMES = {
 }
 MULTIVALUED = ['mat']
 CHEAP = ['nat']
+# Functions whose value varies from one evaluation to the next even for
+# deterministic animats, because they play scrambled games or shuffle trials.
+STOCHASTIC = ['mi_wvn', 'ex_wvn', 'sp_wvn', 'bp_wvn', 'sd_wvn', 'mat']
 
 
-def _register(data_function=None):
+def _register(data_function=None, consumes=()):
     """Register a fitness function to the directory.
 
-    Also associates the function to data-gathering data_functions, if any.
+    Also associates the function to data-gathering data_functions, if any, and
+    records the artifacts of the ``EvaluationContext`` it consumes (checked
+    against the artifacts it actually asks for in the tests).
     """
     def wrapper(f):
         metadata[f.__name__] = {'doc': f.__doc__,
-                                'data_function': data_function}
+                                'data_function': data_function,
+                                'consumes': consumes}
     return wrapper
 
 
@@ -81,6 +86,109 @@ def print_functions():
         parameters.\n""")))
 
 
+# Evaluation context
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+class EvaluationContext:
+
+    """The artifacts of a single evaluation of an animat.
+
+    Each artifact (the game, the scrambled games, the unique states visited in
+    them, whether the animat is empty) is computed the first time it's asked
+    for and then reused, so fitness functions that are combined in one
+    evaluation share them instead of playing the same games again. The TPM,
+    connectivity matrix, and network are already computed once by the animat.
+
+    Fitness functions are given the context in place of the animat; any other
+    attribute is looked up on the animat. The arrays of memoized games are
+    read-only, since they're shared.
+
+    Args:
+        animat (Animat): The animat being evaluated.
+
+    Attributes:
+        consumed (set(str)): The artifacts that have been asked for, named as
+            in the ``consumes`` metadata of the fitness functions.
+    """
+
+    # Animat attributes that are artifacts, and the artifact each one uses.
+    ANIMAT_ARTIFACTS = {
+        'cm': 'cm',
+        'tpm': 'tpm',
+        'network': 'network',
+        'as_subsystem': 'network',
+        'brain': 'network',
+        'brain_and_sensors': 'network',
+        'brain_and_motors': 'network',
+        'mechanism': 'network',
+        'mechanisms': 'network',
+    }
+
+    def __init__(self, animat):
+        self.animat = animat
+        self.consumed = set()
+        self._games = {}
+        self._unique_states = {}
+        self._empty = None
+
+    def __getattr__(self, name):
+        # Don't recurse before the animat is set (when unpickling).
+        if name == 'animat':
+            raise AttributeError(name)
+        if name in self.ANIMAT_ARTIFACTS:
+            self.consumed.add(self.ANIMAT_ARTIFACTS[name])
+        return getattr(self.animat, name)
+
+    def game(self, scrambled=False, index=0):
+        """Return the game, or the ``index``th scrambled game.
+
+        The animat's numbers of correct and incorrect trials are always those
+        of the unscrambled game, whatever order the games are played in.
+        """
+        self.consumed.add('scrambled_games' if scrambled else 'game')
+        return self._game(scrambled, index)
+
+    def _game(self, scrambled, index=0):
+        key = (scrambled, index if scrambled else 0)
+        if key not in self._games:
+            correct, incorrect = self.animat._correct, self.animat._incorrect
+            game = self.animat.play_game(scrambled=scrambled)
+            for array in game[:4]:
+                array.flags.writeable = False
+            if scrambled:
+                self.animat._correct = correct
+                self.animat._incorrect = incorrect
+            self._games[key] = game
+        return self._games[key]
+
+    def unique_states(self, scrambled=False, upto=False, sort=False):
+        """Return the unique states visited in the game (see
+        ``utils.unique_rows``)."""
+        self.consumed.add('unique_states')
+        key = (scrambled, tuple(upto) if upto else False, sort)
+        if key not in self._unique_states:
+            states = unique_rows(self._game(scrambled).animat_states,
+                                 upto=upto, sort=sort)
+            states.flags.writeable = False
+            self._unique_states[key] = states
+        return self._unique_states[key]
+
+    @property
+    def empty(self):
+        """Whether the animat has no connections."""
+        if self._empty is None:
+            self._empty = self.cm.sum() == 0
+        return self._empty
+
+
+def context(ind):
+    """Return the evaluation context of ``ind``, which may be an animat or a
+    context already."""
+    if isinstance(ind, EvaluationContext):
+        return ind
+    return EvaluationContext(ind)
+
+
 # Helper functions
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 
@@ -89,7 +197,8 @@ def shortcircuit_if_empty(value=0.0):
     def decorator(func):
         @wraps(func)
         def wrapper(ind, **kwargs):
-            if ind.cm.sum() == 0:
+            ind = context(ind)
+            if ind.empty:
                 return value
             return func(ind, **kwargs)
         return wrapper
@@ -107,11 +216,11 @@ def avg_over_visited_states(upto_attr=False, transform=False, n=None,
     def decorator(func):
         @wraps(func)
         def wrapper(ind, **kwargs):
+            ind = context(ind)
             upto = getattr(ind, upto_attr) if upto_attr else False
-            game = ind.play_game(scrambled=scrambled)
             sort = n is not None
-            unique_states = unique_rows(game.animat_states, upto=upto,
-                                        sort=sort)[:n]
+            unique_states = ind.unique_states(scrambled=scrambled, upto=upto,
+                                              sort=sort)[:n]
             values = [func(ind, state, **kwargs) for state in unique_states]
             if transform:
                 values = list(map(transform, values))
@@ -164,10 +273,11 @@ def wvn(transform=None, reduce=sum, upto_attr=False, shortcircuit=True,
     def decorator(func):
         @wraps(func)
         def wrapper(ind, **kwargs):
+            ind = context(ind)
             upto = getattr(ind, upto_attr) if upto_attr else False
             # Play the game and a scrambled version of it.
-            world = ind.play_game().animat_states
-            noise = ind.play_game(scrambled=True).animat_states
+            world = ind.game().animat_states
+            noise = ind.game(scrambled=True).animat_states
             # Uniqify all states up to the given indices.
             w_and_n = np.concatenate([world, noise])
             w_and_n = w_and_n.reshape(-1, w_and_n.shape[-1])
@@ -223,41 +333,51 @@ def nat(ind, scrambled=False):
     successfully complete. For each task given in the ``experiment.task``
     parameter, there is one trial per direction (left or right) of block
     descent, per initial animat position (given by
-    ``experiment.world_width``)."""
-    return ind.play_game(scrambled=scrambled).correct
-_register()(nat)
+    ``experiment.world_width``).
+
+    If the animat plays only a subset of the trials, the number of correct
+    trials is scaled up to the whole game."""
+    correct = context(ind).game(scrambled=scrambled).correct
+    if ind.trials is None:
+        return correct
+    return correct * ind.num_trials / len(ind.trials)
+_register(consumes=('game',))(nat)
 
 
 # Mutual information
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 
+def _sensor_motor_mi(ind, games):
+    """Return the mutual information between the sensors and motors of the
+    animat in each of the given games, in bits."""
+    states = np.stack([game.animat_states for game in games])
+    return utils.mutual_information(
+        utils.pack(states, ind.sensor_indices),
+        utils.pack(states, ind.motor_indices),
+        ind.num_sensor_states, ind.num_motor_states, stacked=True)
+
+
 def mi(ind, scrambled=False):
     """Mutual information: Animats are evaluated based on the mutual
     information between their sensors and motor over the course of a game.
     """
     if ind.num_motors == 0:
         return 0.0
-    states = ind.play_game(scrambled=scrambled).animat_states
-    # The contingency matrix has a row for every sensor state and a column for
-    # every motor state.
-    contingency = np.zeros([ind.num_sensor_states, ind.num_motor_states])
-    # Get only the sensor and motor states.
-    sensor_motor = np.concatenate([states[:, :, :ind.num_sensors],
-                                   states[:, :, -ind.num_motors:]], axis=2)
-    # Count!
-    for idx, state in ind.sensor_motor_states:
-        contingency[idx] = (sensor_motor == state).all(axis=2).sum()
-    # Calculate mutual information in nats.
-    mi_nats = mutual_info_score(None, None, contingency=contingency)
-    # Convert from nats to bits and return.
-    return mi_nats * constants.NAT_TO_BIT_CONVERSION_FACTOR
-_register()(mi)
+    ind = context(ind)
+    return float(_sensor_motor_mi(ind, [ind.game(scrambled=scrambled)])[0])
+_register(consumes=('game',))(mi)
 
 
 def mi_wvn(ind):
     """Same as ``mi`` but counting the difference between world and noise."""
-    return mi(ind, scrambled=False) - mi(ind, scrambled=True)
-_register(data_function=mi)(mi_wvn)
+    if ind.num_motors == 0:
+        return 0.0
+    ind = context(ind)
+    # Both games are counted at once.
+    world, noise = _sensor_motor_mi(ind, [ind.game(),
+                                          ind.game(scrambled=True)])
+    return float(world - noise)
+_register(data_function=mi, consumes=('game', 'scrambled_games'))(mi_wvn)
 
 
 # Extrinsic cause information
@@ -283,7 +403,8 @@ ex.__doc__ = """Extrinsic cause information: Animats are evaluated based on the
     sum of φ for core causes that are “about” the sensors (the purview is a
     subset of the sensors). This sum is averaged over every unique state the
     animat visits during a game."""
-_register(data_function=extrinsic_causes)(ex)
+_register(data_function=extrinsic_causes,
+          consumes=('cm', 'unique_states', 'network'))(ex)
 
 
 ex_wvn = wvn(transform=unq_concepts, reduce=phi_sum,
@@ -292,7 +413,8 @@ ex_wvn.__name__ = 'ex_wvn'
 ex_wvn.__doc__ = """Same as ``ex`` but counting the difference between the sum of
     φ of unique concepts that appear in the world and a scrambled version of
     it."""
-_register(data_function=extrinsic_causes)(ex_wvn)
+_register(data_function=extrinsic_causes,
+          consumes=('game', 'scrambled_games', 'network'))(ex_wvn)
 
 
 # Sum of small-phi
@@ -323,7 +445,8 @@ sp.__doc__ = """Sum of φ: Animats are evaluated based on the sum of φ for all
     sensors lack incoming connections and the motors lack outgoing, the only
     possible concepts are therefore those whose mechanisms are a subset of the
     hidden units)."""
-_register(data_function=all_concepts)(sp)
+_register(data_function=all_concepts,
+          consumes=('cm', 'unique_states', 'network'))(sp)
 
 
 sp_wvn = wvn(transform=unq_concepts, reduce=phi_sum,
@@ -332,7 +455,8 @@ sp_wvn.__name__ = 'sp_wvn'
 sp_wvn.__doc__ = """Same as ``sp`` but counting the difference between the sum of
     φ of unique concepts that appear in the world and a scrambled version of
     it."""
-_register(data_function=all_concepts)(sp_wvn)
+_register(data_function=all_concepts,
+          consumes=('game', 'scrambled_games', 'network'))(sp_wvn)
 
 
 # Big-Phi
@@ -356,7 +480,8 @@ bp.__doc__ = """Animats are evaluated based on the ϕ-value of their brains,
     uniqueness is considered up to the state of the sensors and hidden
     units).""".format(str(NUM_BIG_PHI_STATES_TO_COMPUTE) + ' most-common '
                       if NUM_BIG_PHI_STATES_TO_COMPUTE else '')
-_register(data_function=main_complex)(bp)
+_register(data_function=main_complex,
+          consumes=('cm', 'unique_states', 'network'))(bp)
 
 
 bp_wvn = shortcircuit_if_empty()(wvn(reduce=phi_sum,
@@ -364,7 +489,8 @@ bp_wvn = shortcircuit_if_empty()(wvn(reduce=phi_sum,
 bp_wvn.__name__ = 'bp_wvn'
 bp_wvn.__doc__ = """Same as ``bp`` but counting the difference between world and
     noise."""
-_register(data_function=main_complex)(bp_wvn)
+_register(data_function=main_complex,
+          consumes=('cm', 'game', 'scrambled_games', 'network'))(bp_wvn)
 
 
 # World vs. noise state differentiation
@@ -375,12 +501,11 @@ def sd_wvn(ind, upto_attr='hidden_indices', iterations=10):
     hidden-unit states that appear only in the world or only in the scrambled
     world."""
     upto = getattr(ind, upto_attr) if upto_attr else False
-    unscrambled_game = ind.play_game()
-    world = unscrambled_game.animat_states
+    world = ind.game().animat_states
     num_trials = world.shape[0]
     state_differentiation = np.zeros(iterations)
     for iteration in range(iterations):
-        noise = ind.play_game(scrambled=True).animat_states
+        noise = ind.game(scrambled=True, index=iteration).animat_states
         # Get a permutation of the trials.
         shuffled_trials = list(range(num_trials))
         ind.random.shuffle(shuffled_trials)
@@ -391,9 +516,9 @@ def sd_wvn(ind, upto_attr='hidden_indices', iterations=10):
             for i in range(0, num_trials, 2)
         ]
         state_differentiation[iteration] = sum(differences) / len(differences)
-    ind._correct = ind.correct
     return state_differentiation.mean()
-_register(data_function=main_complex)(sd_wvn)
+_register(data_function=main_complex,
+          consumes=('cm', 'game', 'scrambled_games'))(sd_wvn)
 
 
 # Matching
@@ -483,9 +608,10 @@ def mat(ind, iterations=20, precomputed_complexes=None):
     that the animat obtains when presented with a stimulus set from the world,
     and Σφ'(N) is the same but for a stimulus set that has been scrambled first
     in space and then in time."""
-    # Play the game and a scrambled version of it.
-    noise = ind.play_game(scrambled=True).animat_states
-    world = ind.play_game().animat_states
+    # Play the game and a scrambled version of it (copying the states, since
+    # they're shared with other fitness functions).
+    noise = ind.game(scrambled=True).animat_states.copy()
+    world = ind.game().animat_states.copy()
     # Since the motor states can't influence φ or ϕ, we set them to zero to
     # make uniqifying the states simpler.
     world[..., ind.motor_indices] = 0
@@ -551,7 +677,8 @@ def mat(ind, iterations=20, precomputed_complexes=None):
     return (raw_matching_average_weighted.mean(),
             raw_matching_weighted.mean(),
             existence * raw_matching.mean())
-_register(data_function=main_complex)(mat)
+_register(data_function=main_complex,
+          consumes=('cm', 'game', 'scrambled_games', 'network'))(mat)
 
 
 def food(ind, baseline_penalty=None, activity_penalty=None,
@@ -571,7 +698,7 @@ def food(ind, baseline_penalty=None, activity_penalty=None,
     activity_penalty = activity_penalty or ind.function_params[1]
     block_values = block_values or ind.function_params[2]
 
-    game = ind.play_game()
+    game = context(ind).game()
     animat_states, trial_results = game[0], game[3]
 
     num_trials_per_block = int(len(trial_results) / len(block_values))
@@ -588,4 +715,4 @@ def food(ind, baseline_penalty=None, activity_penalty=None,
     total_activity_penalty = activity_penalty * np.sum(animat_states)
 
     return sum([food, baseline_penalty, total_activity_penalty])
-_register()(food)
+_register(consumes=('game',))(food)
@@ -7,6 +7,7 @@ Classes handling transformation and combination of fitness functions.
 """
 
 from math import sqrt
+from time import perf_counter
 
 import numpy as np
 
@@ -64,9 +65,13 @@ class ExponentialMultiFitness:
         ranges (list(tuple(float))): A list of pairs giving the theoretical
             minimum and maximum values of each fitness function in
             ``function_names``. Defaults to the those in ``DEFAULT_RANGES``.
+        timer (PhaseTimer): If given, the time spent in each function is added
+            to it under the function's name.
     """
 
-    def __init__(self, function_names, transform=None, ranges=None):
+    def __init__(self, function_names, transform=None, ranges=None,
+                 timer=None):
+        self.timer = timer
         self.transform = transform or DEFAULT_EXPONENTIAL_TRANSFORM
         self.ranges = ranges or [DEFAULT_RANGES[f] for f in function_names]
         self.functions = [fitness_functions.__dict__[f]
@@ -87,16 +92,26 @@ class ExponentialMultiFitness:
         return tuple(self.norms[i](f) for i, f in enumerate(fitnesses))
 
     def __call__(self, ind, **kwargs):
-        # TODO: code smell: order matters in fitness eval, since animat.correct
-        # is updated each time the game is played, and some fitness functions
-        # use the scambled game
-        fitnesses = tuple(f(ind, **kwargs) for f in self.functions)
+        # The functions share the games and other artifacts of the animat
+        # through one evaluation context, so each is computed only once.
+        ind = fitness_functions.context(ind)
+        if self.timer is None:
+            fitnesses = tuple(f(ind, **kwargs) for f in self.functions)
+        else:
+            fitnesses = tuple(self._timed(f, ind, kwargs)
+                              for f in self.functions)
         normalized = np.array(self.normalize(fitnesses))
         exponential = self.transform['base']**(
             normalized[0] * self.transform['scale'] + self.transform['add'])
         combined = exponential * np.product(normalized[1:] + 1)
         return (combined, fitnesses)
 
+    def _timed(self, f, ind, kwargs):
+        start = perf_counter()
+        fitness = f(ind, **kwargs)
+        self.timer.add(f.__name__, perf_counter() - start)
+        return fitness
+
     def __repr__(self):
         return 'ExponentialMultiFitness({}, transform={})'.format(
             [f.__name__ for f in self.functions], self.transform)
@@ -105,6 +120,122 @@ class ExponentialMultiFitness:
         return repr(self)
 
 
+class Surrogate:
+
+    """
+    Predicts the fitness of offspring from cheap features, so that expensive
+    fitness functions need only be computed for the promising ones.
+
+    The model is a ridge regression of the logarithm of fitness on the
+    features returned by ``features``, fitted online from the exact
+    evaluations seen so far. Older evaluations are gradually forgotten, since
+    the relationship between the features and fitness changes as the
+    population evolves.
+
+    Keyword Args:
+        alpha (float): The strength of the ridge penalty, relative to the
+            variance of each feature.
+        decay (float): The weight of the past evaluations is multiplied by
+            this factor with each new one.
+
+    Example:
+        >>> s = Surrogate()
+        >>> for x in range(10):
+        ...     s.update([x, 1, 2, 3, 4], np.exp(x))
+        >>> round(float(np.log(s.predict([[4.5, 1, 2, 3, 4]])[0])), 1)
+        4.5
+    """
+
+    # The cheap features of an animat, in order.
+    FEATURES = ['cm_density', 'num_gates', 'unique_states', 'correct',
+                'parent_fitness']
+
+    def __init__(self, alpha=1.0, decay=0.995):
+        self.alpha = alpha
+        self.decay = decay
+        k = len(self.FEATURES)
+        # Weighted sums of the samples, the features, their outer products,
+        # the targets, and the features times the targets.
+        self._n = 0.0
+        self._sx = np.zeros(k)
+        self._sxx = np.zeros((k, k))
+        self._sy = 0.0
+        self._sxy = np.zeros(k)
+        self.num_samples = 0
+        self.exact, self.predicted, self._errors = 0, 0, []
+
+    @staticmethod
+    def game_features(ind):
+        """Return the features of an animat that don't depend on its parent.
+
+        The game is played through the animat's evaluation context (see
+        ``fitness_functions.context``), so if ``ind`` is a context, evaluating
+        fitness in it afterwards doesn't play the game again. Playing the game
+        updates the animat's numbers of correct and incorrect trials.
+        """
+        ind = fitness_functions.context(ind)
+        return [ind.cm.mean(),
+                ind.num_gates,
+                len(ind.unique_states()),
+                ind.game().correct]
+
+    @staticmethod
+    def parent_features(ind):
+        """Return the features of an animat that depend on its parent."""
+        return [np.log(max(ind.parent.fitness, np.finfo(float).tiny))]
+
+    @staticmethod
+    def features(ind):
+        """Return the features of an animat (see ``game_features``)."""
+        return Surrogate.game_features(ind) + Surrogate.parent_features(ind)
+
+    def update(self, x, fitness):
+        """Add an exact evaluation to the model."""
+        x = np.asarray(x, float)
+        y = np.log(max(fitness, np.finfo(float).tiny))
+        d = self.decay
+        self._n = d * self._n + 1
+        self._sx = d * self._sx + x
+        self._sxx = d * self._sxx + np.outer(x, x)
+        self._sy = d * self._sy + y
+        self._sxy = d * self._sxy + x * y
+        self.num_samples += 1
+
+    def predict(self, X):
+        """Return the predicted fitness of each row of features."""
+        X = np.asarray(X, float)
+        if not self._n:
+            return np.ones(len(X))
+        mean_x = self._sx / self._n
+        mean_y = self._sy / self._n
+        # Centered (co)variances of the features and the target.
+        cov = self._sxx - self._n * np.outer(mean_x, mean_x)
+        cov_y = self._sxy - self._n * mean_x * mean_y
+        # Scaling the penalty by the variance of each feature makes the model
+        # independent of the features' units; constant features get no
+        # weight.
+        penalty = self.alpha * np.diag(cov) + 1e-9
+        weights = np.linalg.solve(cov + np.diag(penalty), cov_y)
+        return np.exp(mean_y + (X - mean_x).dot(weights))
+
+    def record(self, exact, predicted, errors=()):
+        """Count ``exact`` exact and ``predicted`` predicted evaluations, and
+        the relative errors of the predictions that were checked against
+        exact evaluations."""
+        self.exact += exact
+        self.predicted += predicted
+        self._errors.extend(errors)
+
+    def reset_stats(self):
+        """Return the numbers of exact and predicted evaluations and the mean
+        relative error of the checked predictions, and reset them."""
+        stats = {'exact': self.exact, 'predicted': self.predicted,
+                 'error': (round(float(np.mean(self._errors)), 4)
+                           if self._errors else None)}
+        self.exact, self.predicted, self._errors = 0, 0, []
+        return stats
+
+
 def product(f1, f2, iterations=(1, 1)):
     """Returns a function that combines two fitness functions by taking the
     square root of the product.
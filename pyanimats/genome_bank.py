@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# genome_bank.py
+
+"""
+Genome banks: the fittest genomes of previous runs, for warm-starting new
+ones.
+
+A bank is a single binary file holding a ragged array of genomes with their
+fitness. It's laid out so that it can be memory-mapped and read without
+parsing::
+
+    magic (8 bytes) | version (uint64) | count (uint64)
+    offsets (int64 * (count + 1)) | fitness (float64 * count)
+    genomes (uint8 * offsets[-1])
+
+Genome ``i`` is ``genomes[offsets[i]:offsets[i + 1]]``. Banks are built from
+the output files of previous runs with ``pyanimats bank``, and a population is
+seeded from the fittest genomes in a bank with the ``init_genome_bank``
+experiment parameter.
+"""
+
+import gzip
+import json
+import os
+
+import numpy as np
+
+from . import delta
+
+MAGIC = b'PYAGBANK'
+VERSION = 1
+HEADER = np.dtype([('magic', 'S8'), ('version', '<u8'), ('count', '<u8')])
+
+
+def _lineages(output):
+    """Yield the serialized lineages in the output of a run."""
+    # The island model stores the output of each island.
+    if 'islands' in output:
+        for island in output['islands']:
+            yield from _lineages(island)
+        return
+    lineage = output['lineage']
+    # With `all_lineages`, there's one lineage per animat.
+    if lineage and isinstance(lineage[0], list):
+        yield from lineage
+    else:
+        yield lineage
+
+
+def read_outputs(paths):
+    """Return the final genomes and fitnesses in the output files of runs.
+
+    Each lineage stored in an output file contributes the last animat in it.
+
+    Returns:
+        tuple(list, list): The genomes and their fitness.
+    """
+    genomes, fitness = [], []
+    for path in paths:
+        _open = gzip.open if path.endswith('.gz') else open
+        with _open(path, 'rt') as f:
+            output = json.load(f)
+        for lineage in _lineages(output):
+            final = delta.decode_lineage(lineage)[0]
+            genomes.append(final['genome'])
+            fitness.append(final['fitness'])
+    return genomes, fitness
+
+
+def write(path, genomes, fitness, top=None):
+    """Write a genome bank.
+
+    Args:
+        path (str): The bank file.
+        genomes (list(list(int))): The genomes.
+        fitness (list(float)): The fitness of each genome.
+
+    Keyword Args:
+        top (int): Only keep this many of the fittest genomes. Defaults to
+            keeping all of them.
+    """
+    fitness = np.asarray(fitness, dtype='<f8')
+    # Store the fittest genomes first (keeping the order of ties).
+    order = np.argsort(-fitness, kind='stable')[:top]
+    lengths = [len(genomes[i]) for i in order]
+    header = np.array([(MAGIC, VERSION, len(order))], dtype=HEADER)
+    offsets = np.cumsum([0] + lengths).astype('<i8')
+    tmp = path + '.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(header.tobytes())
+        f.write(offsets.tobytes())
+        f.write(fitness[order].tobytes())
+        for i in order:
+            f.write(np.asarray(genomes[i], dtype=np.uint8).tobytes())
+    os.replace(tmp, path)
+
+
+class GenomeBank:
+
+    """A memory-mapped genome bank.
+
+    Genomes are only read from disk when they're accessed.
+
+    Args:
+        path (str): The bank file.
+
+    Raises:
+        ValueError: If the file isn't a genome bank in this version of the
+            format.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        data = np.memmap(path, dtype=np.uint8, mode='r')
+        header = data[:HEADER.itemsize].view(HEADER)[0]
+        if header['magic'] != MAGIC:
+            raise ValueError('`{}` is not a genome bank.'.format(path))
+        if header['version'] != VERSION:
+            raise ValueError(
+                'cannot load `{}`: genome bank version {} is not supported '
+                '(expected {}).'.format(path, header['version'], VERSION))
+        count = int(header['count'])
+        start = HEADER.itemsize
+        self.offsets = data[start:start + 8 * (count + 1)].view('<i8')
+        start += 8 * (count + 1)
+        self.fitness = data[start:start + 8 * count].view('<f8')
+        self._genomes = data[start + 8 * count:]
+
+    def __len__(self):
+        return len(self.fitness)
+
+    def __getitem__(self, i):
+        return self._genomes[self.offsets[i]:self.offsets[i + 1]].tolist()
+
+    def top(self, k=None):
+        """Return the ``k`` fittest genomes (all of them by default), fittest
+        first."""
+        return [self[i] for i in range(len(self))[:k]]
+
+
+def main(bank_file, output_files, top=None):
+    """Build a genome bank from the output files of runs."""
+    genomes, fitness = read_outputs(output_files)
+    write(bank_file, genomes, fitness, top=top)
+    kept = len(genomes) if top is None else min(top, len(genomes))
+    print('Saved the {} fittest of {} genomes to `{}`.'.format(
+        kept, len(genomes), bank_file))
+    return 0
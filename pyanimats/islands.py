@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# islands.py
+
+"""
+Island-model evolution: several populations evolving in parallel processes,
+exchanging their fittest animats at regular intervals.
+
+Each island is an ordinary ``Evolution`` living in its own process, with its
+own RNG seed (derived from the experiment seed) and its own checkpoint file.
+Every ``migration_interval`` generations the islands stop, send their
+``migration_size`` fittest animats to their neighbors in the migration
+topology, and replace their weakest animats with the ones they receive.
+"""
+
+import datetime
+import multiprocessing
+import pickle
+import random
+from copy import deepcopy
+from time import perf_counter as timer
+
+from munch import Munch
+
+from . import animat, utils, validate
+from .checkpoint import suffixed_file, write as write_checkpoint
+from .evolve import Evolution, load_checkpoint
+from .experiment import Experiment
+from .serialize import serializable
+
+RING, COMPLETE = validate.MIGRATION_TOPOLOGIES
+
+
+def island_seeds(seed, n):
+    """Return the RNG seeds of ``n`` islands, derived from ``seed``.
+
+    The seeds are drawn rather than taken consecutively so that the islands of
+    one run don't coincide with those of a run with a neighboring seed.
+    """
+    rng = random.Random(seed)
+    return [rng.randrange(2**31) for _ in range(n)]
+
+
+def neighbors(i, n, topology):
+    """Return the islands that island ``i`` sends emigrants to."""
+    if topology == RING:
+        return [(i + 1) % n] if n > 1 else []
+    if topology == COMPLETE:
+        return [j for j in range(n) if j != i]
+    raise ValueError('unknown migration topology `{}`; must be one of '
+                     '{}.'.format(topology, validate.MIGRATION_TOPOLOGIES))
+
+
+def migrate(emigrants, topology):
+    """Route each island's emigrants to its neighbors.
+
+    Args:
+        emigrants (list(list)): The emigrants of each island.
+        topology (str): The migration topology.
+
+    Returns:
+        list(list): The immigrants of each island.
+    """
+    n = len(emigrants)
+    immigrants = [[] for i in range(n)]
+    for i, group in enumerate(emigrants):
+        for j in neighbors(i, n, topology):
+            immigrants[j].extend(group)
+    return immigrants
+
+
+def island_checkpoint_file(checkpoint_file, i):
+    """Return the path of the checkpoint file of island ``i``."""
+    return suffixed_file(checkpoint_file, 'island-{}'.format(i))
+
+
+def _pack(a):
+    """Return the data needed to recreate an emigrant on another island."""
+    return {
+        'genome': list(a.genome),
+        'gen': a.gen,
+        'fitness': a.fitness,
+        'raw_fitness': a.raw_fitness,
+        'correct': a.correct,
+        'incorrect': a.incorrect,
+        'predicted': a._predicted,
+    }
+
+
+def _unpack(d, experiment):
+    a = animat.from_json(d, experiment=experiment)
+    a._dirty_fitness = False
+    a._predicted = d['predicted']
+    return a
+
+
+def _island(conn, experiment, simulation, checkpoint_file, resume):
+    """Run one island, following the commands sent by the archipelago."""
+    if resume:
+        evolution = load_checkpoint(checkpoint_file)
+        evolution.update_simulation(simulation)
+    else:
+        evolution = Evolution(experiment, simulation)
+    while True:
+        command, args = conn.recv()
+        if command == 'run':
+            ngen, immigrants, checkpoint = args
+            evolution.immigrate([_unpack(d, evolution.experiment)
+                                 for d in immigrants])
+            evolution.run(checkpoint_file, ngen=ngen, final_checkpoint=False,
+                          early_stopping=False, rescore=False)
+            if checkpoint:
+                evolution.checkpoint(checkpoint_file)
+            size = evolution.experiment.migration_size
+            conn.send([_pack(a) for a in evolution.fittest(size)])
+        elif command == 'stop':
+            evolution.checkpoint(checkpoint_file)
+            if evolution.SUBSAMPLE_TRIALS:
+                evolution.rescore()
+                evolution.shutdown()
+            conn.send(serializable(evolution))
+            conn.close()
+            return
+
+
+class Archipelago:
+
+    """A set of island populations evolving in parallel.
+
+    Behaves like an ``Evolution`` as far as the command-line interface is
+    concerned: it can be run, checkpointed, resumed, and serialized.
+    """
+
+    def __init__(self, experiment, simulation):
+        self.version = utils.get_version()
+        self.experiment = (experiment if isinstance(experiment, Experiment)
+                           else Experiment(experiment))
+        # The islands validate the simulation parameters themselves, so keep
+        # them as given.
+        self._simulation = deepcopy(dict(simulation))
+        self.simulation = Munch(
+            validate.simulation(deepcopy(self._simulation), self.experiment))
+        if self.simulation.broker:
+            raise ValueError('remote workers cannot be used with islands.')
+        self.generation = 0
+        self.elapsed = 0
+        self.seeds = island_seeds(self.experiment.rng_seed,
+                                  self.experiment.num_islands)
+        self.immigrants = [[] for seed in self.seeds]
+        self.islands = None
+
+    def update_simulation(self, opts):
+        self._simulation.update(opts)
+        self.simulation = Munch(
+            validate.simulation(deepcopy(self._simulation), self.experiment))
+
+    def _island_simulation(self, i):
+        simulation = dict(self._simulation)
+        # Islands only checkpoint at migrations, when the archipelago does, so
+        # that their checkpoints never get ahead of the archipelago's.
+        simulation['checkpoint_interval'] = 0
+        # Each island writes its own status file.
+        if simulation.get('status_file'):
+            simulation['status_file'] = suffixed_file(
+                simulation['status_file'], 'island-{}'.format(i))
+        return simulation
+
+    def _island_experiment(self, i):
+        experiment = self.experiment.serializable()
+        experiment['rng_seed'] = self.seeds[i]
+        return experiment
+
+    def checkpoint(self, checkpoint_file):
+        """Pickle the archipelago to ``checkpoint_file``.
+
+        This only records the archipelago's own state; the islands are saved
+        to their own checkpoint files.
+        """
+        write_checkpoint(pickle.dumps(self), checkpoint_file,
+                         keep=self.simulation.checkpoint_keep)
+
+    def run(self, checkpoint_file, ngen=None):
+        """Evolve the islands, migrating every ``migration_interval``
+        generations."""
+        if ngen is None:
+            ngen = self.simulation.ngen
+        interval = self.experiment.migration_interval
+        resume = self.generation > 0
+        # Start the islands.
+        ctx = multiprocessing.get_context()
+        conns, processes = [], []
+        for i in range(len(self.seeds)):
+            parent_conn, child_conn = ctx.Pipe()
+            process = ctx.Process(
+                target=_island,
+                args=(child_conn, self._island_experiment(i),
+                      self._island_simulation(i),
+                      island_checkpoint_file(checkpoint_file, i), resume))
+            process.start()
+            # Close our copy of the child's end so that we notice if it dies.
+            child_conn.close()
+            conns.append(parent_conn)
+            processes.append(process)
+
+        def receive(i):
+            try:
+                return conns[i].recv()
+            except EOFError:
+                raise RuntimeError('island {} (seed {}) exited '
+                                   'unexpectedly.'.format(i, self.seeds[i]))
+
+        last_checkpoint = timer()
+        try:
+            while self.generation < ngen:
+                target = min(ngen, (self.generation // interval + 1) *
+                             interval)
+                checkpoint = (timer() - last_checkpoint >=
+                              self.simulation.checkpoint_interval)
+                for conn, immigrants in zip(conns, self.immigrants):
+                    conn.send(('run', (target, immigrants, checkpoint)))
+                emigrants = [receive(i) for i in range(len(conns))]
+                self.generation = target
+                self.immigrants = migrate(
+                    emigrants, self.experiment.migration_topology)
+                if checkpoint:
+                    self.elapsed += timer() - last_checkpoint
+                    self.checkpoint(checkpoint_file)
+                    last_checkpoint = timer()
+            for conn in conns:
+                conn.send(('stop', None))
+            self.islands = [receive(i) for i in range(len(conns))]
+        finally:
+            for process in processes:
+                process.join()
+        self.elapsed += timer() - last_checkpoint
+        # Save final checkpoint.
+        print('Saving final archipelago checkpoint to `{}`... '.format(
+            checkpoint_file), end='', flush=True)
+        self.checkpoint(checkpoint_file)
+        print('done.\n')
+        return self.elapsed
+
+    def serializable(self):
+        return {
+            'experiment': self.experiment,
+            'simulation': self.simulation,
+            'seeds': self.seeds,
+            'islands': self.islands,
+            'elapsed': round(self.elapsed, 2),
+            'version': utils.get_version(),
+            'time': datetime.datetime.now().isoformat(),
+        }
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# logbook.py
+
+"""
+Streaming the logbook to disk.
+
+A ``StreamingLogbook`` appends each record to a newline-delimited JSON file as
+soon as it's recorded, one record per line, and keeps only the last few
+records in memory (enough to print the status and check the stopping
+criteria). This keeps memory use and checkpoints small in long runs that
+record every generation.
+
+The logbook remembers how much of the file it has written, and discards
+anything after that before writing the next record, so an evolution resumed
+from a checkpoint overwrites the records written after the checkpoint rather
+than repeating them.
+
+The file can be read back into an ordinary logbook with ``load``.
+"""
+
+import json
+import os
+
+import numpy as np
+from deap import tools
+
+# The default number of records kept in memory.
+TAIL = 100
+
+EXTENSION = '.ndjson'
+
+
+def stream_file(checkpoint_file):
+    """Return the path of the logbook file of an evolution, next to its
+    checkpoint file (so that islands write their own files)."""
+    root, ext = os.path.splitext(checkpoint_file)
+    if ext == '.gz':
+        root = os.path.splitext(root)[0]
+    return root + '.logbook' + EXTENSION
+
+
+def json_default(obj):
+    """Convert NumPy values for JSON (infinite values are kept)."""
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    raise TypeError('{!r} is not JSON serializable'.format(obj))
+
+
+def tuples(obj):
+    """Recursively convert the lists in a record loaded from JSON back to
+    tuples."""
+    if isinstance(obj, list):
+        return tuple(tuples(x) for x in obj)
+    if isinstance(obj, dict):
+        return {k: tuples(v) for k, v in obj.items()}
+    return obj
+
+
+def load(path, size=None):
+    """Load a logbook file written by a ``StreamingLogbook``.
+
+    Keyword Args:
+        size (int): Only read this many bytes of the file. Defaults to the
+            whole file.
+
+    Returns:
+        tools.Logbook: An ordinary logbook with every record.
+    """
+    logbook = tools.Logbook()
+    with open(path, 'rb') as f:
+        lines = f.read(size).decode().splitlines()
+    for line in lines:
+        logbook.record(**tuples(json.loads(line)))
+    return logbook
+
+
+class StreamingLogbook(tools.Logbook):
+
+    """A logbook that writes its records to a file and keeps only the last
+    ones in memory.
+
+    Args:
+        path (str): The file the records are appended to. Its contents are
+            replaced with the first record.
+
+    Keyword Args:
+        tail (int): The number of records to keep in memory.
+    """
+
+    def __init__(self, path, tail=TAIL):
+        super().__init__()
+        self.path = path
+        self.tail = tail
+        # The size of the file once this logbook's records are written.
+        self.offset = 0
+
+    @classmethod
+    def from_logbook(cls, logbook, path, tail=TAIL):
+        """Start streaming an ordinary logbook, writing the records it
+        already has."""
+        streaming = cls(path, tail=tail)
+        streaming.header = logbook.header
+        for name, chapter in logbook.chapters.items():
+            streaming.chapters[name].header = chapter.header
+        # Chapters added partway through have fewer records, so match them to
+        # the main records by generation.
+        chapters = {name: {r.get('gen'): r for r in chapter}
+                    for name, chapter in logbook.chapters.items()}
+        for record in logbook:
+            infos = dict(record)
+            for name, by_gen in chapters.items():
+                if record.get('gen') in by_gen:
+                    infos[name] = {k: v for k, v in
+                                   by_gen[record.get('gen')].items()
+                                   if k not in record}
+            streaming.record(**infos)
+        return streaming
+
+    def record(self, **infos):
+        line = json.dumps(infos, default=json_default) + '\n'
+        super().record(**infos)
+        with open(self.path, 'ab') as f:
+            # Discard anything written after our last record (by a run that
+            # was interrupted after this logbook was checkpointed).
+            if f.tell() > self.offset:
+                f.truncate(self.offset)
+            f.write(line.encode())
+            self.offset = f.tell()
+        self._trim()
+
+    def _trim(self):
+        # Use the list method directly: ``Logbook.pop`` and ``__delitem__``
+        # don't support subclasses or slices.
+        excess = len(self) - self.tail
+        if excess > 0:
+            list.__delitem__(self, slice(0, excess))
+            self.buffindex = max(0, self.buffindex - excess)
+        for chapter in self.chapters.values():
+            excess = len(chapter) - self.tail
+            if excess > 0:
+                list.__delitem__(chapter, slice(0, excess))
+                chapter.buffindex = max(0, chapter.buffindex - excess)
+
+    def read(self):
+        """Return the whole logbook, read back from the file."""
+        logbook = load(self.path, self.offset)
+        logbook.header = self.header
+        for name, chapter in self.chapters.items():
+            logbook.chapters[name].header = chapter.header
+        return logbook
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# parallel.py
+
+"""
+Evaluation of animats in a pool of worker processes.
+
+Workers rebuild the experiment and fitness function once, when they start;
+after that only genomes, seeds, and trials are sent to them, and only fitness
+data (or the features used by the surrogate model) is sent back. Each task
+carries its own seed, which the worker uses to seed both RNGs before
+evaluating, so results don't depend on which worker evaluated which animat.
+"""
+
+import random
+from concurrent.futures import ProcessPoolExecutor
+
+from . import c_animat
+from .animat import Animat
+from .fitness_transforms import ExponentialMultiFitness, Surrogate
+
+# The worker's experiment and fitness function, set by `_initialize`.
+_experiment = None
+_fitness_function = None
+
+
+def _initialize(experiment):
+    global _experiment, _fitness_function
+    _experiment = experiment
+    _fitness_function = ExponentialMultiFitness(
+        experiment.fitness_function, experiment.fitness_transform,
+        experiment.fitness_ranges)
+
+
+def _animat(genome, seed, experiment, trials):
+    c_animat.seed(seed)
+    a = Animat(experiment or _experiment, genome)
+    a.random = random.Random(seed)
+    a.trials = trials
+    return a
+
+
+def evaluate_genome(genome, seed, experiment=None, fitness_function=None,
+                    trials=None):
+    """Evaluate the animat with the given genome, on the given trials (all
+    trials if ``None``).
+
+    Returns:
+        tuple: The fitness, raw fitness, and number of correct and incorrect
+        trials.
+    """
+    fitness_function = fitness_function or _fitness_function
+    a = _animat(genome, seed, experiment, trials)
+    fitness, raw_fitness = fitness_function(a)
+    return fitness, raw_fitness, a.correct, a.incorrect
+
+
+def genome_features(genome, seed, experiment=None, trials=None):
+    """Compute the features of the animat with the given genome for the
+    surrogate model (see ``Surrogate.game_features``).
+
+    Returns:
+        tuple: The features, and the number of correct and incorrect trials.
+    """
+    a = _animat(genome, seed, experiment, trials)
+    return Surrogate.game_features(a), a.correct, a.incorrect
+
+
+def make_task(a, seed, features=False):
+    """Return the data needed to evaluate an animat elsewhere, or to compute
+    its features if ``features`` is true."""
+    return (list(a.genome), seed, a.trials, features)
+
+
+def run_task(task, experiment=None, fitness_function=None):
+    """Evaluate an animat, or compute its features, as described by a task
+    from ``make_task``."""
+    genome, seed, trials, features = task
+    if features:
+        return genome_features(genome, seed, experiment, trials=trials)
+    return evaluate_genome(genome, seed, experiment, fitness_function,
+                           trials=trials)
+
+
+class Evaluator:
+
+    """Evaluates animats in a pool of worker processes.
+
+    Args:
+        experiment (Experiment): The experiment the animats belong to.
+        num_workers (int): The number of worker processes.
+
+    Keyword Args:
+        chunksize (int): The number of animats sent to a worker at once.
+    """
+
+    def __init__(self, experiment, num_workers, chunksize=4):
+        self.num_workers = num_workers
+        self.chunksize = chunksize
+        self._executor = ProcessPoolExecutor(max_workers=num_workers,
+                                             initializer=_initialize,
+                                             initargs=(experiment,))
+
+    def map(self, animats, seeds, features=False):
+        """Evaluate ``animats``, seeding each evaluation with the
+        corresponding seed.
+
+        Keyword Args:
+            features (bool): Whether to compute the animats' features for the
+                surrogate model instead.
+
+        Returns:
+            list(tuple): The result of ``evaluate_genome`` (or
+            ``genome_features``) for each animat, in order.
+        """
+        tasks = [make_task(a, seed, features)
+                 for a, seed in zip(animats, seeds)]
+        return list(self._executor.map(run_task, tasks,
+                                       chunksize=self.chunksize))
+
+    def submit(self, a, seed):
+        """Schedule the evaluation of one animat.
+
+        Returns:
+            concurrent.futures.Future: A future for the result of
+            ``evaluate_genome``.
+        """
+        return self._executor.submit(run_task, make_task(a, seed))
+
+    def shutdown(self):
+        self._executor.shutdown()
@@ -6,100 +6,221 @@
 
 from collections import UserList
 
+from . import delta
 
-class Phylogeny(UserList):
-    """A population of animats.
-
-    Behaves like a normal list, but allows pickling the population with the
-    phylogenetic tree of their lineages.
-
-    Time complexity is ``O(n/step)`` for insertion and deletion, where ``n`` is
-    the size of the animat's lineage and ``step`` is the generational interval.
 
-    Note that changing the parent reference of an element after creation will
-    result in undefined behavior, and inserting an animat with circular parent
-    references will cause an infinite loop.
+class Phylogeny(UserList):
+    """A population of animats, together with the phylogenetic tree of their
+    ancestors.
+
+    Behaves like a normal list of the living animats. The tree is maintained
+    as animats are added and removed: each node is an animat, identified by a
+    compact integer ID assigned when it joins the tree, and is counted once
+    for each of its children in the tree and each time it appears in the
+    population. A node is released as soon as its count drops to zero, *i.e.*
+    when it has no living descendants.
+
+    Only ancestors whose generation is a multiple of ``step`` are kept: when
+    an animat is added, its ``parent`` reference is redirected to its nearest
+    such ancestor, so the ancestors in between can be garbage-collected. This
+    bounds memory by the size of the population times the depth of its
+    coalescence (divided by ``step``), rather than by the number of
+    generations.
+
+    Time complexity is ``O(1)`` for insertion and amortized ``O(1)`` for
+    deletion, except when inserting an animat whose ancestors are not yet in
+    the tree, in which case they are added as well.
+
+    When pickled, the genomes in the tree are delta-encoded along it, with a
+    full genome every ``keyframe_interval`` generations of the tree (see
+    ``delta``). The animats' ``__getstate__`` must therefore include their
+    ``genome``.
+
+    Note that changing the parent reference of an element after it has been
+    added will result in undefined behavior, and inserting an animat with
+    circular parent references will cause an infinite loop.
     """
 
-    def __init__(self, animats, step=1):
-        self.data = animats
-        self._lookup = {}
+    def __init__(self, animats=(), step=1,
+                 keyframe_interval=delta.KEYFRAME_INTERVAL):
+        self.data = []
         self.step = step
-        for animat in animats:
-            self._insert(animat)
-
-    def _incref(self, animat, parent):
-        # Increment refcount if it's already there.
-        if animat._id in self._lookup:
-            self._lookup[animat._id][1] += 1
-        # Otherwise insert with refcount of 1.
-        else:
+        self.keyframe_interval = keyframe_interval
+        # Maps IDs to ``[animat, refcount, parent_id]``.
+        self._nodes = {}
+        self._next_id = 0
+        self.extend(animats)
+
+    def _tracks(self, animat):
+        node = self._nodes.get(animat._id)
+        return node is not None and node[0] is animat
+
+    def _sampled_parent(self, animat):
+        """Return the nearest ancestor of ``animat`` that should be kept."""
+        ancestor = animat.parent
+        while ancestor is not None and ancestor.gen % self.step != 0:
+            ancestor = ancestor.parent
+        return ancestor
+
+    def _incref(self, animat):
+        """Count a new reference to ``animat``, adding it and any of its
+        ancestors that aren't in the tree yet."""
+        untracked = []
+        while animat is not None and not self._tracks(animat):
+            untracked.append(animat)
+            animat = self._sampled_parent(animat)
+        if animat is not None:
+            self._nodes[animat._id][1] += 1
+        # Add the new nodes from the oldest down, so that parents get their
+        # IDs before their children.
+        parents = untracked[1:] + [animat]
+        for child, parent in reversed(list(zip(untracked, parents))):
+            child.parent = parent
+            child._id = self._next_id
+            self._next_id += 1
             parent_id = parent._id if parent is not None else None
-            self._lookup[animat._id] = [animat, 1, parent_id]
+            self._nodes[child._id] = [child, 1, parent_id]
 
     def _decref(self, animat):
-        # Delete if refcount is 1.
-        if self._lookup[animat._id][1] == 1:
-            del self._lookup[animat._id]
-        # Otherwise decrement refcount.
-        else:
-            self._lookup[animat._id][1] -= 1
-
-    def _insert(self, animat):
-        """Inserts an animat and its lineage into the lookup table."""
-        lineage = animat.lineage(step=self.step)
-        child = next(lineage)
-        for ancestor in lineage:
-            parent = ancestor
-            self._incref(child, parent)
-            child = parent
-        self._incref(child, None)
-
-    def _lineage(self, animat):
-        """Returns the lineage of the animat as it exists in the phylogeny."""
-        ancestor_id = animat._id
-        while ancestor_id is not None:
-            ancestor_ref = self._lookup[ancestor_id]
-            yield ancestor_ref[0]
-            ancestor_id = ancestor_ref[2]
-
-    def _remove(self, animat):
-        """Removes an animat and its lineage from the lookup table."""
-        for ancestor in self._lineage(animat):
-            self._decref(ancestor)
+        """Remove a reference to ``animat``, releasing it and any of its
+        ancestors that are left without descendants."""
+        node_id = animat._id
+        while node_id is not None:
+            node = self._nodes[node_id]
+            node[1] -= 1
+            if node[1] > 0:
+                return
+            del self._nodes[node_id]
+            node_id = node[2]
+
+    def __len__(self):
+        return len(self.data)
+
+    def __iter__(self):
+        return iter(self.data)
+
+    def __getitem__(self, position):
+        # Return plain lists for slices, rather than new phylogenies.
+        return self.data[position]
+
+    def copy(self):
+        return list(self.data)
+
+    def nodes(self):
+        """Return the nodes of the tree as ``(id, animat, refcount,
+        parent_id)`` tuples, parents before their children."""
+        return [(node_id,) + tuple(self._nodes[node_id])
+                for node_id in sorted(self._nodes)]
+
+    @classmethod
+    def from_nodes(cls, nodes, population, next_id, step=1,
+                   keyframe_interval=delta.KEYFRAME_INTERVAL):
+        """Rebuild a phylogeny from the output of ``nodes``.
+
+        Args:
+            nodes (list(tuple)): The nodes, parents before their children.
+                The animats' ``parent`` references are set from the parent
+                IDs.
+            population (list(int)): The IDs of the living animats, in order.
+            next_id (int): The ID of the next animat to join the tree.
+        """
+        phylogeny = cls(step=step, keyframe_interval=keyframe_interval)
+        for node_id, animat, refcount, parent_id in nodes:
+            animat.parent = (phylogeny._nodes[parent_id][0]
+                             if parent_id is not None else None)
+            phylogeny._nodes[node_id] = [animat, refcount, parent_id]
+        phylogeny.data = [phylogeny._nodes[node_id][0]
+                          for node_id in population]
+        phylogeny._next_id = next_id
+        return phylogeny
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['_nodes']
+        # Store the nodes as records rather than as animats, so that the
+        # genomes can be encoded relative to their parents'. Parents have
+        # smaller IDs than their children, so they come first.
+        records, depths, genomes = [], {}, {}
+        for node_id in sorted(self._nodes):
+            animat, refcount, parent_id = self._nodes[node_id]
+            animat_state = animat.__getstate__()
+            genome = genomes[node_id] = animat_state.pop('genome')
+            depth = depths[node_id] = (0 if parent_id is None
+                                       else depths[parent_id] + 1)
+            if delta.is_keyframe(depth, self.keyframe_interval):
+                encoded = (True, genome)
+            else:
+                encoded = (False, delta.diff(genomes[parent_id], genome))
+            records.append((node_id, type(animat), animat_state, refcount,
+                            parent_id, encoded))
+        state['_records'] = records
+        state['data'] = [animat._id for animat in self.data]
+        return state
 
     def __setstate__(self, state):
+        # Checkpoints from before the tree was maintained live store parents
+        # in a `_lookup` table keyed by UUID; rebuild the tree from it.
+        lookup = state.pop('_lookup', None)
+        if lookup is not None:
+            self.__dict__.update(state)
+            for animat, _, parent_id in lookup.values():
+                animat.parent = (lookup[parent_id][0]
+                                 if parent_id is not None else None)
+            self.__init__(self.data, step=self.step)
+            return
+        records = state.pop('_records')
         self.__dict__.update(state)
-        for animat_ref in self._lookup.values():
-            animat, parent_id = animat_ref[0], animat_ref[2]
-            animat.parent = (self._lookup[parent_id][0]
+        self._nodes, genomes = {}, {}
+        for node_id, cls, animat_state, refcount, parent_id, encoded in \
+                records:
+            full, data = encoded
+            genome = genomes[node_id] = (
+                data if full else delta.patch(genomes[parent_id], data))
+            animat = cls.__new__(cls)
+            animat.__setstate__(dict(animat_state, genome=genome))
+            animat.parent = (self._nodes[parent_id][0]
                              if parent_id is not None else None)
+            self._nodes[node_id] = [animat, refcount, parent_id]
+        self.data = [self._nodes[node_id][0] for node_id in self.data]
 
-    def __setitem__(self, position, animat):
-        super().__setitem__(position, animat)
-        self._insert(animat)
+    def __setitem__(self, position, value):
+        if isinstance(position, slice):
+            new, old = list(value), self.data[position]
+        else:
+            new, old = [value], [self.data[position]]
+        # Add the new animats first, so that ancestors they share with the
+        # old ones aren't released.
+        for animat in new:
+            self._incref(animat)
+        self.data[position] = new if isinstance(position, slice) else value
+        for animat in old:
+            self._decref(animat)
 
     def __delitem__(self, position):
-        self._remove(self[position])
-        super().__delitem__(position)
+        old = self.data[position]
+        del self.data[position]
+        for animat in (old if isinstance(position, slice) else [old]):
+            self._decref(animat)
 
     def append(self, animat):
-        super().append(animat)
-        self._insert(animat._id)
+        self._incref(animat)
+        self.data.append(animat)
 
     def insert(self, position, animat):
-        super().insert(position, animat)
-        self._insert(animat)
+        self._incref(animat)
+        self.data.insert(position, animat)
 
     def pop(self, i=-1):
-        self._remove(self[i])
-        return super().pop(i)
+        animat = self.data.pop(i)
+        self._decref(animat)
+        return animat
 
     def remove(self, animat):
-        super().remove(animat)
-        self._remove(animat)
+        self.pop(self.data.index(animat))
+
+    def clear(self):
+        del self[:]
 
     def extend(self, animats):
-        super().extend(animats)
         for animat in animats:
-            self._insert(animat)
+            self.append(animat)
@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# snapshot.py
+
+"""
+A compact checkpoint format that loads quickly.
+
+Unpickling a checkpoint rebuilds every object in the evolution one by one. A
+snapshot instead stores the population and its phylogeny as a few flat NumPy
+arrays in an uncompressed ``.npz`` archive: the genomes of all the animats in
+the tree concatenated into one array, with their offsets, and one array for
+each per-animat value (generation, fitness, parent, and so on). The rest of
+the state (the parameters, the RNG states, the logbook, and a few numbers) is
+small and is stored as JSON in the same archive.
+
+Snapshots are versioned; loading a snapshot written in another version of the
+format raises an error rather than misreading it.
+
+Snapshots are used for checkpoints whose file name ends in ``.npz``. The
+island model still pickles its checkpoints.
+"""
+
+import io
+import json
+import random
+import zipfile
+
+import numpy as np
+from deap import tools
+from munch import Munch
+
+from .animat import Animat
+from .experiment import Experiment
+from .fitness_transforms import Surrogate
+from .logbook import StreamingLogbook, json_default, tuples
+from .phylogeny import Phylogeny
+from .stats import flatten_raw_fitness, unflatten_raw_fitness
+
+FORMAT = 'pyanimats-snapshot'
+VERSION = 1
+EXTENSION = '.npz'
+
+# The attributes of an evolution stored as they are.
+SCALARS = ['version', 'generation', 'elapsed', 'best_fitness',
+           'best_generation', 'stop_reason', 'trials', 'evaluations']
+
+# Stands in for ``False`` in the trial counts of animats that haven't played
+# a game.
+NO_GAME = -1
+
+
+def is_snapshot(path):
+    """Return whether ``path`` is the name of a snapshot."""
+    return path.endswith(EXTENSION)
+
+
+def is_snapshot_file(path):
+    """Return whether the file at ``path`` is a snapshot (rather than a
+    pickled checkpoint), whatever its name."""
+    return zipfile.is_zipfile(path)
+
+
+def _dump_logbook(logbook):
+    d = {'header': logbook.header,
+         'records': list(logbook),
+         'chapters': {name: {'header': chapter.header,
+                             'records': list(chapter)}
+                      for name, chapter in logbook.chapters.items()}}
+    if isinstance(logbook, StreamingLogbook):
+        d['stream'] = {'path': logbook.path, 'tail': logbook.tail,
+                       'offset': logbook.offset}
+    return d
+
+
+def _load_logbook(d):
+    if 'stream' in d:
+        logbook = StreamingLogbook(d['stream']['path'],
+                                   tail=d['stream']['tail'])
+        logbook.offset = d['stream']['offset']
+    else:
+        logbook = tools.Logbook()
+    logbook.header = d['header']
+    logbook.extend(tuples(d['records']))
+    for name, chapter in d['chapters'].items():
+        logbook.chapters[name].header = chapter['header']
+        logbook.chapters[name].extend(tuples(chapter['records']))
+    return logbook
+
+
+def dumps(evolution):
+    """Return the snapshot of an evolution, as bytes.
+
+    The RNG states stored are the evolution's saved ones (see
+    ``Evolution.save_rng_states``).
+    """
+    population = evolution.population
+    nodes = population.nodes()
+    arrays = {}
+    genomes = [np.asarray(animat.genome, np.uint8)
+               for _, animat, _, _ in nodes]
+    arrays['genomes'] = (np.concatenate(genomes) if genomes
+                         else np.zeros(0, np.uint8))
+    arrays['genome_offsets'] = np.cumsum([0] + list(map(len, genomes)))
+    arrays['ids'] = np.array([node[0] for node in nodes], np.int64)
+    arrays['refcounts'] = np.array([node[2] for node in nodes], np.int64)
+    arrays['parents'] = np.array([-1 if node[3] is None else node[3]
+                                  for node in nodes], np.int64)
+    animats = [node[1] for node in nodes]
+    arrays['gens'] = np.array([a.gen for a in animats], np.int64)
+    arrays['fitness'] = np.array([a.fitness for a in animats], float)
+    arrays['dirty_fitness'] = np.array([a._dirty_fitness for a in animats],
+                                       bool)
+    arrays['predicted'] = np.array([a._predicted for a in animats], bool)
+    arrays['correct'] = np.array(
+        [NO_GAME if a._correct is False else a._correct for a in animats],
+        np.int64)
+    arrays['incorrect'] = np.array(
+        [NO_GAME if a._incorrect is False else a._incorrect
+         for a in animats], np.int64)
+    arrays['population'] = np.array([a._id for a in population], np.int64)
+    # Raw fitness values have the same structure throughout an evolution
+    # (except before the first evaluation), so they're stored as a matrix
+    # with the structure alongside; otherwise they're stored as JSON.
+    flat = [flatten_raw_fitness(a.raw_fitness) for a in animats]
+    templates = set(tuple(template) for _, template in flat)
+    raw_template = list(templates.pop()) if len(templates) == 1 else None
+    if raw_template is not None:
+        arrays['raw_fitness'] = np.array(
+            [values for values, _ in flat], float).reshape(len(flat), -1)
+    arrays['c_rng_state'] = np.frombuffer(evolution.c_rng_state, np.uint8)
+    version, internal, gauss_next = evolution.python_rng_state
+    arrays['python_rng_state'] = np.array(internal, np.uint32)
+    surrogate = {}
+    for name, value in vars(evolution.surrogate).items():
+        if isinstance(value, np.ndarray):
+            arrays['surrogate_' + name] = value
+        else:
+            surrogate[name] = value
+    meta = {
+        'format': FORMAT,
+        'format_version': VERSION,
+        'experiment': evolution.experiment.serializable(),
+        'simulation': dict(evolution.simulation),
+        'python_rng': [version, gauss_next],
+        'phylogeny': {'step': population.step,
+                      'keyframe_interval': population.keyframe_interval,
+                      'next_id': population._next_id},
+        'raw_template': raw_template,
+        'raw_fitness': (None if raw_template is not None else
+                        [a.raw_fitness for a in animats]),
+        'logbook': _dump_logbook(evolution.logbook),
+        'surrogate': surrogate,
+    }
+    meta.update((name, getattr(evolution, name)) for name in SCALARS)
+    meta = json.dumps(meta, default=json_default)
+    arrays['meta'] = np.frombuffer(meta.encode(), np.uint8)
+    f = io.BytesIO()
+    np.savez(f, **arrays)
+    return f.getvalue()
+
+
+def load(path):
+    """Load a snapshot.
+
+    Returns:
+        dict: The state of the evolution, as passed to
+        ``Evolution.__setstate__``.
+
+    Raises:
+        ValueError: If the file isn't a snapshot in this version of the
+            format.
+    """
+    with np.load(path, allow_pickle=False) as f:
+        arrays = dict(f.items())
+    meta = json.loads(arrays.pop('meta').tobytes().decode())
+    if meta.get('format') != FORMAT:
+        raise ValueError('`{}` is not a snapshot.'.format(path))
+    if meta['format_version'] != VERSION:
+        raise ValueError(
+            'cannot load `{}`: snapshot format version {} is not supported '
+            '(expected {}).'.format(path, meta['format_version'], VERSION))
+    experiment_params = meta['experiment']
+    experiment_params['fitness_function'] = tuple(
+        experiment_params['fitness_function'])
+    experiment = Experiment(experiment_params)
+    rng = random.Random()
+    # Rebuild the animats.
+    genomes, offsets = arrays['genomes'], arrays['genome_offsets']
+    raw_template = meta['raw_template']
+    nodes = []
+    for i, node_id in enumerate(arrays['ids'].tolist()):
+        correct, incorrect = (int(arrays['correct'][i]),
+                              int(arrays['incorrect'][i]))
+        raw_fitness = (
+            unflatten_raw_fitness(arrays['raw_fitness'][i], raw_template)
+            if raw_template is not None else
+            tuples(meta['raw_fitness'][i]))
+        animat = Animat.__new__(Animat)
+        animat.__setstate__({
+            '_experiment': experiment,
+            'genome': genomes[offsets[i]:offsets[i + 1]].tolist(),
+            'gen': int(arrays['gens'][i]),
+            'fitness': float(arrays['fitness'][i]),
+            '_dirty_fitness': bool(arrays['dirty_fitness'][i]),
+            '_predicted': bool(arrays['predicted'][i]),
+            'raw_fitness': raw_fitness,
+            '_correct': False if correct == NO_GAME else correct,
+            '_incorrect': False if incorrect == NO_GAME else incorrect,
+            'random': rng,
+            '_id': node_id,
+        })
+        parent = int(arrays['parents'][i])
+        nodes.append((node_id, animat, int(arrays['refcounts'][i]),
+                      None if parent < 0 else parent))
+    phylogeny = meta['phylogeny']
+    population = Phylogeny.from_nodes(
+        nodes, arrays['population'].tolist(), phylogeny['next_id'],
+        step=phylogeny['step'],
+        keyframe_interval=phylogeny['keyframe_interval'])
+    # The living animats play the current generation's trials.
+    for animat in population:
+        animat.trials = meta['trials']
+    surrogate = Surrogate()
+    for name, value in meta['surrogate'].items():
+        setattr(surrogate, name, value)
+    for name, value in arrays.items():
+        if name.startswith('surrogate_'):
+            setattr(surrogate, name[len('surrogate_'):], value)
+    version, gauss_next = meta['python_rng']
+    python_rng_state = (version, tuple(arrays['python_rng_state'].tolist()),
+                        gauss_next)
+    rng.setstate(python_rng_state)
+    state = {
+        'experiment': experiment,
+        'simulation': Munch(meta['simulation']),
+        'population': population,
+        'random': rng,
+        'python_rng_state': python_rng_state,
+        'c_rng_state': arrays['c_rng_state'].tobytes(),
+        'logbook': _load_logbook(meta['logbook']),
+        'surrogate': surrogate,
+    }
+    state.update((name, meta[name]) for name in SCALARS)
+    return state
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# stats.py
+
+"""
+Population statistics.
+
+The data of each animat is gathered once per recorded generation into NumPy
+arrays, one per attribute, and the statistics are computed from those arrays
+rather than animat by animat.
+"""
+
+import numpy as np
+
+from .constants import PRECISION
+from .utils import rounder
+
+# Header of the logbook chapter with detailed population statistics.
+POPULATION_HEADER = ['mean', 'std', 'min', 'q25', 'median', 'q75',
+                     'raw_mean', 'correct', 'length', 'gates']
+
+
+def _round(x):
+    return np.round(x, PRECISION).tolist()
+
+
+def _count(x):
+    """Return a number of trials, as an integer unless it was scaled."""
+    return int(x) if float(x).is_integer() else _round(x)
+
+
+def flatten_raw_fitness(raw_fitness):
+    """Return the values of a raw fitness tuple and the length of each
+    multivalued entry (``-1`` for single values)."""
+    values, template = [], []
+    for value in raw_fitness:
+        if isinstance(value, (tuple, list)):
+            values.extend(value)
+            template.append(len(value))
+        else:
+            values.append(value)
+            template.append(-1)
+    return values, template
+
+
+def unflatten_raw_fitness(values, template):
+    """Inverse of ``flatten_raw_fitness``."""
+    raw_fitness, i = [], 0
+    for length in template:
+        if length < 0:
+            raw_fitness.append(float(values[i]))
+            i += 1
+        else:
+            raw_fitness.append(tuple(values[i:i + length].tolist()))
+            i += length
+    return tuple(raw_fitness)
+
+
+class PopulationStats:
+
+    """Per-animat data of a population, as NumPy arrays.
+
+    Args:
+        animats (Sequence(Animat)): The population.
+
+    Keyword Args:
+        detailed (bool): Whether to also gather the data needed for the
+            ``population`` chapter (genome lengths and gate counts, which may
+            require generating the animats' phenotypes).
+    """
+
+    def __init__(self, animats, detailed=False):
+        n = len(animats)
+        self.fitness = np.fromiter((a.fitness for a in animats), float, n)
+        self.raw_fitness = [a.raw_fitness for a in animats]
+        # Multivalued fitness functions give tuples, so rank by the flattened
+        # values (which orders them like the tuples themselves).
+        flat = [flatten_raw_fitness(raw) for raw in self.raw_fitness]
+        templates = set(tuple(template) for _, template in flat)
+        self.raw_template = templates.pop() if len(templates) == 1 else None
+        if self.raw_template is not None:
+            self.raw_values = np.array([values for values, _ in flat],
+                                       float).reshape(n, -1)
+        # Count correct trials in the whole game even when only some of them
+        # were played, so that records are comparable throughout a run.
+        self.correct = np.fromiter((a.scaled_correct for a in animats), float,
+                                   n)
+        self.detailed = detailed
+        if detailed:
+            self.genome_length = np.fromiter(
+                (len(a.genome) for a in animats), int, n)
+            self.num_gates = np.fromiter(
+                (a.num_gates for a in animats), int, n)
+
+    def _rank(self, tiebreak):
+        """Return the indices of the animats sorted by fitness, with ties
+        broken by the columns of ``tiebreak`` in order."""
+        tiebreak = tiebreak.reshape(len(self.fitness), -1)
+        keys = [tiebreak[:, i] for i in reversed(range(tiebreak.shape[1]))]
+        return np.lexsort(keys + [self.fitness])
+
+    def _fittest(self):
+        if self.raw_template is None:
+            # The raw fitness tuples differ in shape, so compare them as is.
+            return max(range(len(self.fitness)),
+                       key=lambda i: (self.fitness[i], self.raw_fitness[i]))
+        return self._rank(self.raw_values)[-1]
+
+    def _raw_mean(self):
+        if self.raw_template is None:
+            return None
+        return unflatten_raw_fitness(
+            np.round(self.raw_values.mean(axis=0), PRECISION),
+            self.raw_template)
+
+    def compile(self):
+        """Return the logbook record of the population, by chapter."""
+        fittest = self._fittest()
+        by_correct = self._rank(self.correct)
+        record = {
+            'fitness': {
+                'raw': rounder(self.raw_fitness[fittest]),
+                'exp': rounder(float(self.fitness[fittest])),
+            },
+            'game': {
+                'fittest': _count(self.correct[by_correct[-1]]),
+                'weakest': _count(self.correct[by_correct[0]]),
+            },
+        }
+        if self.detailed:
+            q25, median, q75 = np.percentile(self.fitness, [25, 50, 75])
+            record['population'] = {
+                'mean': _round(self.fitness.mean()),
+                'std': _round(self.fitness.std()),
+                'min': _round(self.fitness.min()),
+                'q25': _round(q25),
+                'median': _round(median),
+                'q75': _round(q75),
+                'raw_mean': self._raw_mean(),
+                'correct': _round(self.correct.mean()),
+                'length': _round(self.genome_length.mean()),
+                'gates': _round(self.num_gates.mean()),
+            }
+        return record
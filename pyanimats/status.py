@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# status.py
+
+"""
+A status file for monitoring evolutions while they run.
+
+Every few seconds, an evolution with a status file rewrites it with its
+progress, throughput, and fitness, as JSON. The file is replaced atomically,
+so a dashboard script can read the status files of many runs at any time
+without locking or talking to the runs. Writing is driven by the wall clock
+rather than by generations, so fast evolutions don't spend more time on it.
+"""
+
+import json
+import os
+import resource
+import sys
+import time
+from time import perf_counter as timer
+
+# The default number of seconds between updates.
+INTERVAL = 10
+
+
+def memory_use():
+    """Return the peak memory use of this process, in megabytes."""
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes and macOS bytes.
+    return round(maxrss / (2**20 if sys.platform == 'darwin' else 2**10), 1)
+
+
+def write(status, path):
+    """Atomically write ``status`` to ``path`` as JSON."""
+    tmp = '{}.{}.tmp'.format(path, os.getpid())
+    with open(tmp, 'w') as f:
+        json.dump(status, f, indent=2, sort_keys=True)
+    os.replace(tmp, path)
+
+
+class StatusWriter:
+
+    """Rewrites a status file at most once every ``interval`` seconds, with
+    the rates of generations and evaluations since the previous update.
+
+    Args:
+        path (str): The status file.
+
+    Keyword Args:
+        interval (float): The minimum number of seconds between updates.
+    """
+
+    def __init__(self, path, interval=INTERVAL):
+        self.path = path
+        self.interval = interval
+        self._last = None
+
+    def due(self):
+        """Return whether it's time to update the status file."""
+        return self._last is None or timer() - self._last[0] >= self.interval
+
+    def write(self, status):
+        """Write ``status``, adding the throughput since the last update.
+
+        ``status`` must include the ``generation`` and the total number of
+        ``evaluations``.
+        """
+        now = timer()
+        status = dict(status)
+        if self._last is not None and now > self._last[0]:
+            seconds = now - self._last[0]
+            status['generations_per_second'] = round(
+                (status['generation'] - self._last[1]) / seconds, 3)
+            status['evaluations_per_second'] = round(
+                (status['evaluations'] - self._last[2]) / seconds, 3)
+        else:
+            status['generations_per_second'] = None
+            status['evaluations_per_second'] = None
+        status['peak_memory_mb'] = memory_use()
+        status['pid'] = os.getpid()
+        status['time'] = time.time()
+        write(status, self.path)
+        self._last = (now, status['generation'], status['evaluations'])
@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# sweep.py
+
+"""
+Running an experiment over a range of seeds and a grid of parameter values.
+
+Each combination of seed and parameter values is a job, run as a separate
+``python -m pyanimats`` process in its own directory under the sweep's output
+directory. At most a fixed number of jobs run at once. The state of every job
+is recorded in a manifest, ``sweep.json``, so that running an interrupted
+sweep again skips the finished jobs and resumes the others from their
+checkpoints. Each job also keeps a status file, ``status.json``, up to date
+while it runs (see ``status``).
+
+A grid file has the same layout as an experiment file, but with a list of
+values for each parameter to vary; every combination of values is run::
+
+    experiment:
+        popsize: [50, 100]
+        mutation_prob: [0.005, 0.01]
+    simulation:
+        ngen: [1000]
+"""
+
+import itertools
+import json
+import os
+import subprocess
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from time import perf_counter as timer
+
+import yaml
+
+from . import utils
+
+# The name of the manifest file in the sweep's output directory.
+MANIFEST = 'sweep.json'
+
+# Job states.
+PENDING = 'pending'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+
+
+def parse_seeds(spec):
+    """Return the seeds given by ``START:STOP``, or a single seed."""
+    start, _, stop = str(spec).partition(':')
+    if not stop:
+        return [int(start)]
+    seeds = list(range(int(start), int(stop)))
+    if not seeds:
+        raise ValueError('invalid seed range `{}`: no seeds'.format(spec))
+    return seeds
+
+
+def grid_points(grid):
+    """Return every combination of the parameter values in ``grid``.
+
+    Args:
+        grid (dict): Maps ``experiment`` and ``simulation`` to dictionaries
+            mapping parameter names to lists of values.
+
+    Returns:
+        list(dict): Each combination, in the same layout as ``grid`` but with
+        a single value for each parameter.
+    """
+    grid = grid or {}
+    unknown = set(grid) - {'experiment', 'simulation'}
+    if unknown:
+        raise ValueError('invalid grid sections: {}'.format(sorted(unknown)))
+    axes = [(section, name, values)
+            for section in sorted(grid)
+            for name, values in sorted(grid[section].items())]
+    points = []
+    for values in itertools.product(*(axis[2] for axis in axes)):
+        point = {}
+        for (section, name, _), value in zip(axes, values):
+            point.setdefault(section, {})[name] = value
+        points.append(point)
+    return points
+
+
+def job_name(point, seed):
+    """Return the name of the job for a grid point and seed, which is also the
+    relative path of its directory."""
+    params = ','.join('{}={}'.format(name, value)
+                      for section in sorted(point)
+                      for name, value in sorted(point[section].items()))
+    seed_dir = 'seed-{}'.format(seed)
+    return os.path.join(params, seed_dir) if params else seed_dir
+
+
+def _write_json(data, path):
+    """Atomically write ``data`` to ``path`` as JSON."""
+    tmp = path + '.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(data, f, indent=2, sort_keys=True)
+    os.replace(tmp, path)
+
+
+class Sweep:
+
+    """A set of evolutions over seeds and parameter values.
+
+    Args:
+        output_dir (str): The directory where the runs and the manifest are
+            stored.
+        experiment_file (str): The experiment file shared by all the runs.
+        seeds (list(int)): The seeds to run for each grid point.
+
+    Keyword Args:
+        grid (dict): The parameter values to run (see ``grid_points``).
+        max_jobs (int): The maximum number of runs at once. Defaults to the
+            number of CPUs. Note that runs with worker processes or islands
+            use several CPUs each.
+        retries (int): The number of times to retry a failed run.
+    """
+
+    def __init__(self, output_dir, experiment_file, seeds, grid=None,
+                 max_jobs=None, retries=0):
+        self.output_dir = output_dir
+        self.experiment_file = experiment_file
+        self.max_jobs = max_jobs or os.cpu_count() or 1
+        self.retries = retries
+        self.manifest_file = os.path.join(output_dir, MANIFEST)
+        self._lock = threading.Lock()
+        # Pick up the state of the jobs from a previous invocation.
+        previous = {}
+        if os.path.exists(self.manifest_file):
+            with open(self.manifest_file) as f:
+                previous = json.load(f)['jobs']
+        self.jobs = {}
+        for point in grid_points(grid):
+            for seed in seeds:
+                name = job_name(point, seed)
+                job = {'seed': seed, 'params': point, 'state': PENDING,
+                       'attempts': 0}
+                job.update(previous.get(name, {}))
+                self.jobs[name] = job
+
+    def _path(self, name, filename):
+        return os.path.join(self.output_dir, name, filename)
+
+    def _save(self):
+        _write_json({'experiment': self.experiment_file,
+                     'jobs': self.jobs,
+                     'summary': self.summary()}, self.manifest_file)
+
+    def _update(self, name, **kwargs):
+        # Jobs finish in different threads, so update the manifest one at a
+        # time.
+        with self._lock:
+            self.jobs[name].update(kwargs)
+            self._save()
+
+    def unfinished(self):
+        """Return the names of the jobs that still need to be run."""
+        return [name for name, job in self.jobs.items()
+                if not (job['state'] == DONE and
+                        os.path.exists(self._path(name, 'output.json')))]
+
+    def _write_params(self, name):
+        """Write the experiment file of a job, with its grid point applied,
+        and return its path."""
+        with open(self.experiment_file) as f:
+            params = yaml.safe_load(f)
+        for section, values in self.jobs[name]['params'].items():
+            params[section].update(values)
+        path = self._path(name, 'experiment.yml')
+        with open(path, 'w') as f:
+            yaml.safe_dump(params, f, default_flow_style=False)
+        return path
+
+    def command(self, name):
+        """Return the command that runs a job, resuming from its checkpoint if
+        there is one."""
+        output_file = self._path(name, 'output.json')
+        checkpoint_file = self._path(name, 'checkpoint.pkl.gz')
+        # Every job writes a status file, for monitoring the sweep.
+        cmd = [sys.executable, '-m', 'pyanimats', output_file]
+        options = ['--force', '--status-file',
+                   self._path(name, 'status.json')]
+        if os.path.exists(checkpoint_file):
+            return cmd + ['resume', checkpoint_file] + options
+        return cmd + ['run', self._write_params(name)] + options + [
+            '--rng-seed', str(self.jobs[name]['seed'])]
+
+    def _run_job(self, name):
+        utils.ensure_exists(os.path.join(self.output_dir, name))
+        job = self.jobs[name]
+        for _ in range(self.retries + 1):
+            cmd = self.command(name)
+            self._update(name, state=RUNNING, attempts=job['attempts'] + 1)
+            start = timer()
+            with open(self._path(name, 'output.log'), 'a') as log:
+                log.write('Command:\n{}\n\n'.format(' '.join(cmd)))
+                log.flush()
+                returncode = subprocess.call(cmd, stdout=log,
+                                             stderr=subprocess.STDOUT)
+            elapsed = job.get('elapsed', 0) + timer() - start
+            if returncode == 0:
+                with open(self._path(name, 'output.json')) as f:
+                    output = json.load(f)
+                self._update(name, state=DONE, returncode=0,
+                             elapsed=round(elapsed, 2),
+                             evolution_elapsed=output['elapsed'],
+                             generations=output.get(
+                                 'generation', output['simulation']['ngen']))
+                print('[{}] Done.'.format(name), flush=True)
+                return
+            self._update(name, state=FAILED, returncode=returncode,
+                         elapsed=round(elapsed, 2))
+            print('[{}] Failed with exit code {}; see `{}`.'.format(
+                name, returncode, self._path(name, 'output.log')),
+                flush=True)
+
+    def run(self):
+        """Run the unfinished jobs."""
+        utils.ensure_exists(self.output_dir)
+        names = self.unfinished()
+        print('Running {} of {} jobs, {} at a time...'.format(
+            len(names), len(self.jobs), self.max_jobs), flush=True)
+        self._save()
+        with ThreadPoolExecutor(self.max_jobs) as executor:
+            # Raise any error from the jobs themselves.
+            list(executor.map(self._run_job, names))
+        self._save()
+
+    def summary(self):
+        """Return the number of jobs in each state, and the elapsed times and
+        throughput of the finished runs."""
+        states = [job['state'] for job in self.jobs.values()]
+        done = [job for job in self.jobs.values() if job['state'] == DONE]
+        summary = {state: states.count(state)
+                   for state in [PENDING, RUNNING, DONE, FAILED]}
+        if done:
+            elapsed = sum(job['elapsed'] for job in done)
+            evolution_elapsed = sum(job['evolution_elapsed'] for job in done)
+            generations = sum(job['generations'] for job in done)
+            summary.update({
+                'elapsed': round(elapsed, 2),
+                'mean_elapsed': round(elapsed / len(done), 2),
+                'generations_per_second': (
+                    round(generations / evolution_elapsed, 2)
+                    if evolution_elapsed else None),
+            })
+        return summary
+
+
+def main(output_dir, experiment_file, seeds='0:1', grid_file=None,
+         max_jobs=None, retries=0):
+    """Run a sweep from the command line and print its summary."""
+    grid = None
+    if grid_file is not None:
+        with open(grid_file) as f:
+            grid = yaml.safe_load(f)
+    sweep = Sweep(output_dir, experiment_file, parse_seeds(seeds), grid=grid,
+                  max_jobs=max_jobs, retries=retries)
+    sweep.run()
+    summary = sweep.summary()
+    print('\nFinished {} of {} jobs ({} failed).'.format(
+        summary[DONE], len(sweep.jobs), summary[FAILED]))
+    if summary[DONE]:
+        print('Mean run time: {}; throughput: {} generations/s.'.format(
+            utils.compress(summary['mean_elapsed']),
+            summary['generations_per_second']))
+    return 0 if summary[FAILED] == 0 else 1
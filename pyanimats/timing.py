@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# timing.py
+
+"""
+Timing the phases of evolution.
+
+Each phase of a generation (selection, cloning, and so on) is timed with the
+wall clock and the times are summed until they're recorded in the logbook, so
+that the cost of each phase can be followed over a run without a profiler.
+"""
+
+from time import perf_counter as timer
+
+# The phases of evolution, in the order in which they occur. The time spent in
+# each fitness function is also recorded, under the function's name, as part
+# of ``evaluate``.
+PHASES = ['select', 'clone', 'mutate', 'check', 'evaluate', 'record',
+          'checkpoint']
+
+# Times are recorded to the tenth of a millisecond.
+PRECISION = 4
+
+
+class _Phase:
+
+    __slots__ = ['_totals', '_name', '_start']
+
+    def __init__(self, totals, name):
+        self._totals = totals
+        self._name = name
+
+    def __enter__(self):
+        self._start = timer()
+
+    def __exit__(self, *exc):
+        self._totals[self._name] = (self._totals.get(self._name, 0.0) +
+                                    timer() - self._start)
+
+
+class PhaseTimer:
+
+    """Sums the time spent in each phase of evolution.
+
+    Example:
+        >>> t = PhaseTimer()
+        >>> with t.phase('select'):
+        ...     pass
+        >>> sorted(t.reset())
+        ['select']
+        >>> t.reset()
+        {}
+    """
+
+    def __init__(self):
+        self._totals = {}
+        self._phases = {}
+
+    def phase(self, name):
+        """Return a context manager that times the phase ``name``."""
+        phase = self._phases.get(name)
+        if phase is None:
+            phase = self._phases[name] = _Phase(self._totals, name)
+        return phase
+
+    def add(self, name, seconds):
+        """Add ``seconds`` to the time spent in the phase ``name``."""
+        self._totals[name] = self._totals.get(name, 0.0) + seconds
+
+    def reset(self):
+        """Return the time spent in each phase since the last reset, in
+        seconds, and start over."""
+        totals = {name: round(seconds, PRECISION)
+                  for name, seconds in self._totals.items()}
+        self._totals.clear()
+        return totals
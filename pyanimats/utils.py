@@ -7,6 +7,7 @@ Utility functions.
 """
 
 import datetime
+import functools
 import os
 import subprocess
 import sys
@@ -42,6 +43,8 @@ def normalizer(r, target_r=(0, 1)):
     return norm
 
 
+# The repository doesn't change while we're running, so only ask git once.
+@functools.lru_cache(maxsize=None)
 def get_version():
     """Return repo description if available, otherwise version number."""
     try:
@@ -59,6 +62,15 @@ def ensure_exists(path):
     return path
 
 
+def parse_address(address):
+    """Return the host and port of an address given as ``HOST:PORT``."""
+    host, _, port = str(address).rpartition(':')
+    if not host or not port.isdigit():
+        raise ValueError(
+            'invalid address `{}`: must be `HOST:PORT`.'.format(address))
+    return host, int(port)
+
+
 def rowset(array, **kwargs):
     """Return the unique rows of an array as a set of tuples."""
     return set(map(tuple, unique_rows(array, **kwargs)))
@@ -129,6 +141,64 @@ def unique_rows(array, upto=False, indices=False, counts=False, sort=False):
     return (unique,) + tuple(secondary_results)
 
 
+def pack(states, indices):
+    """Return the states of the given units as integers.
+
+    The first unit is the most significant bit, as in
+    ``experiment.sensor_motor_states``.
+
+    Args:
+        states (np.ndarray): Unit states, with units along the last axis.
+        indices (list(int)): The units to pack.
+
+    Returns:
+        np.ndarray: The packed states, with the shape of ``states`` without
+        its last axis.
+    """
+    weights = 2**np.arange(len(indices))[::-1]
+    return np.asarray(states)[..., indices].dot(weights)
+
+
+def mutual_information(x, y, num_x, num_y, stacked=False):
+    """Return the mutual information between paired codes, in bits.
+
+    The contingency table is built with a single ``np.bincount``.
+
+    Args:
+        x (np.ndarray): Integer codes in the range ``0`` to ``num_x - 1``.
+        y (np.ndarray): Integer codes in the range ``0`` to ``num_y - 1``,
+            with the same shape as ``x``.
+        num_x (int): The number of possible values of ``x``.
+        num_y (int): The number of possible values of ``y``.
+
+    Keyword Args:
+        stacked (bool): If ``True``, the first axis indexes replicate traces,
+            and the mutual information of each one is returned.
+
+    Returns:
+        float or np.ndarray: The mutual information (of each replicate).
+    """
+    x, y = np.asarray(x), np.asarray(y)
+    if not stacked:
+        return mutual_information(x[np.newaxis], y[np.newaxis], num_x, num_y,
+                                  stacked=True)[0]
+    num_replicates = len(x)
+    size = num_x * num_y
+    # Offset the joint codes of each replicate so they're counted separately.
+    joint = (x * num_y + y).reshape(num_replicates, -1)
+    joint = joint + size * np.arange(num_replicates)[:, np.newaxis]
+    contingency = np.bincount(joint.ravel(), minlength=num_replicates * size)
+    p_xy = contingency.reshape(num_replicates, num_x, num_y).astype(float)
+    p_xy /= np.maximum(p_xy.sum(axis=(1, 2), keepdims=True), 1)
+    p_x = p_xy.sum(axis=2, keepdims=True)
+    p_y = p_xy.sum(axis=1, keepdims=True)
+    # Unobserved pairs contribute nothing.
+    with np.errstate(divide='ignore', invalid='ignore'):
+        terms = p_xy * np.log2(p_xy / (p_x * p_y))
+    terms[p_xy == 0] = 0
+    return np.maximum(terms.sum(axis=(1, 2)), 0)
+
+
 def signchange(a):
     """Detects sign changes in an array. Doesn't count zero as a separate
     sign.
@@ -6,6 +6,9 @@ import numpy as np
 
 from . import fitness_functions
 from .constants import MINUTES
+from .delta import KEYFRAME_INTERVAL
+from .status import INTERVAL as STATUS_FILE_INTERVAL
+from .utils import parse_address
 
 GENERIC_MISMATCH_MSG = """
 cannot load animat: stored {attr} does not match the {attr} encoded by the
@@ -33,6 +36,9 @@ REQUIRED_SIMULATION_KEYS = {
 REQUIRED_FITNESS_TRANSFORM_KEYS = {'base', 'scale', 'add'}
 
 GATE_TYPES = ['hmm', 'lt']
+SELECTION_SCHEMES = ['sus', 'rejection']
+MIGRATION_TOPOLOGIES = ['ring', 'complete']
+TRIAL_SCHEDULES = ['constant', 'linear']
 
 
 def json_animat(animat, dictionary):
@@ -86,11 +92,76 @@ def param_file(d):
         _assert_nonempty_dict(d[k], k)
 
 
-def simulation(d):
+def simulation(d, experiment=None):
+    """Validate simulation parameters, filling in defaults.
+
+    If the ``experiment`` is given, also check that the simulation can be run
+    with it.
+    """
     name = 'simulation parameters'
     _assert_nonempty_dict(d, name)
     _assert_has_keys(d, REQUIRED_SIMULATION_KEYS, name)
     _assert_ge(d, name, 'logbook_interval', 1)
+    # Whether to write the logbook to disk as it's recorded, keeping only the
+    # last records in memory.
+    d.setdefault('stream_logbook', False)
+    d.setdefault('logbook_tail', 100)
+    _assert_ge(d, name, 'logbook_tail', 1)
+    # Get the maximum number of phenotypes whose fitness is cached.
+    d.setdefault('fitness_cache_size', 1000)
+    _assert_ge(d, name, 'fitness_cache_size', 0)
+    # Whether to evaluate only one animat per phenotype in each generation.
+    d.setdefault('deduplicate', True)
+    # Get the number of processes to evaluate animats with.
+    d.setdefault('num_workers', 1)
+    _assert_ge(d, name, 'num_workers', 1)
+    # Get the address to listen on for remote workers (disabled if not
+    # given).
+    d.setdefault('broker', None)
+    if d['broker']:
+        parse_address(d['broker'])
+    # Whether to evolve asynchronously rather than generation by generation.
+    d.setdefault('steady_state', False)
+    # Steady-state evolution never re-evaluates the living population, so its
+    # fitness would come from different subsets of trials.
+    if (d['steady_state'] and experiment is not None and
+            experiment.get('trial_fraction', 1) < 1):
+        raise ValueError(
+            'invalid simulation parameters: `steady_state` evolution '
+            'compares animats evaluated on different trials; '
+            '`trial_fraction` must be 1.')
+    # Get the parameters of racing evaluation of stochastic fitness.
+    d.setdefault('racing_budget', 0)
+    _assert_ge(d, name, 'racing_budget', 0)
+    d.setdefault('racing_initial', 2)
+    _assert_ge(d, name, 'racing_initial', 2)
+    d.setdefault('racing_z', 2.0)
+    _assert_ge(d, name, 'racing_z', 0)
+    # Get the parameters of the surrogate model of fitness.
+    d.setdefault('surrogate', False)
+    d.setdefault('surrogate_fraction', 0.25)
+    _assert_gt(d, name, 'surrogate_fraction', 0)
+    _assert_le(d, name, 'surrogate_fraction', 1)
+    d.setdefault('surrogate_exploration', 0.05)
+    _assert_ge(d, name, 'surrogate_exploration', 0)
+    _assert_le(d, name, 'surrogate_exploration', 1)
+    d.setdefault('surrogate_warmup', 100)
+    _assert_ge(d, name, 'surrogate_warmup', 0)
+    # Get the criteria for stopping early (disabled if not given or 0).
+    d['target_fitness'] = d.get('target_fitness') or None
+    d['target_correct'] = d.get('target_correct') or None
+    d['patience'] = d.get('patience') or 0
+    _assert_ge(d, name, 'patience', 0)
+    # Get the wall-clock budget, in minutes. (Unlike the checkpoint interval,
+    # this is converted to seconds where it's used, so that validating the
+    # parameters again when resuming doesn't change it.)
+    d['time_budget'] = d.get('time_budget') or 0
+    _assert_ge(d, name, 'time_budget', 0)
+    # Get the file where the status is written for monitoring (disabled if
+    # not given), and the number of seconds between updates.
+    d.setdefault('status_file', None)
+    d.setdefault('status_file_interval', STATUS_FILE_INTERVAL)
+    _assert_gt(d, name, 'status_file_interval', 0)
     # Get the generational interval at which to print the evolution status.
     if d['sample_interval'] <= 0:
         d['sample_interval'] = float('inf')
@@ -101,6 +172,16 @@ def simulation(d):
     d['checkpoint_interval'] = (d['checkpoint_interval'] * MINUTES)
     if d['checkpoint_interval'] <= 0:
         d['checkpoint_interval'] = float('inf')
+    # Whether to record detailed population statistics in the logbook.
+    d.setdefault('population_stats', False)
+    # Whether to record the time spent in each phase of evolution.
+    d.setdefault('phase_timing', False)
+    # Get the interval at which genomes are stored in full along lineages.
+    d.setdefault('keyframe_interval', KEYFRAME_INTERVAL)
+    _assert_ge(d, name, 'keyframe_interval', 1)
+    # Get the number of checkpoints to keep.
+    d.setdefault('checkpoint_keep', 1)
+    _assert_ge(d, name, 'checkpoint_keep', 1)
     return d
 
 
@@ -127,8 +208,38 @@ def experiment(d):
         _assert_gt(d['fitness_transform'], 'fitness transform', 'base', 0)
         _assert_gt(d['fitness_transform'], 'fitness transform', 'scale', 0)
         _assert_ge(d['fitness_transform'], 'fitness transform', 'add', 0)
+    if d.get('selection', 'sus') not in SELECTION_SCHEMES:
+        raise ValueError(
+            'invalid experiment: `selection` must be one of '
+            '{}'.format(SELECTION_SCHEMES))
     # TODO validate fitness_ranges
     # TODO validate init_genome_path
+    if d.get('init_genome_bank_top') is not None:
+        _assert_ge(d, name, 'init_genome_bank_top', 1)
+    # Islands
+    if 'num_islands' in d:
+        _assert_ge(d, name, 'num_islands', 1)
+    if 'migration_interval' in d:
+        _assert_ge(d, name, 'migration_interval', 1)
+    if 'migration_size' in d:
+        _assert_ge(d, name, 'migration_size', 0)
+        _assert_lt(d, name, 'migration_size', d['popsize'])
+    if d.get('migration_topology', 'ring') not in MIGRATION_TOPOLOGIES:
+        raise ValueError(
+            'invalid experiment: `migration_topology` must be one of '
+            '{}'.format(MIGRATION_TOPOLOGIES))
+    # Trial subsampling
+    if 'trial_fraction' in d:
+        _assert_gt(d, name, 'trial_fraction', 0)
+        _assert_le(d, name, 'trial_fraction', 1)
+        if d['trial_fraction'] < 1 and 'food' in d['fitness_function']:
+            raise ValueError(
+                'invalid experiment: `food` fitness depends on the order of '
+                'the trials; `trial_fraction` must be 1.')
+    if d.get('trial_schedule', 'constant') not in TRIAL_SCHEDULES:
+        raise ValueError(
+            'invalid experiment: `trial_schedule` must be one of '
+            '{}'.format(TRIAL_SCHEDULES))
     # Animat
     if d['gate'] not in GATE_TYPES:
         raise ValueError(
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# test_cache.py
+
+import numpy as np
+
+from pyanimats import c_animat
+from pyanimats.cache import FitnessCache, phenotype_key
+
+
+def _genome_halves(codon_one, codon_two):
+    """Return two random genome halves, each with one gate at its start."""
+    genome = np.random.RandomState(0).randint(256, size=1000)
+    # Get rid of any other start codons.
+    genome[genome == codon_one] = 0
+    genome[[0, 500]] = codon_one
+    genome[[1, 501]] = codon_two
+    return genome[:500].tolist(), genome[500:].tolist()
+
+
+def test_fingerprint_ignores_order_of_markov_gates():
+    first, second = _genome_halves(42, 213)
+    a = c_animat.pyHiddenMarkovAgent(first + second, 3, 4, 2, True)
+    b = c_animat.pyHiddenMarkovAgent(second + first, 3, 4, 2, True)
+    assert a.num_gates == 2
+    assert a.fingerprint == b.fingerprint
+    assert np.array_equal(a.tpm, b.tpm)
+    c = c_animat.pyHiddenMarkovAgent(first + first, 3, 4, 2, True)
+    assert a.fingerprint != c.fingerprint
+
+
+def test_fingerprint_depends_on_order_of_threshold_gates():
+    first, second = _genome_halves(11, 244)
+    a = c_animat.pyLinearThresholdAgent(first + second, 3, 4, 2, True)
+    b = c_animat.pyLinearThresholdAgent(second + first, 3, 4, 2, True)
+    assert a.num_gates == 2
+    assert a.fingerprint != b.fingerprint
+
+
+def test_phenotype_key():
+    assert phenotype_key(2**64 - 1) == phenotype_key(2**64 - 1)
+    assert phenotype_key(1) != phenotype_key(2)
+    assert phenotype_key(1) != phenotype_key(1, salt=b'nat')
+
+
+def test_cache_hits_and_misses():
+    cache = FitnessCache(2)
+    assert cache.get('a') is None
+    cache.put('a', 1)
+    assert cache.get('a') == 1
+    assert cache.reset_stats() == {'hits': 1, 'misses': 1}
+    assert cache.reset_stats() == {'hits': 0, 'misses': 0}
+
+
+def test_cache_evicts_least_recently_used():
+    cache = FitnessCache(2)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    # Using `a` makes `b` the least-recently used entry.
+    cache.get('a')
+    cache.put('c', 3)
+    assert len(cache) == 2
+    assert 'a' in cache and 'c' in cache
+    assert 'b' not in cache
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# test_checkpoint.py
+
+import gzip
+import os
+
+import pytest
+
+from pyanimats import checkpoint
+
+
+def read(path):
+    with gzip.open(path, 'rb') as f:
+        return f.read()
+
+
+def test_suffixed_file():
+    assert (checkpoint.suffixed_file('out/checkpoint.pkl.gz', 1) ==
+            'out/checkpoint.1.pkl.gz')
+    assert (checkpoint.suffixed_file('checkpoint.pkl', 'island-0') ==
+            'checkpoint.island-0.pkl')
+
+
+def test_write_rotates(tmpdir):
+    path = str(tmpdir.join('checkpoint.pkl.gz'))
+    for data in [b'a', b'b', b'c', b'd']:
+        checkpoint.write(data, path, keep=3)
+    assert read(path) == b'd'
+    assert read(checkpoint.suffixed_file(path, 1)) == b'c'
+    assert read(checkpoint.suffixed_file(path, 2)) == b'b'
+    assert sorted(os.listdir(str(tmpdir))) == [
+        'checkpoint.1.pkl.gz', 'checkpoint.2.pkl.gz', 'checkpoint.pkl.gz']
+
+
+def test_write_respects_umask(tmpdir):
+    path = str(tmpdir.join('checkpoint.pkl.gz'))
+    checkpoint.write(b'a', path)
+    mode = os.stat(path).st_mode & 0o777
+    assert mode == 0o666 & ~checkpoint._UMASK
+
+
+def test_writer(tmpdir):
+    path = str(tmpdir.join('checkpoint.pkl.gz'))
+    writer = checkpoint.CheckpointWriter()
+    writer.write(b'a', path)
+    writer.write(b'b', path)
+    writer.wait()
+    assert read(path) == b'b'
+    assert os.listdir(str(tmpdir)) == ['checkpoint.pkl.gz']
+
+
+def test_writer_reraises_errors(tmpdir):
+    writer = checkpoint.CheckpointWriter()
+    writer.write(b'a', str(tmpdir.join('missing', 'checkpoint.pkl.gz')))
+    with pytest.raises(OSError):
+        writer.wait()
+    # The error is only raised once.
+    writer.wait()
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# test_delta.py
+
+import random
+
+import pytest
+
+from pyanimats import delta
+
+
+def mutated(genome, rng):
+    genome = list(genome)
+    for i in rng.sample(range(len(genome)), 3):
+        genome[i] = rng.randrange(256)
+    if rng.random() < 0.5:
+        start = rng.randrange(len(genome) - 10)
+        if rng.random() < 0.5:
+            genome[start:start] = genome[start:start + 10]
+        else:
+            del genome[start:start + 10]
+    return genome
+
+
+@pytest.fixture
+def lineage():
+    rng = random.Random(0)
+    genomes = [[rng.randrange(256) for i in range(500)]]
+    for i in range(30):
+        genomes.append(mutated(genomes[-1], rng))
+    # Newest first.
+    return genomes[::-1]
+
+
+def test_diff_and_patch(lineage):
+    for child, parent in zip(lineage, lineage[1:]):
+        script = delta.diff(parent, child)
+        assert delta.patch(parent, script) == child
+
+
+def test_point_mutations_are_compact():
+    parent = [0] * 100
+    child = list(parent)
+    child[3] = child[4] = child[50] = 1
+    assert delta.diff(parent, child) == [[3, 5, [1, 1]], [50, 51, [1]]]
+    assert delta.diff(parent, parent) == []
+
+
+def test_duplication_is_one_edit():
+    parent = list(range(50))
+    child = parent[:20] + parent[10:20] + parent[20:]
+    child[45] = 0
+    script = delta.diff(parent, child)
+    assert len(script) == 2
+    assert delta.patch(parent, script) == child
+    assert delta.patch(child, delta.diff(child, parent)) == parent
+
+
+def test_encode_and_decode(lineage):
+    encoded = delta.encode(lineage, keyframe_interval=7)
+    keyframes = [i for i, (full, data) in enumerate(encoded) if full]
+    # Keyframes are counted from the oldest genome.
+    assert keyframes == [2, 9, 16, 23, 30]
+    assert delta.decode(encoded) == lineage
+
+
+def test_decode_lineage():
+    dicts = [{'gen': 2, 'genome_delta': [[0, 1, [5]]]},
+             {'gen': 1, 'genome_delta': [[1, 1, [9]]]},
+             {'gen': 0, 'genome': [1, 2]}]
+    assert [d['genome'] for d in delta.decode_lineage(dicts)] == [
+        [5, 9, 2], [1, 9, 2], [1, 2]]
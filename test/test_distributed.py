@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# test_distributed.py
+
+import multiprocessing
+import random
+from multiprocessing.connection import Client
+
+import pytest
+
+from pyanimats.animat import Animat
+from pyanimats.distributed import (AUTHKEY_VARIABLE, Broker, authkey,
+                                   check_address, work)
+from pyanimats.fitness_transforms import ExponentialMultiFitness
+from pyanimats.parallel import evaluate_genome, genome_features
+from pyanimats.utils import parse_address
+
+from test_experiment import example
+
+
+def animats(experiment, n):
+    rng = random.Random(0)
+    return [Animat(experiment, [rng.randrange(256) for i in range(2000)])
+            for _ in range(n)]
+
+
+def expected(experiment, animats, seeds):
+    fitness_function = ExponentialMultiFitness(
+        experiment.fitness_function, experiment.fitness_transform,
+        experiment.fitness_ranges)
+    return [evaluate_genome(list(a.genome), seed, experiment,
+                            fitness_function)
+            for a, seed in zip(animats, seeds)]
+
+
+def start_worker(address):
+    worker = multiprocessing.Process(target=work, args=(address,))
+    worker.start()
+    return worker
+
+
+@pytest.fixture
+def broker():
+    broker = Broker(example(), 'localhost:0', chunksize=2, timeout=5)
+    yield broker
+    broker.shutdown()
+
+
+def test_parse_address():
+    assert parse_address('example.org:8000') == ('example.org', 8000)
+    with pytest.raises(ValueError):
+        parse_address('8000')
+
+
+def test_default_key_is_only_used_on_loopback(monkeypatch):
+    monkeypatch.delenv(AUTHKEY_VARIABLE, raising=False)
+    assert check_address('localhost:8000') == ('localhost', 8000)
+    assert check_address('127.0.0.1:8000') == ('127.0.0.1', 8000)
+    for address in ['0.0.0.0:8000', '192.0.2.1:8000']:
+        with pytest.raises(ValueError):
+            check_address(address)
+        with pytest.raises(ValueError):
+            Broker(example(), address)
+    monkeypatch.setenv(AUTHKEY_VARIABLE, 'secret')
+    assert check_address('192.0.2.1:8000') == ('192.0.2.1', 8000)
+
+
+def test_results_match_local_evaluation(broker):
+    population = animats(broker.experiment, 7)
+    seeds = list(range(7))
+    workers = [start_worker(broker.address) for i in range(2)]
+    assert broker.map(population, seeds) == expected(broker.experiment,
+                                                     population, seeds)
+    broker.shutdown()
+    for worker in workers:
+        worker.join(10)
+        assert worker.exitcode == 0
+
+
+def test_features_match_local_computation(broker):
+    population = animats(broker.experiment, 3)
+    seeds = list(range(3))
+    worker = start_worker(broker.address)
+    assert broker.map(population, seeds, features=True) == [
+        genome_features(list(a.genome), seed, broker.experiment)
+        for a, seed in zip(population, seeds)]
+    broker.shutdown()
+    worker.join(10)
+    assert worker.exitcode == 0
+
+
+def test_lost_batches_are_requeued(broker):
+    population = animats(broker.experiment, 2)
+    # A worker that takes a batch and disconnects without evaluating it.
+    lost = Client(parse_address(broker.address), authkey=authkey())
+    assert lost.recv()[0] == 'experiment'
+    futures = [broker.submit(a, seed) for seed, a in enumerate(population)]
+    assert lost.recv()[0] == 'evaluate'
+    lost.close()
+    worker = start_worker(broker.address)
+    results = [future.result(timeout=30) for future in futures]
+    assert results == expected(broker.experiment, population, [0, 1])
+    broker.shutdown()
+    worker.join(10)
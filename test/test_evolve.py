@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# test_evolve.py
+
+from copy import deepcopy
+from time import perf_counter as timer
+
+import numpy as np
+
+from test_experiment import example_evolution
+
+
+def evolution(simulation=None, **experiment_overrides):
+    # Make mutation a no-op, so offspring have their parent's phenotype.
+    experiment = dict(popsize=4, mutation_prob=0, duplication_prob=0,
+                      deletion_prob=0)
+    experiment.update(experiment_overrides)
+    return example_evolution(simulation, **experiment)
+
+
+def offspring_is_dirty(evolution):
+    parent = evolution.population[0]
+    a = deepcopy(parent)
+    evolution._vary(a, parent, 1)
+    assert a.fingerprint == parent.fingerprint
+    return a._dirty_fitness
+
+
+def test_unchanged_offspring_keep_deterministic_fitness():
+    assert not offspring_is_dirty(evolution())
+
+
+def test_unchanged_offspring_are_reevaluated_with_noise():
+    assert offspring_is_dirty(evolution(noise_level=0.1))
+
+
+def screening(predictions, parentless=(), **simulation):
+    """Return an evolution whose surrogate model predicts the given fitness
+    for each offspring, and the groups of offspring awaiting evaluation."""
+    simulation = dict(dict(surrogate=True, surrogate_fraction=0.25,
+                           surrogate_exploration=0, surrogate_warmup=0),
+                      **simulation)
+    e = evolution(simulation)
+    parent = e.population[0]
+    parent.raw_fitness = (1.0, 2.0)
+    pending = []
+    for i, predicted in enumerate(predictions):
+        a = deepcopy(parent)
+        a.parent = None if i in parentless else parent
+        pending.append((i, [a]))
+    prediction = {id(members[0]): p
+                  for (key, members), p in zip(pending, predictions)}
+    # Use each offspring's prediction as its only feature, without playing
+    # games.
+    e._features = lambda animats: ([[prediction[id(a)]] for a in animats],
+                                   animats)
+    e.surrogate.predict = lambda X: np.array(X)[:, 0]
+    return e, pending
+
+
+def screened(predictions, parentless=(), **simulation):
+    """Return the keys of the offspring evaluated exactly, and the offspring
+    given a predicted fitness."""
+    e, pending = screening(predictions, parentless, **simulation)
+    exact, features, _, _ = e._screen(pending)
+    keys = [key for key, members in exact]
+    assert all((x is None) == (key in parentless)
+               for key, x in zip(keys, features))
+    predicted = [members[0] for key, members in pending if key not in keys]
+    return keys, predicted
+
+
+def test_screen_evaluates_the_predicted_top_fraction():
+    keys, predicted = screened([3, 8, 1, 5, 7, 2, 6, 4])
+    assert keys == [1, 4]
+    assert sorted(a.fitness for a in predicted) == [1, 2, 3, 4, 5, 6]
+    assert all(a._predicted for a in predicted)
+    assert all(a.raw_fitness == (1.0, 2.0) for a in predicted)
+
+
+def test_screen_explores_the_others():
+    keys, predicted = screened([3, 8, 1, 5], surrogate_exploration=1)
+    assert keys == [0, 1, 2, 3] and not predicted
+
+
+def test_screen_evaluates_parentless_animats():
+    keys, predicted = screened([3, 8, 1, 5], parentless=(2,))
+    assert keys == [1, 2]
+    assert sorted(a.fitness for a in predicted) == [3, 5]
+
+
+def test_screen_waits_for_the_warm_up():
+    e, pending = screening([3, 8, 1, 5], surrogate_warmup=1)
+    exact, features, predictions, _ = e._screen(pending)
+    assert exact == pending
+    assert features == [[3], [8], [1], [5]]
+    assert predictions == [None] * 4
+    assert not any(members[0]._predicted for key, members in pending)
+
+
+def test_fittest_animat_is_never_predicted():
+    e, pending = screening([3, 8, 1, 5])
+    e._screen(pending)
+    population = [members[0] for key, members in pending]
+    # The offspring predicted to be the fittest was evaluated exactly.
+    population[1].fitness = 4.0
+    # Exact evaluation gives every animat a fitness of 4.
+    e._evaluate = lambda animats: [(4.0, (0.0, 0.0), 0, 0)] * len(animats)
+    e._confirm(population)
+    assert not any(a._predicted and a.fitness >= 4 for a in population)
+    assert sorted(a.fitness for a in population) == [1, 3, 4, 4]
+
+
+def test_target_correct_counts_the_whole_game_when_subsampling():
+    e = evolution({'target_correct': 128}, trial_fraction=0.25)
+    assert e.experiment.num_trials == 128
+    clock = dict.fromkeys(['status', 'checkpoint'], timer())
+    e._draw_trials(1)
+    for missed in [1, 0]:
+        for a in e.population:
+            a.trials = e.trials
+            a._correct, a._incorrect = len(e.trials) - missed, missed
+        e.record(e.population, 1)
+        assert e._check_stop(clock) == (not missed)
+    assert e.stop_reason == 'target_correct'
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# test_experiment.py
+
+import os
+import pickle
+
+import yaml
+
+from pyanimats.evolve import Evolution
+from pyanimats.experiment import Experiment
+
+EXAMPLE = os.path.join(os.path.dirname(__file__), '..', 'experiments',
+                       'example.yml')
+
+
+def example_params(simulation=None, **experiment):
+    """Return the experiment and simulation parameters of the example, with
+    the given overrides."""
+    with open(EXAMPLE) as f:
+        params = yaml.safe_load(f)
+    d = params['experiment']
+    d['fitness_function'] = tuple(d['fitness_function'].split(','))
+    d.update(experiment)
+    params['simulation'].update(simulation or {})
+    return d, params['simulation']
+
+
+def example(**experiment):
+    return Experiment(example_params(**experiment)[0])
+
+
+def example_evolution(simulation=None, cls=Evolution, **experiment):
+    """Return an evolution of the example (or another class taking the same
+    arguments, like ``Archipelago``), with the given overrides."""
+    d, simulation = example_params(simulation, **experiment)
+    return cls(Experiment(d), simulation)
+
+
+def test_params_match_attributes():
+    experiment = example()
+    keys = set(experiment) | set(experiment._derived)
+    keys.discard('_derived')
+    assert set(experiment.params._fields) == keys
+    for key in keys:
+        assert getattr(experiment.params, key) == getattr(experiment, key)
+
+
+def test_params_are_not_serialized():
+    experiment = example()
+    assert 'params' not in experiment
+    assert 'params' not in experiment.serializable()
+    restored = pickle.loads(pickle.dumps(experiment))
+    assert restored.params == experiment.params
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# test_fitness_functions.py
+
+import numpy as np
+import pyphi
+import pytest
+
+from pyanimats import fitness_functions
+from pyanimats.animat import Animat
+from pyanimats.fitness_transforms import ExponentialMultiFitness
+
+from test_experiment import example
+
+
+def _animat():
+    genome = np.random.RandomState(0).randint(256, size=2000)
+    # Start a gate every 100 nucleotides.
+    genome[::100] = 42
+    genome[1::100] = 213
+    return Animat(example(), genome.tolist())
+
+
+def test_combined_functions_share_games(monkeypatch):
+    played = []
+    play_game = Animat.play_game
+
+    def counting(self, scrambled=False, **kwargs):
+        played.append(scrambled)
+        return play_game(self, scrambled=scrambled, **kwargs)
+
+    monkeypatch.setattr(Animat, 'play_game', counting)
+    a = _animat()
+    fitness = ExponentialMultiFitness(('nat', 'mi_wvn', 'mi'))
+    fitness(a)
+    assert sorted(played) == [False, True]
+
+
+def test_correct_is_that_of_the_world():
+    a = _animat()
+    world = a.play_game()
+    ExponentialMultiFitness(('mi_wvn', 'nat'))(a)
+    assert (a.correct, a.incorrect) == (world.correct, world.incorrect)
+
+
+def test_scaled_correct_matches_nat():
+    a = _animat()
+    a.play_game()
+    assert a.scaled_correct == a.correct
+    a.trials = list(range(0, a.num_trials, 3))
+    assert fitness_functions.nat(a) == a.scaled_correct
+    assert a.correct + a.incorrect == len(a.trials)
+
+
+def test_memoized_games_are_read_only():
+    ind = fitness_functions.context(_animat())
+    assert fitness_functions.context(ind) is ind
+    assert ind.game(scrambled=True) is ind.game(scrambled=True)
+    assert ind.game(scrambled=True, index=1) is not ind.game(scrambled=True)
+    assert not ind.game().animat_states.flags.writeable
+
+
+@pytest.mark.parametrize('name', list(fitness_functions.metadata))
+def test_functions_consume_what_they_declare(name):
+    if name in ('ex', 'ex_wvn') and not hasattr(pyphi.Subsystem,
+                                                 'core_cause'):
+        pytest.skip('requires a version of PyPhi with `core_cause`')
+    a = _animat()
+    # Functions of empty animats return before using most artifacts.
+    assert a.cm.sum() > 0
+    ind = fitness_functions.context(a)
+    kwargs = {}
+    if name == 'food':
+        kwargs = dict(baseline_penalty=-1, activity_penalty=-0.1,
+                      block_values=[1] * len(ind.hit_multipliers))
+    fitness_functions.__dict__[name](ind, **kwargs)
+    assert ind.consumed == set(fitness_functions.metadata[name]['consumes'])
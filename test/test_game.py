@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# test_game.py
+
+import numpy as np
+
+from pyanimats import c_animat
+
+# Two block patterns in a world of width 16 (64 trials) and height 36.
+HIT_MULTIPLIERS = [1, -1]
+PATTERNS = [int('111', 2), int('1111', 2)]
+WIDTH, HEIGHT = 16, 36
+
+
+def _agent():
+    genome = np.random.RandomState(0).randint(256, size=2000)
+    # Start a gate every 100 nucleotides.
+    genome[::100] = 42
+    genome[1::100] = 213
+    agent = c_animat.pyHiddenMarkovAgent(genome.tolist(), 2, 4, 2, True)
+    assert agent.num_gates > 0
+    return agent
+
+
+def _play(agent, trials=None):
+    return agent.play_game(HIT_MULTIPLIERS, PATTERNS, WIDTH, HEIGHT,
+                           trials=trials)
+
+
+def test_subset_of_trials_matches_whole_game():
+    agent = _agent()
+    full = _play(agent)
+    assert full[4] + full[5] == 64
+    trials = [63, 0, 17, 40]
+    subset = _play(agent, trials)
+    num_nodes = agent.num_nodes
+    states = full[0].reshape(64, HEIGHT, num_nodes)
+    assert np.array_equal(subset[0].reshape(len(trials), HEIGHT, num_nodes),
+                          states[trials])
+    assert np.array_equal(subset[3], full[3][trials])
+    assert subset[4] + subset[5] == len(trials)
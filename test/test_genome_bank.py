@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# test_genome_bank.py
+
+import json
+
+import pytest
+
+from pyanimats import delta, genome_bank
+from pyanimats.genome_bank import GenomeBank
+
+
+def test_round_trip(tmpdir):
+    path = str(tmpdir.join('bank.gb'))
+    genomes = [[1, 2, 3], [4] * 10, [], [255, 0]]
+    genome_bank.write(path, genomes, [0.5, 2.0, 0.1, 2.0])
+    bank = GenomeBank(path)
+    assert len(bank) == 4
+    # Fittest first, keeping the order of ties.
+    assert bank.top() == [[4] * 10, [255, 0], [1, 2, 3], []]
+    assert bank.top(2) == [[4] * 10, [255, 0]]
+    assert list(bank.fitness) == [2.0, 2.0, 0.5, 0.1]
+
+
+def test_only_top_genomes_are_written(tmpdir):
+    path = str(tmpdir.join('bank.gb'))
+    genome_bank.write(path, [[1], [2], [3]], [1.0, 3.0, 2.0], top=2)
+    assert GenomeBank(path).top() == [[2], [3]]
+
+
+def test_other_files_are_rejected(tmpdir):
+    path = tmpdir.join('bank.gb')
+    path.write_binary(b'\0' * 64)
+    with pytest.raises(ValueError):
+        GenomeBank(str(path))
+
+
+def test_read_outputs(tmpdir):
+    class A:
+        def __init__(self, genome, fitness):
+            self.genome, self.fitness = genome, fitness
+
+        def serializable(self, **kwargs):
+            return {'fitness': self.fitness}
+
+    lineage = [A([1, 2, 3, 4], 2.0), A([1, 2, 3], 1.0), A([1, 2], 0.0)]
+    output = {'lineage': delta.encode_lineage(lineage, keyframe_interval=10)}
+    islands = {'islands': [output, output]}
+    paths = []
+    for name, d in [('run.json', output), ('islands.json', islands)]:
+        path = tmpdir.join(name)
+        path.write(json.dumps(d))
+        paths.append(str(path))
+    genomes, fitness = genome_bank.read_outputs(paths)
+    assert genomes == [[1, 2, 3, 4]] * 3
+    assert fitness == [2.0] * 3
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# test_islands.py
+
+import pytest
+
+from pyanimats import validate
+from pyanimats.evolve import load_checkpoint
+from pyanimats.islands import (Archipelago, island_checkpoint_file,
+                               island_seeds, migrate, neighbors)
+
+from test_experiment import example_evolution
+
+
+def test_island_seeds_reproducible():
+    assert island_seeds(0, 4) == island_seeds(0, 4)
+    assert len(set(island_seeds(0, 4))) == 4
+    assert island_seeds(0, 2) != island_seeds(1, 2)
+
+
+def test_neighbors_ring():
+    assert neighbors(0, 3, 'ring') == [1]
+    assert neighbors(2, 3, 'ring') == [0]
+    assert neighbors(0, 1, 'ring') == []
+
+
+def test_neighbors_complete():
+    assert neighbors(1, 3, 'complete') == [0, 2]
+
+
+def test_neighbors_unknown_topology():
+    with pytest.raises(ValueError):
+        neighbors(0, 3, 'star')
+
+
+def test_migrate_ring():
+    assert migrate([['a'], ['b'], ['c']], 'ring') == [['c'], ['a'], ['b']]
+
+
+def test_migrate_complete():
+    assert migrate([['a'], ['b'], ['c']], 'complete') == [
+        ['b', 'c'], ['a', 'c'], ['a', 'b']]
+
+
+def test_island_checkpoint_file():
+    assert (island_checkpoint_file('out/checkpoint.pkl.gz', 2) ==
+            'out/checkpoint.island-2.pkl.gz')
+    assert (island_checkpoint_file('checkpoint.pkl', 0) ==
+            'checkpoint.island-0.pkl')
+
+
+def archipelago(**simulation_overrides):
+    simulation = dict(ngen=4, logbook_interval=1, status_interval=0,
+                      checkpoint_interval=0)
+    simulation.update(simulation_overrides)
+    return example_evolution(simulation, cls=Archipelago, popsize=4,
+                             num_islands=2, migration_interval=2,
+                             migration_size=1)
+
+
+def island_results(archipelago):
+    return [(island['logbook'], island['lineage'])
+            for island in archipelago.islands]
+
+
+def test_islands_only_checkpoint_with_the_archipelago():
+    simulation = archipelago(checkpoint_interval=1)._island_simulation(0)
+    assert validate.simulation(simulation)['checkpoint_interval'] == float(
+        'inf')
+
+
+def test_archipelago_resume(tmpdir):
+    checkpoint_file = str(tmpdir.join('checkpoint.pkl.gz'))
+    uninterrupted = archipelago(ngen=6)
+    uninterrupted.run(str(tmpdir.join('uninterrupted.pkl.gz')))
+    assert uninterrupted.generation == 6
+
+    interrupted = archipelago()
+    interrupted.run(checkpoint_file)
+    resumed = load_checkpoint(checkpoint_file)
+    assert resumed.generation == 4
+    resumed.update_simulation({'ngen': 6})
+    resumed.run(checkpoint_file)
+    assert resumed.generation == 6
+    assert all(island['generation'] == 6 for island in resumed.islands)
+    assert island_results(resumed) == island_results(uninterrupted)
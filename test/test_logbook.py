@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# test_logbook.py
+
+import pickle
+
+from deap import tools
+
+from pyanimats.logbook import StreamingLogbook, load, stream_file
+
+
+def record(logbook, gen):
+    logbook.record(gen=gen, fitness={'exp': float(gen), 'raw': (gen, gen)})
+
+
+def test_stream_file():
+    assert stream_file('out/checkpoint.pkl.gz') == \
+        'out/checkpoint.logbook.ndjson'
+    assert stream_file('checkpoint.island-1.npz') == \
+        'checkpoint.island-1.logbook.ndjson'
+
+
+def test_only_the_tail_is_kept_in_memory(tmpdir):
+    path = str(tmpdir.join('logbook.ndjson'))
+    logbook = StreamingLogbook(path, tail=3)
+    for gen in range(10):
+        record(logbook, gen)
+    assert logbook.select('gen') == [7, 8, 9]
+    assert logbook.chapters['fitness'].select('exp') == [7.0, 8.0, 9.0]
+    full = load(path)
+    assert full.select('gen') == list(range(10))
+    assert full.chapters['fitness'][-1] == {'gen': 9, 'exp': 9.0,
+                                            'raw': (9, 9)}
+
+
+def test_records_after_checkpoint_are_overwritten(tmpdir):
+    path = str(tmpdir.join('logbook.ndjson'))
+    logbook = StreamingLogbook(path, tail=2)
+    for gen in range(5):
+        record(logbook, gen)
+    checkpoint = pickle.dumps(logbook)
+    for gen in range(5, 8):
+        record(logbook, gen)
+    # Resume from the checkpoint.
+    logbook = pickle.loads(checkpoint)
+    for gen in range(5, 7):
+        record(logbook, gen)
+    assert load(path).select('gen') == list(range(7))
+    assert logbook.read().select('gen') == list(range(7))
+
+
+def test_from_logbook_writes_existing_records(tmpdir):
+    path = str(tmpdir.join('logbook.ndjson'))
+    logbook = tools.Logbook()
+    record(logbook, 0)
+    # A chapter that was added partway through.
+    logbook.record(gen=1, fitness={'exp': 1.0, 'raw': (1, 1)},
+                   time={'evaluate': 0.5})
+    streaming = StreamingLogbook.from_logbook(logbook, path, tail=1)
+    assert streaming.select('gen') == [1]
+    full = load(path)
+    assert full.select('gen') == [0, 1]
+    assert full.chapters['time'].select('evaluate') == [0.5]
+    assert full.chapters['fitness'].select('exp') == [0.0, 1.0]
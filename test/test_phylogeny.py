@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# test_phylogeny.py
+
+import pickle
+
+from pyanimats.phylogeny import Phylogeny
+
+
+class Node:
+
+    def __init__(self, gen, parent=None):
+        self.gen = gen
+        self.parent = parent
+        self._id = None
+        self.genome = ([gen] if parent is None
+                       else parent.genome[:5] + [gen] + parent.genome[5:])
+
+    def __getstate__(self):
+        # Like animats, leave parent references to the phylogeny.
+        return {k: v for k, v in self.__dict__.items() if k != 'parent'}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+
+
+def offspring(population, parents, gen):
+    return [Node(gen, population[i]) for i in parents]
+
+
+def test_ids_are_compact_integers():
+    population = Phylogeny([Node(0) for i in range(3)])
+    assert sorted(a._id for a in population) == [0, 1, 2]
+    population[:] = offspring(population, [0, 1, 2], 1)
+    assert sorted(a._id for a in population) == [3, 4, 5]
+
+
+def test_extinct_lineages_are_released():
+    population = Phylogeny([Node(0) for i in range(3)])
+    founder = population[0]
+    for gen in range(1, 10):
+        # Only the first lineage survives.
+        population[:] = offspring(population, [0, 0, 0], gen)
+    # The living animats plus their common ancestors in each generation.
+    assert len(population._nodes) == 3 + 9
+    assert all(a.parent.parent is not None for a in population)
+    ancestor = population[0]
+    while ancestor.parent is not None:
+        ancestor = ancestor.parent
+    assert ancestor is founder
+
+
+def test_only_sampled_ancestors_are_kept():
+    population = Phylogeny([Node(0) for i in range(2)], step=3)
+    for gen in range(1, 8):
+        population[:] = offspring(population, [0, 1], gen)
+    gens = []
+    ancestor = population[0]
+    while ancestor is not None:
+        gens.append(ancestor.gen)
+        ancestor = ancestor.parent
+    assert gens == [7, 6, 3, 0]
+    assert len(population._nodes) == 2 * 4
+
+
+def test_pop_and_append():
+    population = Phylogeny([Node(0), Node(0)])
+    child = Node(1, population[1])
+    population.pop(0)
+    population.append(child)
+    assert len(population._nodes) == 2
+    assert population[0].parent is None and population[1].parent is not None
+
+
+def test_pickle_restores_parents():
+    population = Phylogeny([Node(0) for i in range(2)], keyframe_interval=2)
+    for gen in range(1, 4):
+        population[:] = offspring(population, [1, 1], gen)
+    restored = pickle.loads(pickle.dumps(population))
+    assert len(restored._nodes) == len(population._nodes)
+    gens = []
+    ancestor = restored[0]
+    while ancestor is not None:
+        gens.append(ancestor.gen)
+        ancestor = ancestor.parent
+    assert gens == [3, 2, 1, 0]
+    assert [a.genome for a in restored] == [a.genome for a in population]
+
+
+def test_from_nodes_restores_tree():
+    population = Phylogeny([Node(0) for i in range(2)])
+    for gen in range(1, 4):
+        population[:] = offspring(population, [1, 0], gen)
+    restored = Phylogeny.from_nodes(population.nodes(),
+                                    [a._id for a in population],
+                                    population._next_id)
+    assert restored._nodes == population._nodes
+    assert list(restored) == list(population)
+    child = Node(4, restored[0])
+    restored.append(child)
+    assert child._id == population._next_id
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# test_racing.py
+
+import random
+from types import SimpleNamespace
+
+from pyanimats.evolve import Evolution, _mean_result
+
+
+def test_mean_result():
+    results = [(1.0, (2.0, (1, 2, 3)), 10, 2),
+               (2.0, (4.0, (3, 4, 5)), 11, 1)]
+    assert _mean_result(results) == (1.5, (3.0, [2.0, 3.0, 4.0]), 10, 2)
+
+
+class Noisy:
+
+    def __init__(self, mean, spread):
+        self.mean, self.spread = mean, spread
+        self._dirty_fitness = True
+        self.evaluations = 0
+
+
+def race(animats, budget):
+    rng = random.Random(0)
+
+    def evaluate(batch):
+        results = []
+        for a in batch:
+            a.evaluations += 1
+            fitness = a.mean + rng.uniform(-a.spread, a.spread)
+            results.append((fitness, (fitness,), 0, 0))
+        return results
+
+    evolution = SimpleNamespace(
+        simulation=SimpleNamespace(racing_budget=budget, racing_initial=2,
+                                   racing_z=2.0),
+        _evaluate=evaluate)
+    Evolution._race(evolution, animats, animats)
+
+
+def test_race_spends_budget_on_uncertain_animats():
+    # Two animats are clearly below or above the mean of the population; the
+    # third is close to it and noisy.
+    low, high, close = Noisy(0.0, 0.01), Noisy(10.0, 0.01), Noisy(5.0, 3.0)
+    race([low, high, close], budget=5)
+    assert (low.evaluations, high.evaluations) == (2, 2)
+    assert close.evaluations == 7
+    assert 2 < close.fitness < 8
+
+
+def test_race_without_uncertainty_spends_nothing():
+    animats = [Noisy(0.0, 0.0), Noisy(1.0, 0.0)]
+    race(animats, budget=10)
+    assert [a.evaluations for a in animats] == [2, 2]
+    assert [a.fitness for a in animats] == [0.0, 1.0]
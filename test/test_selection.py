@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# test_selection.py
+
+import random
+
+import numpy as np
+import pytest
+
+from pyanimats.selection import (rejection_sampling,
+                                 stochastic_universal_sampling)
+
+
+@pytest.fixture()
+def rng():
+    return random.Random(0)
+
+
+def test_sus_returns_k_valid_indices(rng):
+    fitnesses = np.array([1.0, 2.0, 3.0, 4.0])
+    chosen = stochastic_universal_sampling(fitnesses, 10, rng)
+    assert len(chosen) == 10
+    assert chosen.min() >= 0 and chosen.max() < len(fitnesses)
+
+
+def test_sus_is_proportionate(rng):
+    # With k equal to the total fitness, each individual is selected exactly
+    # as many times as its fitness.
+    fitnesses = np.array([1.0, 2.0, 3.0, 4.0])
+    chosen = stochastic_universal_sampling(fitnesses, 10, rng)
+    assert np.array_equal(np.bincount(chosen, minlength=4), [1, 2, 3, 4])
+
+
+def test_sus_never_selects_zero_fitness(rng):
+    fitnesses = np.array([0.0, 1.0, 0.0, 1.0])
+    chosen = stochastic_universal_sampling(fitnesses, 100, rng)
+    assert set(chosen) == {1, 3}
+
+
+class AlmostOne:
+
+    def random(self):
+        return 1 - 2**-53
+
+
+@pytest.mark.parametrize('fitnesses,last', [([0.1] * 10, 9),
+                                            ([0.7, 0.2, 0.1], 2),
+                                            ([0.1] * 10 + [0.0], 9)])
+def test_sus_last_pointer_rounding(fitnesses, last):
+    # The last of 3 pointers rounds to at least the total fitness.
+    chosen = stochastic_universal_sampling(fitnesses, 3, AlmostOne())
+    assert chosen[-1] == last
+
+
+def test_sus_uniform_when_no_fitness(rng):
+    chosen = stochastic_universal_sampling(np.zeros(4), 4, rng)
+    assert np.array_equal(np.sort(chosen), [0, 1, 2, 3])
+
+
+def test_sus_reproducible():
+    fitnesses = np.random.RandomState(0).rand(50)
+    assert np.array_equal(
+        stochastic_universal_sampling(fitnesses, 50, random.Random(1)),
+        stochastic_universal_sampling(fitnesses, 50, random.Random(1)))
+
+
+def test_rejection_sampling_matches_original_algorithm():
+    fitnesses = [1.0, 5.0, 2.0, 8.0, 3.0]
+    animats = list(range(len(fitnesses)))
+    # The original implementation, operating on the animats directly.
+    original_rng = random.Random(3)
+    answer = []
+    for i in range(20):
+        done = False
+        while not done:
+            candidate = original_rng.choice(animats)
+            done = original_rng.random() <= (fitnesses[candidate] /
+                                             max(fitnesses))
+        answer.append(candidate)
+    result = rejection_sampling(fitnesses, 20, random.Random(3))
+    assert list(result) == answer
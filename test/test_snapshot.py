@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# test_snapshot.py
+
+import json
+
+import numpy as np
+import pytest
+
+from pyanimats import snapshot
+from pyanimats.animat import Animat
+from pyanimats.evolve import load_checkpoint
+from pyanimats.logbook import StreamingLogbook
+
+from test_experiment import example_evolution
+
+
+def evolution(**simulation_overrides):
+    # Subsample trials so that there are trials to restore, and use the
+    # surrogate model early so that it has some state.
+    simulation = dict(ngen=3, logbook_interval=1, status_interval=0,
+                      checkpoint_interval=0, surrogate=True,
+                      surrogate_warmup=2)
+    simulation.update(simulation_overrides)
+    return example_evolution(simulation, popsize=6, trial_fraction=0.5)
+
+
+def nodes(evolution):
+    return [(node_id, list(a.genome), refcount, parent_id,
+             None if a.parent is None else a.parent._id, a.gen, a.fitness,
+             a._dirty_fitness, a._predicted, tuple(a.raw_fitness),
+             a._correct, a._incorrect)
+            for node_id, a, refcount, parent_id
+            in evolution.population.nodes()]
+
+
+def chapters(logbook):
+    return {name: list(chapter) for name, chapter in logbook.chapters.items()}
+
+
+def test_other_format_versions_are_rejected(tmpdir):
+    path = str(tmpdir.join('checkpoint.npz'))
+    meta = json.dumps({'format': snapshot.FORMAT,
+                       'format_version': snapshot.VERSION + 1})
+    np.savez(path, meta=np.frombuffer(meta.encode(), np.uint8))
+    assert snapshot.is_snapshot(path) and snapshot.is_snapshot_file(path)
+    with pytest.raises(ValueError):
+        snapshot.load(path)
+
+
+def test_snapshot_round_trip(tmpdir):
+    path = str(tmpdir.join('checkpoint.npz'))
+    e = evolution(stream_logbook=True, logbook_tail=2)
+    e.run(path, rescore=False)
+    # An animat that hasn't played a game yet, whose raw fitness doesn't
+    # match the others' (so raw fitness is stored as JSON).
+    e.population[0] = Animat(e.experiment, list(e.population[0].genome))
+    e.checkpoint(path)
+    restored = load_checkpoint(path)
+
+    for name in snapshot.SCALARS:
+        assert getattr(restored, name) == getattr(e, name)
+    assert nodes(restored) == nodes(e)
+    assert ([a._id for a in restored.population] ==
+            [a._id for a in e.population])
+    assert restored.population._next_id == e.population._next_id
+    assert restored.population[0].correct is False
+    assert restored.population[0].raw_fitness == (float('-inf'),)
+    assert all(a.trials == e.trials for a in restored.population)
+    assert restored.python_rng_state == e.python_rng_state
+    assert restored.random.getstate() == e.python_rng_state
+    assert restored.c_rng_state == e.c_rng_state
+    assert all(a.random is restored.random for a in restored.population)
+    assert restored.surrogate.num_samples > 0
+    for name, value in vars(e.surrogate).items():
+        assert np.array_equal(getattr(restored.surrogate, name), value)
+    assert isinstance(restored.logbook, StreamingLogbook)
+    assert restored.logbook.path == e.logbook.path
+    assert restored.logbook.offset == e.logbook.offset
+    assert restored.logbook.tail == e.logbook.tail
+    assert list(restored.logbook) == list(e.logbook)
+    assert chapters(restored.logbook) == chapters(e.logbook)
+
+
+def test_snapshot_resumes_like_pickle(tmpdir):
+    e = evolution()
+    e.run(str(tmpdir.join('checkpoint.pkl.gz')), ngen=2, rescore=False)
+    e.checkpoint(str(tmpdir.join('checkpoint.npz')))
+    resumed = []
+    for name in ['checkpoint.pkl.gz', 'checkpoint.npz']:
+        r = load_checkpoint(str(tmpdir.join(name)))
+        r.run(str(tmpdir.join('resumed-' + name)), final_checkpoint=False,
+              rescore=False)
+        resumed.append(r)
+    from_pickle, from_snapshot = resumed
+    assert from_snapshot.generation == from_pickle.generation == 3
+    assert nodes(from_snapshot) == nodes(from_pickle)
+    assert (chapters(from_snapshot.logbook)['fitness'] ==
+            chapters(from_pickle.logbook)['fitness'])
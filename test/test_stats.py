@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# test_stats.py
+
+from collections import namedtuple
+
+import numpy as np
+
+from pyanimats.stats import (PopulationStats, flatten_raw_fitness,
+                             unflatten_raw_fitness)
+
+class A(namedtuple('A', ['fitness', 'raw_fitness', 'correct', 'genome',
+                         'num_gates'])):
+
+    @property
+    def scaled_correct(self):
+        return self.correct
+
+
+def population():
+    return [A(2.0, (10.0, 0.5), 10, [0] * 4, 1),
+            A(3.0, (12.0, 0.1), 12, [0] * 6, 2),
+            A(3.0, (12.0, 0.2), 11, [0] * 8, 3),
+            A(1.0, (8.0, 0.0), 8, [0] * 6, 2)]
+
+
+def test_compile_matches_tuple_ordering():
+    animats = population()
+    record = PopulationStats(animats).compile()
+    assert record['fitness'] == {
+        'raw': max((a.fitness, a.raw_fitness) for a in animats)[1],
+        'exp': 3.0,
+    }
+    assert record['game'] == {
+        'fittest': max((a.fitness, a.correct) for a in animats)[1],
+        'weakest': min((a.fitness, a.correct) for a in animats)[1],
+    }
+    assert 'population' not in record
+
+
+def test_correct_trials_are_counted_in_the_whole_game():
+    class Subsampled(A):
+
+        @property
+        def scaled_correct(self):
+            return self.correct * 64 / 24
+
+    animats = [Subsampled(*a) for a in population()]
+    record = PopulationStats(animats, detailed=True).compile()
+    assert record['game'] == {'fittest': 32, 'weakest': 21.3333}
+    assert record['population']['correct'] == 27.3333
+
+
+def test_detailed():
+    record = PopulationStats(population(), detailed=True).compile()
+    assert record['population']['mean'] == 2.25
+    assert record['population']['median'] == 2.5
+    assert record['population']['raw_mean'] == (10.5, 0.2)
+    assert record['population']['length'] == 6.0
+    assert record['population']['gates'] == 2.0
+
+
+def test_multivalued_raw_fitness():
+    animats = [A(2.0, (64.0, (0.1, 0.2, 0.3)), 10, [0] * 4, 1),
+               A(2.0, (64.0, (0.1, 0.5, 0.0)), 11, [0] * 4, 1),
+               A(1.0, (70.0, (0.9, 0.9, 0.9)), 12, [0] * 4, 1)]
+    record = PopulationStats(animats, detailed=True).compile()
+    assert record['fitness']['raw'] == (64.0, (0.1, 0.5, 0.0))
+    assert record['fitness']['raw'] == max(
+        (a.fitness, a.raw_fitness) for a in animats)[1]
+    assert record['population']['raw_mean'] == (66.0, (0.3667, 0.5333, 0.4))
+
+
+def test_raw_fitness_round_trip():
+    raw_fitness = (0.5, (1.0, 2.0, 3.0), 4.0)
+    values, template = flatten_raw_fitness(raw_fitness)
+    assert template == [-1, 3, -1]
+    assert unflatten_raw_fitness(np.array(values), template) == raw_fitness
@@ -0,0 +1,26 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# test_status.py
+
+import json
+
+from pyanimats.status import StatusWriter
+
+
+def test_status_writer(tmpdir):
+    path = str(tmpdir.join('status.json'))
+    writer = StatusWriter(path, interval=3600)
+    assert writer.due()
+    writer.write({'generation': 10, 'evaluations': 100})
+    assert not writer.due()
+    with open(path) as f:
+        status = json.load(f)
+    assert status['generation'] == 10
+    assert status['generations_per_second'] is None
+    assert status['peak_memory_mb'] > 0
+    writer.write({'generation': 20, 'evaluations': 300})
+    with open(path) as f:
+        status = json.load(f)
+    assert status['generations_per_second'] > 0
+    assert status['evaluations_per_second'] > status['generations_per_second']
+    assert tmpdir.listdir() == [tmpdir.join('status.json')]
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# test_sweep.py
+
+import json
+import os
+
+import pytest
+
+from pyanimats import sweep
+
+
+def test_parse_seeds():
+    assert sweep.parse_seeds('3') == [3]
+    assert sweep.parse_seeds('2:5') == [2, 3, 4]
+    with pytest.raises(ValueError):
+        sweep.parse_seeds('5:2')
+
+
+def test_grid_points():
+    grid = {'experiment': {'popsize': [10, 20], 'gate': ['hmm']},
+            'simulation': {'ngen': [5]}}
+    assert sweep.grid_points(grid) == [
+        {'experiment': {'gate': 'hmm', 'popsize': 10},
+         'simulation': {'ngen': 5}},
+        {'experiment': {'gate': 'hmm', 'popsize': 20},
+         'simulation': {'ngen': 5}},
+    ]
+    assert sweep.grid_points(None) == [{}]
+    with pytest.raises(ValueError):
+        sweep.grid_points({'animat': {'popsize': [10]}})
+
+
+def test_job_name():
+    assert sweep.job_name({}, 0) == 'seed-0'
+    point = {'experiment': {'popsize': 10}, 'simulation': {'ngen': 5}}
+    assert sweep.job_name(point, 1) == os.path.join('popsize=10,ngen=5',
+                                                    'seed-1')
+
+
+def test_resume_skips_finished_jobs(tmpdir):
+    output_dir = str(tmpdir)
+    for seed in range(3):
+        os.makedirs(os.path.join(output_dir, 'seed-{}'.format(seed)))
+    # Seed 0 finished, seed 1 was interrupted after a checkpoint, and seed 2
+    # never started.
+    with open(os.path.join(output_dir, 'seed-0', 'output.json'), 'w') as f:
+        f.write('{}')
+    with open(os.path.join(output_dir, 'seed-1', 'checkpoint.pkl.gz'),
+              'w') as f:
+        f.write('')
+    with open(os.path.join(output_dir, sweep.MANIFEST), 'w') as f:
+        json.dump({'jobs': {'seed-0': {'state': sweep.DONE, 'elapsed': 3.0,
+                                       'evolution_elapsed': 2.0,
+                                       'generations': 10},
+                            'seed-1': {'state': sweep.RUNNING}}}, f)
+    s = sweep.Sweep(output_dir, 'experiment.yml', [0, 1, 2])
+    assert s.unfinished() == ['seed-1', 'seed-2']
+    assert 'resume' in s.command('seed-1')
+    assert s.summary() == {sweep.PENDING: 1, sweep.RUNNING: 1,
+                           sweep.DONE: 1, sweep.FAILED: 0, 'elapsed': 3.0,
+                           'mean_elapsed': 3.0, 'generations_per_second': 5.0}
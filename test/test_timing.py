@@ -0,0 +1,26 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# test_timing.py
+
+from pyanimats.fitness_transforms import ExponentialMultiFitness
+from pyanimats.timing import PhaseTimer
+
+
+def test_phase_timer_sums_and_resets():
+    t = PhaseTimer()
+    for _ in range(3):
+        with t.phase('select'):
+            pass
+    t.add('evaluate', 1.5)
+    t.add('evaluate', 1.0)
+    totals = t.reset()
+    assert set(totals) == {'select', 'evaluate'}
+    assert totals['evaluate'] == 2.5
+    assert t.reset() == {}
+
+
+def test_fitness_functions_are_timed():
+    t = PhaseTimer()
+    fitness_function = ExponentialMultiFitness(('zero',), timer=t)
+    fitness_function(None)
+    assert set(t.reset()) == {'zero'}
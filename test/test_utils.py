@@ -6,7 +6,7 @@ import pytest
 import numpy as np
 
 from conftest import p
-from pyanimats.utils import unique_rows
+from pyanimats.utils import mutual_information, pack, unique_rows
 
 
 @pytest.fixture()
@@ -114,3 +114,28 @@ def test_unique_rows_with_sort(a):
                        [1, 0, 0, 0, 0]])
     p(result, answer)
     assert np.array_equal(result, answer)
+
+
+def test_pack():
+    states = np.array([[1, 0, 1, 1], [0, 1, 0, 1]])
+    assert np.array_equal(pack(states, [0, 1, 2]), [5, 2])
+    assert np.array_equal(pack(states, [3]), [1, 1])
+
+
+def test_mutual_information():
+    x = np.array([0, 1, 2, 3] * 4)
+    # Independent codes.
+    assert mutual_information(x, np.repeat([0, 1], 8), 4, 2) == 0
+    # The second code is the low bit of the first.
+    assert np.isclose(mutual_information(x, x % 2, 4, 2), 1)
+    assert np.isclose(mutual_information(x, x, 4, 4), 2)
+
+
+def test_mutual_information_stacked():
+    random = np.random.RandomState(0)
+    x = random.randint(4, size=(3, 8, 10))
+    y = (x + random.randint(2, size=x.shape)) % 4
+    stacked = mutual_information(x, y, 4, 4, stacked=True)
+    assert stacked.shape == (3,)
+    for i in range(3):
+        assert np.isclose(stacked[i], mutual_information(x[i], y[i], 4, 4))
@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# test_validate.py
+
+import pytest
+
+from pyanimats import validate
+
+from test_experiment import example_params
+
+
+def example_simulation():
+    return example_params()[1]
+
+
+def test_stopping_criteria_are_disabled_by_zero():
+    d = example_simulation()
+    d.update(target_fitness=0, target_correct=0, patience=0, time_budget=0)
+    validate.simulation(d)
+    assert d['target_fitness'] is None
+    assert d['target_correct'] is None
+    assert not d['patience'] and not d['time_budget']
+
+
+def test_stopping_criteria_are_kept():
+    d = example_simulation()
+    d.update(target_fitness=1.5, target_correct=60)
+    validate.simulation(d)
+    assert (d['target_fitness'], d['target_correct']) == (1.5, 60)
+
+
+def test_steady_state_rejects_trial_subsampling():
+    d = example_simulation()
+    d['steady_state'] = True
+    validate.simulation(dict(d), {'trial_fraction': 1.0})
+    with pytest.raises(ValueError):
+        validate.simulation(dict(d), {'trial_fraction': 0.5})